@@ -0,0 +1,346 @@
+#!/usr/bin/env python
+'''Benchmarks of the cryptux hot paths.
+
+Every benchmark is timed on a single call (best of several calibrated runs)
+and on loops over batches of distinct inputs; the batch APIs are timed on
+whole batches. Results are written as JSON and compared against a stored
+baseline: a time per call that grew by more than the threshold is measured
+again, and is a regression making the run fail if the best of the new runs
+is still over.
+
+    python benchmarks/bench.py --output bench.json
+    python benchmarks/bench.py --save-baseline
+'''
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from binascii import hexlify
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+import cryptux  # noqa: E402
+from cryptux.bitcoin import base58  # noqa: E402
+from cryptux.bitcoin.account import Account  # noqa: E402
+from cryptux.bitcoin.base58 import Base58  # noqa: E402
+from cryptux.bitcoin.batch import derive_addresses  # noqa: E402
+from cryptux.bitcoin.constants import MAINNET, COMPRESSED  # noqa: E402
+from cryptux.bitcoin.gen_addr import p2sh_addr_hex  # noqa: E402
+from cryptux.bitcoin.gen_addr import priv_key_from_wif  # noqa: E402
+from cryptux.bitcoin.gen_addr import pub_key_from_priv_key_hex  # noqa: E402
+from cryptux.bitcoin.hashes import hash160, hash160_many  # noqa: E402
+from cryptux.bitcoin.hashes import hash256  # noqa: E402
+from cryptux.bitcoin.secp256k1 import N  # noqa: E402
+from cryptux.bitcoin.wif import decode_wifs, priv_key_to_wif  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+DEFAULT_SIZES = (1000, 100000)
+# A time per call more than 25% above the baseline is a regression
+DEFAULT_THRESHOLD = 0.25
+# Single calls are repeated for at least this long per run
+MIN_RUN_TIME = 0.2
+SINGLE_RUNS = 5
+SEED = 20180101
+# Batches shorter than this are run BATCH_RUNS times, keeping the best
+SHORT_BATCH_TIME = 2.0
+BATCH_RUNS = 3
+# Suspected regressions are measured this many times again, keeping the
+# best: a single slow run on a busy machine does not fail the comparison
+RECHECK_RUNS = 2
+
+
+def random_secexps(count):
+    '''Reproducible private keys'''
+    rng = random.Random(SEED)
+    return [rng.randrange(1, N) for _ in range(count)]
+
+
+def random_bytes(count, size):
+    '''Reproducible byte strings of size bytes'''
+    rng = random.Random(SEED)
+    return [bytes(rng.getrandbits(8) for _ in range(size))
+            for _ in range(count)]
+
+
+def make_inputs(name, count):
+    '''count distinct argument tuples for a benchmark'''
+    if name in ('base58.from_base256', 'base58.to_base256'):
+        addrs_raw = [b'\x00' + hash160_ + hash256(b'\x00' + hash160_)[:4]
+                     for hash160_ in random_bytes(count, 20)]
+        if name == 'base58.from_base256':
+            return [(addr_raw, ) for addr_raw in addrs_raw]
+        return [(Base58.from_base256(addr_raw), ) for addr_raw in addrs_raw]
+    if name == 'base58.base58check':
+        return [(b'\x00', hash160_) for hash160_ in random_bytes(count, 20)]
+    if name == 'hashes.hash160':
+        return [(pub_key, ) for pub_key in random_bytes(count, 33)]
+    if name == 'hashes.hash256':
+        return [(payload, ) for payload in random_bytes(count, 34)]
+    secexps = random_secexps(count)
+    if name == 'gen_addr.pub_key_from_priv_key_hex':
+        return [('%064x' % secexp, ) for secexp in secexps]
+    if name == 'gen_addr.priv_key_from_wif':
+        return [(priv_key_to_wif(secexp.to_bytes(32, 'big'), MAINNET,
+                                 COMPRESSED), ) for secexp in secexps]
+    if name == 'wif.priv_key_to_wif':
+        return [(secexp.to_bytes(32, 'big'), MAINNET, COMPRESSED)
+                for secexp in secexps]
+    if name == 'account.address':
+        return [(secexp.to_bytes(32, 'big'), ) for secexp in secexps]
+    if name == 'gen_addr.p2sh_addr_hex':
+        # Size of a 2-of-3 multisig redeem script
+        return [(hexlify(script).decode('ascii'), MAINNET)
+                for script in random_bytes(count, 105)]
+    raise Exception('Unknown benchmark: %s' % name)
+
+
+def account_address(priv_key_raw):
+    '''A fresh Account each time, the address is memoized'''
+    return Account(priv_key_raw, MAINNET, COMPRESSED).address
+
+
+def derive_addresses_in_process(priv_keys_hex):
+    '''The batch derivation without the start-up of a process pool'''
+    return derive_addresses(priv_keys_hex, workers=1)
+
+
+BENCHMARKS = [
+    ('base58.from_base256', Base58.from_base256),
+    ('base58.to_base256', Base58.to_base256),
+    ('base58.base58check', Base58.base58check),
+    ('hashes.hash160', hash160),
+    ('hashes.hash256', hash256),
+    ('gen_addr.pub_key_from_priv_key_hex', pub_key_from_priv_key_hex),
+    ('gen_addr.priv_key_from_wif', priv_key_from_wif),
+    ('wif.priv_key_to_wif', priv_key_to_wif),
+    ('account.address', account_address),
+    ('gen_addr.p2sh_addr_hex', p2sh_addr_hex),
+]
+
+# Batch APIs, called once per batch: (name, function of a list, benchmark
+# whose inputs are used)
+BATCH_BENCHMARKS = [
+    ('hashes.hash160_many', hash160_many, 'hashes.hash160'),
+    ('base58.encode_many', Base58.encode_many, 'base58.from_base256'),
+    ('wif.decode_wifs', decode_wifs, 'gen_addr.priv_key_from_wif'),
+    ('batch.derive_addresses', derive_addresses_in_process,
+     'gen_addr.pub_key_from_priv_key_hex'),
+]
+
+
+def time_single(func, args):
+    '''Best time per call over SINGLE_RUNS calibrated runs'''
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func(*args)
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_RUN_TIME:
+            break
+        number *= 2 if elapsed <= 0 else max(
+            2, int(MIN_RUN_TIME / elapsed) + 1)
+    best = elapsed / number
+    for _ in range(SINGLE_RUNS - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            func(*args)
+        best = min(best, (time.perf_counter() - started) / number)
+    return best
+
+
+def time_batch(func, inputs, runs=1):
+    '''Best time per call over runs of a batch of distinct inputs'''
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        for args in inputs:
+            func(*args)
+        elapsed = (time.perf_counter() - started) / len(inputs)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def time_batch_api(func, items):
+    '''Best time per item of batch calls, up to BATCH_RUNS short ones'''
+    best = None
+    for _ in range(BATCH_RUNS):
+        started = time.perf_counter()
+        func(items)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+        if elapsed >= SHORT_BATCH_TIME:
+            break
+    return best / len(items)
+
+
+def run_benchmark(name, sizes):
+    '''{'single': secs, 'batch_<size>': secs} of one benchmark, time per
+    call; batch APIs have no single call'''
+    for batch_name, func, inputs_name in BATCH_BENCHMARKS:
+        if batch_name != name:
+            continue
+        if not sizes:
+            return {}
+        items = [args[0] for args in make_inputs(inputs_name, max(sizes))]
+        return dict(('batch_%d' % size, time_batch_api(func, items[:size]))
+                    for size in sizes)
+    func = dict(BENCHMARKS)[name]
+    inputs = make_inputs(name, max(sizes) if sizes else 1)
+    single = time_single(func, inputs[0])
+    result = {'single': single}
+    for size in sizes:
+        runs = BATCH_RUNS if single * size < SHORT_BATCH_TIME else 1
+        result['batch_%d' % size] = time_batch(func, inputs[:size], runs)
+    return result
+
+
+def benchmark_names(name_filter=None):
+    '''Names of the benchmarks to run, single calls first'''
+    names = [name for name, _ in BENCHMARKS]
+    names += [name for name, _, _ in BATCH_BENCHMARKS]
+    return [name for name in names
+            if not name_filter or name_filter in name]
+
+
+def run_benchmarks(sizes, name_filter=None, progress=None):
+    '''{name: {'single': secs, 'batch_<size>': secs}}, time per call'''
+    results = {}
+    for name in benchmark_names(name_filter):
+        results[name] = run_benchmark(name, sizes)
+        if progress:
+            progress(name, results[name])
+    return results
+
+
+def recheck(results, regressions, runs, progress=None):
+    '''Measure the regressed benchmarks again, keeping the best times'''
+    regressed = {}
+    for name, metric, _, _, _ in regressions:
+        regressed.setdefault(name, set()).add(metric)
+    for name, metrics in sorted(regressed.items()):
+        sizes = sorted(int(metric[len('batch_'):]) for metric in metrics
+                       if metric.startswith('batch_'))
+        for _ in range(runs):
+            for metric, secs in run_benchmark(name, sizes).items():
+                results[name][metric] = min(results[name][metric], secs)
+        if progress:
+            progress(name, results[name])
+
+
+def environment():
+    '''Where the numbers come from, to tell apart baselines'''
+    return {
+        'cryptux': cryptux.__version__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'system': platform.system(),
+        'numpy': base58.numpy is not None,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+
+
+def compare(results, baseline, threshold):
+    '''(name, metric, baseline, current, ratio) of every regression.
+
+    The baseline may hold per-benchmark thresholds under "thresholds".
+    '''
+    thresholds = baseline.get('thresholds', {})
+    regressions = []
+    for name, metrics in sorted(results.items()):
+        expected = baseline.get('results', {}).get(name, {})
+        limit = thresholds.get(name, threshold)
+        for metric, current in sorted(metrics.items()):
+            reference = expected.get(metric)
+            if not reference:
+                continue
+            ratio = current / reference
+            if ratio > 1 + limit:
+                regressions.append((name, metric, reference, current, ratio))
+    return regressions
+
+
+def print_result(name, result):
+    '''One line per benchmark, times per call in microseconds'''
+    metrics = ', '.join('%s %.2fus' % (metric, secs * 1e6)
+                        for metric, secs in sorted(result.items()))
+    sys.stderr.write('%-36s %s\n' % (name, metrics))
+    sys.stderr.flush()
+
+
+def write_json(path, data):
+    '''Write data as sorted, indented JSON'''
+    with open(path, 'w') as fd:
+        json.dump(data, fd, indent=2, sort_keys=True)
+        fd.write('\n')
+
+
+def main(argv=None):
+    '''Run the benchmarks, exit code 1 on a regression over the baseline'''
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '-o', '--output', type=str, default=None,
+        help='write the results to this JSON file')
+    parser.add_argument(
+        '--baseline', type=str, default=DEFAULT_BASELINE,
+        help='baseline JSON file to compare with')
+    parser.add_argument(
+        '--save-baseline', action='store_true',
+        help='store the results as the new baseline instead of comparing')
+    parser.add_argument(
+        '--threshold', type=float, default=DEFAULT_THRESHOLD,
+        help='allowed slowdown, 0.25 for 25%% (per-benchmark overrides go '
+        'in the baseline "thresholds")')
+    parser.add_argument(
+        '--sizes', type=str, default=','.join(map(str, DEFAULT_SIZES)),
+        help='comma-separated batch sizes')
+    parser.add_argument(
+        '-k', '--filter', type=str, default=None,
+        help='only run benchmarks whose name contains this')
+    parser.add_argument(
+        '--recheck', type=int, default=RECHECK_RUNS,
+        help='runs again of a suspected regression, the best is kept')
+    args = parser.parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    data = {
+        'environment': environment(),
+        'results': run_benchmarks(sizes, args.filter, print_result),
+    }
+    if args.output:
+        write_json(args.output, data)
+    if args.save_baseline:
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as fd:
+                data['thresholds'] = json.load(fd).get('thresholds', {})
+        write_json(args.baseline, data)
+        return 0
+    if not os.path.exists(args.baseline):
+        sys.stderr.write('No baseline at %s, run with --save-baseline\n' %
+                         args.baseline)
+        return 0
+    with open(args.baseline) as fd:
+        baseline = json.load(fd)
+    regressions = compare(data['results'], baseline, args.threshold)
+    if regressions and args.recheck > 0:
+        sys.stderr.write('Measuring %d slower results again\n' %
+                         len(regressions))
+        recheck(data['results'], regressions, args.recheck, print_result)
+        if args.output:
+            write_json(args.output, data)
+        regressions = compare(data['results'], baseline, args.threshold)
+    for name, metric, reference, current, ratio in regressions:
+        sys.stderr.write('REGRESSION %s %s: %.2fus -> %.2fus (x%.2f)\n' %
+                         (name, metric, reference * 1e6, current * 1e6,
+                          ratio))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,3 +1,9 @@
-from .bitcoin import Base58
-
 __version__ = '0.0.15'
+
+
+def __getattr__(name):
+    # Base58 is imported on first access, see cryptux.bitcoin
+    if name == 'Base58':
+        from .bitcoin import Base58
+        return Base58
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
@@ -1,3 +1,29 @@
-from .base58 import Base58
-from .account import Account
-from .wallet import Wallet
+# The exports are imported on first access (PEP 562), so that importing the
+# package or one of its modules stays cheap.
+import importlib
+
+# name -> module defining it
+EXPORTS = {
+    'Base58': 'base58',
+    'Account': 'account',
+    'AccountBatch': 'account_batch',
+    'Wallet': 'wallet',
+    'HDKeychain': 'bip32',
+    'HDNode': 'bip32',
+}
+
+__all__ = list(EXPORTS)
+
+
+def __getattr__(name):
+    if name not in EXPORTS:
+        raise AttributeError('module %r has no attribute %r' %
+                             (__name__, name))
+    value = getattr(importlib.import_module('.' + EXPORTS[name], __name__),
+                    name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(EXPORTS))
@@ -1,27 +1,85 @@
 from binascii import hexlify
 
-from ecdsa import SigningKey, VerifyingKey, SECP256k1
-
+from .base58 import Base58
+from .constants import NETWORK_TYPES, PUBKEY, COMPRESSED, DER
+from .hashes import hash160
 from .wif import priv_key_to_wif
-from .gen_addr import bitcoin_addr_from_priv_key_hex
+from .gen_addr import PUB_KEY_FORMATS
+from .backends import pub_key_from_secexp
+from .secp256k1 import N
+
+
+def check_priv_key_raw(priv_key_raw):
+    '''Private keys are 32 bytes, in the range [1, N-1]'''
+    if len(priv_key_raw) != 32:
+        raise Exception('Invalid private key length: %d' % len(priv_key_raw))
+    if not 1 <= int.from_bytes(priv_key_raw, 'big') < N:
+        raise Exception('Private key out of range')
 
 
 class Account(object):
     '''Represents a Bitcoin account'''
 
-    def __init__(self, priv_key_raw, network_type, key_fmt):
-        '''Create a Bitcoin account from private key'''
-        self.signing_key = SigningKey.from_string(
-            priv_key_raw, curve=SECP256k1)
+    # Millions of accounts may be held in memory: no per-instance __dict__,
+    # and every derived value is computed on first access and then kept.
+    __slots__ = ('priv_key_raw', 'network_type', 'key_fmt', '_signing_key',
+                 '_pub_key_raw', '_hash160', '_address', '_wif')
+
+    def __init__(self, priv_key_raw, network_type, key_fmt, pub_key_raw=None):
+        '''Create a Bitcoin account from private key.
+
+        pub_key_raw is the raw 64-byte public key (x||y). Pass it when it is
+        already known so that no EC multiplication is needed.
+        '''
+        check_priv_key_raw(priv_key_raw)
+        if pub_key_raw is not None and len(pub_key_raw) != 64:
+            raise Exception('Invalid raw public key length: %d' %
+                            len(pub_key_raw))
         self.priv_key_raw = priv_key_raw
         self.network_type = network_type
         self.key_fmt = key_fmt
+        self._signing_key = None
+        self._pub_key_raw = pub_key_raw
+        self._hash160 = None
+        self._address = None
+        self._wif = None
+
+    @property
+    def signing_key(self):
+        '''ecdsa SigningKey for the Private Key, created on first use'''
+        if self._signing_key is None:
+            from ecdsa import SigningKey, SECP256k1
+            self._signing_key = SigningKey.from_string(
+                self.priv_key_raw, curve=SECP256k1)
+        return self._signing_key
+
+    @property
+    def pub_key_raw(self):
+        '''Raw 64-byte Public Key (x||y) - read only property'''
+        if self._pub_key_raw is None:
+            self._pub_key_raw = pub_key_from_secexp(
+                int.from_bytes(self.priv_key_raw, 'big'))
+        return self._pub_key_raw
+
+    @property
+    def pub_key(self):
+        '''Public Key encoded according to key_fmt - read only property'''
+        return PUB_KEY_FORMATS[self.key_fmt](self.pub_key_raw)
+
+    @property
+    def hash160(self):
+        '''RIPEMD160(SHA256(pub_key)) - read only property'''
+        if self._hash160 is None:
+            self._hash160 = hash160(self.pub_key)
+        return self._hash160
 
     @property
     def wif(self):
         '''Return WIF for the Private Key - read only property'''
-        return priv_key_to_wif(self.priv_key_raw,
-                               self.network_type, self.key_fmt)
+        if self._wif is None:
+            self._wif = priv_key_to_wif(self.priv_key_raw,
+                                        self.network_type, self.key_fmt)
+        return self._wif
 
     @property
     def hex(self):
@@ -31,11 +89,38 @@ class Account(object):
     @property
     def address(self):
         '''Bitcoin address based on details provided'''
-        priv_key_hex = hexlify(self.priv_key_raw)
-        return bitcoin_addr_from_priv_key_hex(
-            priv_key_hex, self.network_type, self.key_fmt)
+        if self._address is None:
+            version = NETWORK_TYPES[self.network_type][PUBKEY]
+            self._address = Base58.base58check(version, self.hash160)
+        return self._address
 
     @property
     def verbose_address(self):
         '''Returns verbose Bitcoin address'''
         return (self.address, self.network_type, self.key_fmt)
+
+    def sign_digest(self, digest, sig_fmt=DER):
+        '''Sign a 32-byte digest with a deterministic (RFC6979) nonce'''
+        from .signing import SIG_ENCODERS, sign_digest
+        r, s, recid = sign_digest(int.from_bytes(self.priv_key_raw, 'big'),
+                                  digest)
+        return SIG_ENCODERS[sig_fmt](r, s, recid,
+                                     self.key_fmt == COMPRESSED)
+
+    def sign_digests(self, digests, sig_fmt=DER, workers=None):
+        '''Sign many digests, e.g. every input of a transaction'''
+        from .signing import sign_many
+        compressed = self.key_fmt == COMPRESSED
+        return sign_many([(self.priv_key_raw, digest, compressed)
+                          for digest in digests], sig_fmt, workers)
+
+    def verify_digest(self, digest, signature):
+        '''Check a DER or compact signature of digest by this account'''
+        from .verifying import verify_digest
+        return verify_digest(self.pub_key_raw, digest, signature)
+
+    def sign_message(self, message):
+        '''Base64 signature of a message, as Bitcoin signmessage'''
+        from .signing import sign_message
+        return sign_message(self.priv_key_raw, message,
+                            self.key_fmt == COMPRESSED)
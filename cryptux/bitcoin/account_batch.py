@@ -0,0 +1,244 @@
+import functools
+import mmap
+import os
+import struct
+
+from .account import Account
+from .base58 import Base58
+from .backends import points_mul_g
+from .constants import MAINNET, TESTNET, COMPRESSED, UNCOMPRESSED
+from .constants import NETWORK_TYPES, PUBKEY
+from .gen_addr import PUB_KEY_POINT_FORMATS
+from .hashes import hash160_many
+from .parallel import imap_chunks, DEFAULT_CHUNK_SIZE
+from .secp256k1 import N, point_from_compressed
+from .wif import priv_key_to_wif
+
+# Accounts generated in bulk are kept as three columns of fixed-size rows
+# rather than one Account object each: 32-byte private keys, 33-byte
+# compressed public keys and 20-byte hash160s (of the public key in
+# key_fmt), 85 bytes per account. Rows become Account objects on access.
+# Entropy is read from os.urandom in blocks, one per chunk of keys; a
+# scalar out of [1, N-1] has a probability below 2^-127, such rows are
+# dropped from the block and drawn again.
+PRIV_KEY_LEN = 32
+PUB_KEY_LEN = 33
+HASH160_LEN = 20
+N_BYTES = N.to_bytes(PRIV_KEY_LEN, 'big')
+ZERO_BYTES = bytes(PRIV_KEY_LEN)
+
+# Binary export: header | private keys | public keys | hash160s, the
+# columns as held in memory. The private keys are not encrypted.
+BATCH_MAGIC = b'CRYPTUXB'
+BATCH_VERSION = 1
+# magic, version, network, key format, account count
+BATCH_HEADER = struct.Struct('>8sHBBQ')
+NETWORK_CODES = (MAINNET, TESTNET)
+KEY_FMT_CODES = (COMPRESSED, UNCOMPRESSED)
+
+CSV_FIELDS = ['address', 'pub_key']
+
+
+def draw_priv_keys(count):
+    '''count random private keys in [1, N-1], concatenated'''
+    block = os.urandom(count * PRIV_KEY_LEN)
+    while True:
+        rejected = [
+            offset for offset in range(0, len(block), PRIV_KEY_LEN)
+            if not ZERO_BYTES < block[offset:offset + PRIV_KEY_LEN] < N_BYTES
+        ]
+        if not rejected:
+            return block
+        kept = bytearray(block)
+        for offset in reversed(rejected):
+            del kept[offset:offset + PRIV_KEY_LEN]
+        block = bytes(kept) + os.urandom(len(rejected) * PRIV_KEY_LEN)
+
+
+def gen_chunk(key_fmt, counts):
+    '''Worker: (private keys, public keys, hash160s) columns of new keys'''
+    priv_keys = draw_priv_keys(sum(counts))
+    points = points_mul_g([
+        int.from_bytes(priv_keys[offset:offset + PRIV_KEY_LEN], 'big')
+        for offset in range(0, len(priv_keys), PRIV_KEY_LEN)
+    ])
+    pub_keys = b''.join([PUB_KEY_POINT_FORMATS[COMPRESSED](x, y)
+                         for x, y in points])
+    if key_fmt == COMPRESSED:
+        hash160s = hash160_many([
+            pub_keys[offset:offset + PUB_KEY_LEN]
+            for offset in range(0, len(pub_keys), PUB_KEY_LEN)
+        ])
+    else:
+        hash160s = hash160_many([PUB_KEY_POINT_FORMATS[key_fmt](x, y)
+                                 for x, y in points])
+    return priv_keys, pub_keys, b''.join(hash160s)
+
+
+def chunk_counts(count, chunk_size):
+    while count > 0:
+        yield min(count, chunk_size)
+        count -= chunk_size
+
+
+class AccountBatch(object):
+    '''Columns of accounts sharing a network and key format'''
+
+    __slots__ = ('network_type', 'key_fmt', 'priv_keys', 'pub_keys',
+                 'hash160s', '_mmap')
+
+    def __init__(self, network_type, key_fmt, priv_keys, pub_keys, hash160s,
+                 _mmap=None):
+        '''Batch over buffers of concatenated rows, exposed as memoryviews'''
+        count = len(hash160s) // HASH160_LEN
+        if (len(priv_keys), len(pub_keys), len(hash160s)) != (
+                count * PRIV_KEY_LEN, count * PUB_KEY_LEN,
+                count * HASH160_LEN):
+            raise Exception('Inconsistent account batch columns')
+        self.network_type = network_type
+        self.key_fmt = key_fmt
+        self.priv_keys = memoryview(priv_keys)
+        self.pub_keys = memoryview(pub_keys)
+        self.hash160s = memoryview(hash160s)
+        self._mmap = _mmap
+
+    @staticmethod
+    def generate(count, network_type=MAINNET, key_fmt=COMPRESSED,
+                 workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        '''count new random accounts'''
+        priv_keys = bytearray()
+        pub_keys = bytearray()
+        hash160s = bytearray()
+        for columns in imap_chunks(functools.partial(gen_chunk, key_fmt),
+                                   chunk_counts(count, chunk_size), workers,
+                                   1):
+            for column, values in zip((priv_keys, pub_keys, hash160s),
+                                      columns):
+                column += values
+        return AccountBatch(network_type, key_fmt, priv_keys, pub_keys,
+                            hash160s)
+
+    def close(self):
+        '''Release the file of a loaded batch'''
+        if self._mmap is not None:
+            for view in (self.priv_keys, self.pub_keys, self.hash160s):
+                view.release()
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.hash160s) // HASH160_LEN
+
+    def _check_index(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('Account index out of range')
+        return index
+
+    def priv_key_raw(self, index):
+        index = self._check_index(index)
+        return self.priv_keys[index * PRIV_KEY_LEN:
+                              (index + 1) * PRIV_KEY_LEN].tobytes()
+
+    def pub_key_compressed(self, index):
+        index = self._check_index(index)
+        return self.pub_keys[index * PUB_KEY_LEN:
+                             (index + 1) * PUB_KEY_LEN].tobytes()
+
+    def hash160(self, index):
+        index = self._check_index(index)
+        return self.hash160s[index * HASH160_LEN:
+                             (index + 1) * HASH160_LEN].tobytes()
+
+    def address(self, index):
+        return Base58.base58check(NETWORK_TYPES[self.network_type][PUBKEY],
+                                  self.hash160(index))
+
+    def addresses(self):
+        '''Addresses in row order, computed as iterated'''
+        version = NETWORK_TYPES[self.network_type][PUBKEY]
+        hash160s = self.hash160s
+        for offset in range(0, len(hash160s), HASH160_LEN):
+            yield Base58.base58check(
+                version, hash160s[offset:offset + HASH160_LEN].tobytes())
+
+    def __getitem__(self, index):
+        '''Account of a row, its public key and hash160 already known'''
+        x, y = point_from_compressed(self.pub_key_compressed(index))
+        account = Account(self.priv_key_raw(index), self.network_type,
+                          self.key_fmt,
+                          x.to_bytes(32, 'big') + y.to_bytes(32, 'big'))
+        account._hash160 = self.hash160(index)
+        return account
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def write_csv(self, fd, include_wif=False):
+        '''Write address, public key (and WIF) rows with a header row'''
+        fd.write(','.join(CSV_FIELDS + (['wif'] if include_wif else [])))
+        fd.write('\n')
+        pub_keys = self.pub_keys
+        for index, address in enumerate(self.addresses()):
+            fields = [address, pub_keys[index * PUB_KEY_LEN:
+                                        (index + 1) * PUB_KEY_LEN].hex()]
+            if include_wif:
+                fields.append(priv_key_to_wif(self.priv_key_raw(index),
+                                              self.network_type,
+                                              self.key_fmt))
+            fd.write(','.join(fields))
+            fd.write('\n')
+
+    def write_binary(self, fd):
+        '''Write the header and the columns as they are in memory'''
+        fd.write(BATCH_HEADER.pack(
+            BATCH_MAGIC, BATCH_VERSION,
+            NETWORK_CODES.index(self.network_type),
+            KEY_FMT_CODES.index(self.key_fmt), len(self)))
+        fd.write(self.priv_keys)
+        fd.write(self.pub_keys)
+        fd.write(self.hash160s)
+
+    def save(self, path):
+        '''Binary export to path, readable only by its owner'''
+        with open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                          0o600), 'wb') as fd:
+            self.write_binary(fd)
+
+    @staticmethod
+    def load(path):
+        '''Batch over a memory-mapped binary export'''
+        with open(path, 'rb') as fd:
+            # Empty files cannot be mapped
+            if os.fstat(fd.fileno()).st_size < BATCH_HEADER.size:
+                raise Exception('Not an account batch: %s' % path)
+            mapped = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, network_code, key_fmt_code, count = (
+                BATCH_HEADER.unpack_from(mapped))
+            if ((magic, version) != (BATCH_MAGIC, BATCH_VERSION)
+                    or network_code >= len(NETWORK_CODES)
+                    or key_fmt_code >= len(KEY_FMT_CODES)):
+                raise Exception('Not an account batch: %s' % path)
+            offsets = [BATCH_HEADER.size]
+            for row_len in (PRIV_KEY_LEN, PUB_KEY_LEN, HASH160_LEN):
+                offsets.append(offsets[-1] + count * row_len)
+            if len(mapped) != offsets[-1]:
+                raise Exception('Truncated account batch: %s' % path)
+        except Exception:
+            mapped.close()
+            raise
+        view = memoryview(mapped)
+        return AccountBatch(NETWORK_CODES[network_code],
+                            KEY_FMT_CODES[key_fmt_code],
+                            view[offsets[0]:offsets[1]],
+                            view[offsets[1]:offsets[2]],
+                            view[offsets[2]:offsets[3]], mapped)
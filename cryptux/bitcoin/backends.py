@@ -0,0 +1,205 @@
+# Pluggable crypto backends
+#
+# Every kind of primitive has candidate backends in order of preference.
+# The first one that loads is used, unless one is pinned through the
+# environment (e.g. CRYPTUX_EC_BACKEND=ecdsa) or with set_backend().
+# Backends are imported on first use only, so that importing cryptux and
+# starting the CLI stay cheap.
+
+import os
+
+EC = 'EC'
+HASH = 'HASH'
+
+# kind -> environment variable pinning its backend
+BACKEND_ENV_VARS = {
+    EC: 'CRYPTUX_EC_BACKEND',
+    HASH: 'CRYPTUX_HASH_BACKEND',
+}
+
+
+class Backend(object):
+    '''Named set of functions implementing one kind of primitive'''
+
+    def __init__(self, name, **funcs):
+        self.name = name
+        for func_name, func in funcs.items():
+            setattr(self, func_name, func)
+
+
+# secp256k1 public key derivation:
+#   pub_key_from_secexp(secexp) -> raw 64-byte x||y
+#   points_mul_g(secexps) -> [(x, y), ...]
+def load_ec_coincurve():
+    '''libsecp256k1 through coincurve, if installed'''
+    import coincurve
+    from .secp256k1 import check_secexp
+
+    def pub_key_from_secexp(secexp):
+        check_secexp(secexp)
+        return coincurve.PublicKey.from_secret(secexp.to_bytes(
+            32, 'big')).format(compressed=False)[1:]
+
+    def points_mul_g(secexps):
+        points = []
+        for secexp in secexps:
+            pub_key_raw = pub_key_from_secexp(secexp)
+            points.append((int.from_bytes(pub_key_raw[:32], 'big'),
+                           int.from_bytes(pub_key_raw[32:], 'big')))
+        return points
+
+    return Backend('coincurve', pub_key_from_secexp=pub_key_from_secexp,
+                   points_mul_g=points_mul_g)
+
+
+def load_ec_builtin():
+    '''Pure Python engine with the fixed-base table'''
+    from .secp256k1 import pub_key_from_secexp, points_mul_g
+    return Backend('builtin', pub_key_from_secexp=pub_key_from_secexp,
+                   points_mul_g=points_mul_g)
+
+
+def load_ec_ecdsa():
+    '''python-ecdsa'''
+    from ecdsa import SigningKey, SECP256k1
+    from .secp256k1 import check_secexp
+
+    def pub_key_from_secexp(secexp):
+        check_secexp(secexp)
+        return SigningKey.from_secret_exponent(
+            secexp, curve=SECP256k1).get_verifying_key().to_string()
+
+    def points_mul_g(secexps):
+        points = []
+        for secexp in secexps:
+            pub_key_raw = pub_key_from_secexp(secexp)
+            points.append((int.from_bytes(pub_key_raw[:32], 'big'),
+                           int.from_bytes(pub_key_raw[32:], 'big')))
+        return points
+
+    return Backend('ecdsa', pub_key_from_secexp=pub_key_from_secexp,
+                   points_mul_g=points_mul_g)
+
+
+# Hashes:
+#   ripemd160(data) -> 20-byte digest
+#   ripemd160_many(messages) -> [20-byte digest, ...]
+def hash_backend(name, ripemd160):
+    '''Hash backend hashing batches one message at a time'''
+    def ripemd160_many(messages):
+        return [ripemd160(message) for message in messages]
+
+    return Backend(name, ripemd160=ripemd160, ripemd160_many=ripemd160_many)
+
+
+def load_hash_hashlib():
+    '''OpenSSL through hashlib, when its build still has RIPEMD-160'''
+    import hashlib
+    hashlib.new('ripemd160')
+
+    def ripemd160(data):
+        return hashlib.new('ripemd160', data).digest()
+
+    return hash_backend('hashlib', ripemd160)
+
+
+def load_hash_pycryptodome():
+    '''pycryptodome, if installed'''
+    from Crypto.Hash import RIPEMD160
+
+    def ripemd160(data):
+        return RIPEMD160.new(data).digest()
+
+    return hash_backend('pycryptodome', ripemd160)
+
+
+def load_hash_builtin():
+    '''Pure Python, batches vectorized with NumPy when installed'''
+    from .ripemd160 import ripemd160, ripemd160_many
+    return Backend('builtin', ripemd160=ripemd160,
+                   ripemd160_many=ripemd160_many)
+
+
+# kind -> [(name, loader)], fastest first
+BACKENDS = {
+    EC: [
+        ('coincurve', load_ec_coincurve),
+        ('builtin', load_ec_builtin),
+        ('ecdsa', load_ec_ecdsa),
+    ],
+    HASH: [
+        ('hashlib', load_hash_hashlib),
+        ('pycryptodome', load_hash_pycryptodome),
+        ('builtin', load_hash_builtin),
+    ],
+}
+
+_SELECTED = {}
+
+
+def load_backend(kind, name):
+    '''Load a backend by name, raises if it is not available'''
+    for candidate, loader in BACKENDS[kind]:
+        if candidate == name:
+            return loader()
+    raise Exception('Unknown %s backend: %s' % (kind, name))
+
+
+def available_backends(kind):
+    '''Names of the backends of a kind that load here'''
+    names = []
+    for name, loader in BACKENDS[kind]:
+        try:
+            loader()
+        except Exception:
+            continue
+        names.append(name)
+    return names
+
+
+def get_backend(kind):
+    '''Backend in use for a kind, selected on first call'''
+    backend = _SELECTED.get(kind)
+    if backend is not None:
+        return backend
+    pinned = os.environ.get(BACKEND_ENV_VARS[kind])
+    if pinned:
+        backend = load_backend(kind, pinned)
+    else:
+        for name, loader in BACKENDS[kind]:
+            try:
+                backend = loader()
+            except Exception:
+                continue
+            break
+        else:
+            raise Exception('No %s backend available' % kind)
+    _SELECTED[kind] = backend
+    return backend
+
+
+def set_backend(kind, name=None):
+    '''Pin a backend by name, None to select again on next use'''
+    _SELECTED.pop(kind, None)
+    if name is not None:
+        _SELECTED[kind] = load_backend(kind, name)
+
+
+def pub_key_from_secexp(secexp):
+    '''Raw 64-byte public key x||y of a secret exponent'''
+    return get_backend(EC).pub_key_from_secexp(secexp)
+
+
+def points_mul_g(secexps):
+    '''Affine public points of many secret exponents'''
+    return get_backend(EC).points_mul_g(secexps)
+
+
+def ripemd160(data):
+    '''RIPEMD-160 digest'''
+    return get_backend(HASH).ripemd160(data)
+
+
+def ripemd160_many(messages):
+    '''RIPEMD-160 digests of many messages'''
+    return get_backend(HASH).ripemd160_many(messages)
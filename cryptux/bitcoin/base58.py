@@ -1,7 +1,29 @@
-import binascii
-import sys
+import os
 from cryptux.bitcoin.hashes import hash256
 
+# NumPy is optional and slow to import: it is only loaded on first use
+NOT_LOADED = object()
+
+
+def load_numpy():
+    '''The numpy module if installed, else None, imported once'''
+    module = globals().get('numpy', NOT_LOADED)
+    if module is NOT_LOADED:
+        try:
+            import numpy as module
+        except ImportError:
+            module = None
+        globals()['numpy'] = module
+    return module
+
+
+def __getattr__(name):
+    # base58.numpy, as used by the vectorized callers
+    if name == 'numpy':
+        return load_numpy()
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
 # https://www.bitaddress.org/
 # https://github.com/pointbiz/bitaddress.org
 # https://en.wikipedia.org/wiki/Base58
@@ -21,50 +43,82 @@ def map_base58():
 
 BASE58_MAP = map_base58()
 
+# Every pair of Base58 digits, indexed by its value in [0, 58^2)
+BASE58_PAIRS = [hi + lo for hi in BASE58_CHARS for lo in BASE58_CHARS]
+BASE58_PAIR = 58 * 58
+# Encoding divides by 58^10 so that the big number is touched a few times
+# only, every remainder is then split into pairs with small-int divmod.
+BASE58_CHUNK = 58**10
+
+# bytes.translate() table: Base58 char -> digit value, 0xFF for invalid
+INVALID_DIGIT = 0xFF
+BASE58_DIGITS = bytearray([INVALID_DIGIT]) * 256
+for _value, _char in enumerate(BASE58_CHARS):
+    BASE58_DIGITS[ord(_char)] = _value
+BASE58_DIGITS = bytes(BASE58_DIGITS)
+
+# Payload widths handled by encode_many/decode_many: version + hash160,
+# addresses, WIF payloads and full WIF strings (uncompressed, compressed)
+FIXED_WIDTHS = (21, 25, 34, 37, 38)
+# Below this many items the NumPy setup costs more than it saves
+NUMPY_MIN_BATCH = 64
+
 
 def base58_enc(in_num):
     '''Encode a number into Bitcoin Base58 format'''
     if in_num < 0:
         raise Exception("Positive integers only")
-    tmp_out = []
-    while in_num > 0:
-        tmp_out.append(BASE58_CHARS[in_num % 58])
-        in_num = in_num // 58
-    tmp_out.reverse()
+    chunks = []
+    while in_num >= BASE58_CHUNK:
+        in_num, rem = divmod(in_num, BASE58_CHUNK)
+        chunks.append(rem)
+    pairs = BASE58_PAIRS
+    head = []
+    while in_num:
+        in_num, rem = divmod(in_num, BASE58_PAIR)
+        head.append(pairs[rem])
+    head.reverse()
+    head = ''.join(head)
+    if head[:1] == '1':
+        head = head[1:]
+    tmp_out = [head]
+    for rem in reversed(chunks):
+        rem, p5 = divmod(rem, BASE58_PAIR)
+        rem, p4 = divmod(rem, BASE58_PAIR)
+        rem, p3 = divmod(rem, BASE58_PAIR)
+        p1, p2 = divmod(rem, BASE58_PAIR)
+        tmp_out.append(pairs[p1] + pairs[p2] + pairs[p3] + pairs[p4] +
+                       pairs[p5])
     return ''.join(tmp_out)
 
 
-def base256_to_base58_py3(raw_bytes):
-    '''Convert a raw string to Base58 string. For Python 3'''
-    leading_zeros = 0
-    num = 0
-    for c in raw_bytes:
-        if c != 0:
-            break
-        leading_zeros = leading_zeros + 1
-    for c in raw_bytes:
-        num = num * 256 + c
-    base58_str = ''.join(leading_zeros * ['1']) + base58_enc(num)
-    return base58_str
-
-
-def base256_to_base58_py2(raw_bytes):
-    '''Convert a raw string to Base58 string. For Python 2'''
-    leading_zeros = 0
-    num = 0
-    for c in raw_bytes:
-        if c != '\x00':
-            break
-        leading_zeros = leading_zeros + 1
-    for c in raw_bytes:
-        num = num * 256 + ord(c)
-    base58_str = ''.join(leading_zeros * ['1']) + base58_enc(num)
-    return base58_str
+def base58_digits(base58_str):
+    '''Translate a Base58 string to bytes of digit values'''
+    try:
+        digits = base58_str.encode('ascii').translate(BASE58_DIGITS)
+    except UnicodeError:
+        digits = None
+    if digits is None or INVALID_DIGIT in digits:
+        for c in base58_str:
+            if c not in BASE58_MAP:
+                raise Exception("Invalid char, not in Base58: %c" % c)
+    return digits
+
+
+def base256_to_base58(raw_bytes):
+    '''Convert a raw string to Base58 string'''
+    leading_zeros = len(raw_bytes) - len(raw_bytes.lstrip(b'\x00'))
+    num = int.from_bytes(raw_bytes, 'big')
+    return '1' * leading_zeros + base58_enc(num)
 
 
 class Base58(object):
     '''Wraps Base58 related functions'''
 
+    # Debug mode: decode every Base58Check string right after encoding it.
+    # Off by default, enable with CRYPTUX_BASE58_SELF_CHECK=1.
+    self_check = bool(os.environ.get('CRYPTUX_BASE58_SELF_CHECK'))
+
     @staticmethod
     def encode(in_num):
         '''Encode a number into Bitcoin Base58 format'''
@@ -74,34 +128,22 @@ class Base58(object):
     def decode(in_bytes):
         '''Decode a Bitcoin Base58 string to a number'''
         out_num = 0
-        for c in in_bytes:
-            if c not in BASE58_MAP:
-                raise Exception("Invalid char, not in Base58: %c" % c)
-            out_num = out_num * 58 + BASE58_MAP[c]
+        for c in base58_digits(in_bytes):
+            out_num = out_num * 58 + c
         return out_num
 
     @staticmethod
     def from_base256(raw_bytes):
         '''Convert a raw string to Base58 string'''
-        if sys.version_info[0] < 3:
-            return base256_to_base58_py2(raw_bytes)
-        return base256_to_base58_py3(raw_bytes)
+        return base256_to_base58(raw_bytes)
 
     @staticmethod
     def to_base256(base58_str):
         '''Convert a Base58 string to raw string'''
-        leading_ones = 0
-        for c in base58_str:
-            if c != '1':
-                break
-            leading_ones = leading_ones + 1
+        leading_ones = len(base58_str) - len(base58_str.lstrip('1'))
         num = Base58.decode(base58_str)
-        raw_str_suffix_hex = '%02x' % num
-        if len(raw_str_suffix_hex) % 2:
-            raw_str_suffix_hex = '0%s' % raw_str_suffix_hex
-        raw_str_hex = ''.join(leading_ones * ['00']) + raw_str_suffix_hex
-        raw_bytes = binascii.unhexlify(raw_str_hex)
-        return raw_bytes
+        return b'\x00' * leading_ones + num.to_bytes(
+            (num.bit_length() + 7) // 8, 'big')
 
     @staticmethod
     def base58check(version, payload):
@@ -127,7 +169,211 @@ class Base58(object):
         # using Base58Check encoding.
         # This is the most commonly used Bitcoin Address format
         base58cksum = Base58.from_base256(base58cksum_raw)
-        # Quick validation
-        base58cksum_raw_again = Base58.to_base256(base58cksum)
-        assert base58cksum_raw_again == base58cksum_raw
+        if Base58.self_check:
+            Base58.check_round_trip(base58cksum, base58cksum_raw)
         return base58cksum
+
+    @staticmethod
+    def check_round_trip(base58_str, raw_bytes):
+        '''Self-check: base58_str must decode back to raw_bytes'''
+        if Base58.to_base256(base58_str) != raw_bytes:
+            raise Exception('Base58Check self-check failed')
+
+    @staticmethod
+    def base58check_decode(base58_str):
+        '''Reverse of base58check: returns (version, payload). Errors do
+        not repeat the string, which may be an extended private key.'''
+        raw_bytes = Base58.to_base256(base58_str)
+        if len(raw_bytes) < 5:
+            raise Exception('Base58Check string too short')
+        combined_payload, checksum_4bytes = raw_bytes[:-4], raw_bytes[-4:]
+        if hash256(combined_payload)[:4] != checksum_4bytes:
+            raise Exception('Base58Check checksum mismatch')
+        return combined_payload[:1], combined_payload[1:]
+
+    @staticmethod
+    def encode_many(raw_bytes_list):
+        '''Convert many raw strings to Base58, vectorized when possible'''
+        raw_bytes_list = list(raw_bytes_list)
+        out = [None] * len(raw_bytes_list)
+        for width, indices in group_by_len(raw_bytes_list).items():
+            if (load_numpy() is None or width not in FIXED_WIDTHS
+                    or len(indices) < NUMPY_MIN_BATCH):
+                for i in indices:
+                    out[i] = base256_to_base58(raw_bytes_list[i])
+                continue
+            encoded = numpy_encode_fixed(
+                [raw_bytes_list[i] for i in indices], width)
+            for i, base58_str in zip(indices, encoded):
+                out[i] = base58_str
+        return out
+
+    @staticmethod
+    def decode_many(base58_strs, width):
+        '''Decode many Base58 strings to raw strings of exactly width bytes.
+
+        Invalid strings (bad char or decoded length != width) give None
+        instead of raising, so one bad entry does not stop the batch.
+        '''
+        base58_strs = list(base58_strs)
+        out = [None] * len(base58_strs)
+        for str_len, indices in group_by_len(base58_strs).items():
+            if (load_numpy() is None or width not in FIXED_WIDTHS
+                    or len(indices) < NUMPY_MIN_BATCH):
+                for i in indices:
+                    out[i] = decode_fixed(base58_strs[i], width)
+                continue
+            decoded = numpy_decode_fixed(
+                [base58_strs[i] for i in indices], str_len, width)
+            for i, raw_bytes in zip(indices, decoded):
+                out[i] = raw_bytes
+        return out
+
+
+def group_by_len(items):
+    '''Map item length -> indices of the items with that length'''
+    groups = {}
+    for i, item in enumerate(items):
+        groups.setdefault(len(item), []).append(i)
+    return groups
+
+
+def decode_fixed(base58_str, width):
+    '''Decode one Base58 string to exactly width bytes, None if invalid'''
+    try:
+        raw_bytes = Base58.to_base256(base58_str)
+    except Exception:
+        return None
+    return raw_bytes if len(raw_bytes) == width else None
+
+
+# NumPy code paths. Numbers are held as rows of 32-bit limbs (most
+# significant first) in uint64 so that a limb times 58^5 plus a carry
+# never overflows; 58^5 is the largest power of 58 below 2^30.
+LIMB_BITS = 32
+LIMB_MASK = (1 << LIMB_BITS) - 1
+DIGITS_PER_LIMB_STEP = 5
+BASE58_POW5 = 58**DIGITS_PER_LIMB_STEP
+
+
+def max_base58_len(width):
+    '''Upper bound of Base58 digits for a width-byte number'''
+    digits = 0
+    num = 256**width - 1
+    while num:
+        num //= 58
+        digits += 1
+    return digits
+
+
+def numpy_encode_fixed(raw_bytes_list, width):
+    '''Vectorized Base58 encoding of same-width raw strings'''
+    numpy = load_numpy()
+    rows = len(raw_bytes_list)
+    limb_count = (width + 3) // 4
+    pad = limb_count * 4 - width
+    raw = numpy.frombuffer(b''.join(raw_bytes_list), dtype=numpy.uint8)
+    raw = raw.reshape(rows, width)
+    padded = numpy.zeros((rows, limb_count * 4), dtype=numpy.uint8)
+    padded[:, pad:] = raw
+    limbs = padded.view('>u4').astype(numpy.uint64)
+    steps = -(-max_base58_len(width) // DIGITS_PER_LIMB_STEP)
+    digit_count = steps * DIGITS_PER_LIMB_STEP
+    digits = numpy.zeros((rows, digit_count), dtype=numpy.uint8)
+    for step in range(steps):
+        # Long division of every row by 58^5, the remainder holds the next
+        # five least significant digits
+        rem = numpy.zeros(rows, dtype=numpy.uint64)
+        for j in range(limb_count):
+            cur = (rem << numpy.uint64(LIMB_BITS)) | limbs[:, j]
+            quot = cur // numpy.uint64(BASE58_POW5)
+            rem = cur - quot * numpy.uint64(BASE58_POW5)
+            limbs[:, j] = quot
+        end = digit_count - step * DIGITS_PER_LIMB_STEP
+        for k in range(DIGITS_PER_LIMB_STEP):
+            digits[:, end - 1 - k] = rem % numpy.uint64(58)
+            rem //= numpy.uint64(58)
+    alphabet = numpy.frombuffer(BASE58_CHARS.encode('ascii'),
+                                dtype=numpy.uint8)
+    chars = alphabet[digits].tobytes().decode('ascii')
+    nonzero_digits = digits != 0
+    leading_digits = numpy.where(nonzero_digits.any(axis=1),
+                                 nonzero_digits.argmax(axis=1), digit_count)
+    nonzero_bytes = raw != 0
+    leading_zeros = numpy.where(nonzero_bytes.any(axis=1),
+                                nonzero_bytes.argmax(axis=1), width)
+    out = []
+    for i, (skip, zeros) in enumerate(
+            zip(leading_digits.tolist(), leading_zeros.tolist())):
+        start = i * digit_count
+        out.append('1' * zeros + chars[start + skip:start + digit_count])
+    return out
+
+
+def numpy_decode_digits(digits, width):
+    '''Vectorized decoding of a (rows, str_len) matrix of Base58 digits.
+
+    Returns (raw, valid): raw is a (rows, width) uint8 matrix and valid
+    flags the rows whose value is exactly width bytes long.
+    '''
+    numpy = load_numpy()
+    rows, str_len = digits.shape
+    valid = numpy.ones(rows, dtype=bool)
+    limb_count = (width + 3) // 4
+    limbs = numpy.zeros((rows, limb_count), dtype=numpy.uint64)
+    pad = -str_len % DIGITS_PER_LIMB_STEP
+    padded = numpy.zeros((rows, str_len + pad), dtype=numpy.uint64)
+    padded[:, pad:] = digits
+    for start in range(0, str_len + pad, DIGITS_PER_LIMB_STEP):
+        chunk = numpy.zeros(rows, dtype=numpy.uint64)
+        for k in range(DIGITS_PER_LIMB_STEP):
+            chunk = chunk * numpy.uint64(58) + padded[:, start + k]
+        # limbs = limbs * 58^5 + chunk, carrying from the least significant
+        carry = chunk
+        for j in range(limb_count - 1, -1, -1):
+            cur = limbs[:, j] * numpy.uint64(BASE58_POW5) + carry
+            limbs[:, j] = cur & numpy.uint64(LIMB_MASK)
+            carry = cur >> numpy.uint64(LIMB_BITS)
+        valid &= carry == 0
+
+    raw = limbs.astype('>u4').view(numpy.uint8).reshape(rows, limb_count * 4)
+    pad_bytes = limb_count * 4 - width
+    valid &= (raw[:, :pad_bytes] == 0).all(axis=1)
+    raw = raw[:, pad_bytes:]
+    # The leading '1' chars must account for exactly the leading zero bytes
+    nonzero_digits = digits != 0
+    leading_ones = numpy.where(nonzero_digits.any(axis=1),
+                               nonzero_digits.argmax(axis=1), str_len)
+    nonzero_bytes = raw != 0
+    leading_zeros = numpy.where(nonzero_bytes.any(axis=1),
+                                nonzero_bytes.argmax(axis=1), width)
+    valid &= leading_ones == leading_zeros
+    return raw, valid
+
+
+def numpy_digits(chars):
+    '''Map a uint8 matrix of chars to digits, also flag all-valid rows'''
+    numpy = load_numpy()
+    digits = numpy.frombuffer(BASE58_DIGITS, dtype=numpy.uint8)[chars]
+    invalid = digits == INVALID_DIGIT
+    digits[invalid] = 0
+    return digits, ~invalid.any(axis=1)
+
+
+def numpy_decode_fixed(base58_strs, str_len, width):
+    '''Vectorized decoding of same-length Base58 strings to width bytes'''
+    numpy = load_numpy()
+    rows = len(base58_strs)
+    try:
+        joined = ''.join(base58_strs).encode('ascii')
+    except UnicodeError:
+        return [decode_fixed(base58_str, width) for base58_str in base58_strs]
+    chars = numpy.frombuffer(joined, dtype=numpy.uint8).reshape(rows, str_len)
+    digits, valid = numpy_digits(chars)
+    raw, valid_len = numpy_decode_digits(digits, width)
+    valid &= valid_len
+    data = raw.tobytes()
+    return [
+        data[i * width:(i + 1) * width] if ok else None
+        for i, ok in enumerate(valid.tolist())
+    ]
@@ -0,0 +1,122 @@
+import functools
+from collections import namedtuple
+
+from .base58 import Base58
+from .constants import MAINNET, COMPRESSED, NETWORK_TYPES, PUBKEY, HEX, WIF
+from .gen_addr import PUB_KEY_POINT_FORMATS
+from .backends import points_mul_g
+from .secp256k1 import N
+from .hashes import hash160_many
+from .wif import decode_wif, priv_key_to_wif
+from .parallel import imap_chunks, DEFAULT_CHUNK_SIZE
+
+# One result per input key. Exactly one of address/error is set, wif is
+# only filled in when requested.
+DerivedAddress = namedtuple(
+    'DerivedAddress',
+    ['key', 'address', 'network_type', 'key_fmt', 'error', 'wif'])
+DerivedAddress.__new__.__defaults__ = (None, )
+
+
+def derive_chunk(parsed_keys, include_wif=False):
+    '''Derive addresses for parsed keys, sharing one affine inversion.
+
+    parsed_keys holds (key, secexp, network_type, key_fmt, error) with
+    secexp set to None when the key could not be parsed.
+    '''
+    valid = [parsed for parsed in parsed_keys if parsed[4] is None]
+    points = points_mul_g([parsed[1] for parsed in valid])
+    hash160s = iter(hash160_many([
+        PUB_KEY_POINT_FORMATS[parsed[3]](*point)
+        for parsed, point in zip(valid, points)
+    ]))
+    results = []
+    for key, secexp, network_type, key_fmt, error in parsed_keys:
+        if error is not None:
+            results.append(DerivedAddress(key, None, network_type, key_fmt,
+                                          error))
+            continue
+        bitcoin_addr = Base58.base58check(
+            NETWORK_TYPES[network_type][PUBKEY], next(hash160s))
+        priv_key_wif = None
+        if include_wif:
+            priv_key_wif = priv_key_to_wif(secexp.to_bytes(32, 'big'),
+                                           network_type, key_fmt)
+        results.append(DerivedAddress(key, bitcoin_addr, network_type,
+                                      key_fmt, None, priv_key_wif))
+    return results
+
+
+def parse_key_hex(priv_key_hex, network_type, key_fmt):
+    '''Parse a HEX key into a secret exponent, capturing any error.
+
+    Error messages never repeat the key: they end up in logs and replies.
+    '''
+    error = None
+    try:
+        secexp = int(priv_key_hex, 16)
+    except (TypeError, ValueError):
+        secexp, error = None, 'Invalid HEX private key'
+    if error is None and not 1 <= secexp < N:
+        secexp, error = None, 'Private key out of range'
+    if key_fmt not in PUB_KEY_POINT_FORMATS:
+        secexp, error = None, 'Invalid key format: %s' % key_fmt
+    if network_type not in NETWORK_TYPES:
+        secexp, error = None, 'Unsupported network type: %s' % network_type
+    return (priv_key_hex, secexp, network_type, key_fmt, error)
+
+
+def parse_key_wif(priv_key_wif):
+    '''Parse a WIF key into a secret exponent, capturing any error'''
+    decoded = decode_wif(priv_key_wif)
+    if decoded.error is not None:
+        return (priv_key_wif, None, decoded.network_type, decoded.key_fmt,
+                'Invalid WIF: %s' % decoded.error)
+    return (priv_key_wif, int.from_bytes(decoded.priv_key_raw, 'big'),
+            decoded.network_type, decoded.key_fmt, None)
+
+
+def derive_chunk_hex(network_type, key_fmt, include_wif, priv_keys_hex):
+    '''Worker: derive a chunk of HEX keys'''
+    return derive_chunk([
+        parse_key_hex(priv_key_hex, network_type, key_fmt)
+        for priv_key_hex in priv_keys_hex
+    ], include_wif)
+
+
+def derive_chunk_wif(include_wif, priv_keys_wif):
+    '''Worker: derive a chunk of WIF keys'''
+    return derive_chunk(
+        [parse_key_wif(priv_key_wif) for priv_key_wif in priv_keys_wif],
+        include_wif)
+
+
+def iter_derive_addresses(priv_keys, network_type=MAINNET, key_fmt=COMPRESSED,
+                          priv_key_fmt=HEX, workers=None,
+                          chunk_size=DEFAULT_CHUNK_SIZE, include_wif=False):
+    '''Lazily derive addresses for many private keys, in input order.
+
+    priv_keys holds HEX or WIF strings according to priv_key_fmt. For WIF
+    the network type and key format are read from each key. A bad key
+    yields a DerivedAddress with error set instead of stopping the batch.
+    The input is consumed chunk by chunk, so it may be an endless stream.
+    '''
+    if priv_key_fmt == HEX:
+        func = functools.partial(derive_chunk_hex, network_type, key_fmt,
+                                 include_wif)
+    elif priv_key_fmt == WIF:
+        func = functools.partial(derive_chunk_wif, include_wif)
+    else:
+        raise Exception('Invalid private key format: %s' % priv_key_fmt)
+    for results in imap_chunks(func, priv_keys, workers, chunk_size):
+        for result in results:
+            yield result
+
+
+def derive_addresses(priv_keys, network_type=MAINNET, key_fmt=COMPRESSED,
+                     priv_key_fmt=HEX, workers=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE):
+    '''Derive addresses for many private keys across a process pool'''
+    return list(
+        iter_derive_addresses(priv_keys, network_type, key_fmt, priv_key_fmt,
+                              workers, chunk_size))
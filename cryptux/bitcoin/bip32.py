@@ -0,0 +1,287 @@
+# BIP32 hierarchical deterministic keys
+# https://github.com/bitcoin/bips/blob/master/bip-0032.mediawiki
+#
+# Every child point is computed as IL*G + K_parent, a fixed-base table
+# multiplication plus one addition, whether the parent is private or public.
+# Sibling derivations share one inversion for the affine conversion, and the
+# nodes along the paths are kept in a bounded LRU so that scanning a chain
+# of addresses does not re-derive the path from the master key each time.
+
+import hashlib
+import hmac
+from collections import OrderedDict
+
+from .account import Account
+from .base58 import Base58
+from .constants import MAINNET, COMPRESSED, NETWORK_TYPES, XPRV, XPUB
+from .gen_addr import bitcoin_addr_from_pub_key, compressed_pub_key_from_point
+from .hashes import hash160
+from .secp256k1 import N, batch_to_affine, jacobian_add_affine
+from .secp256k1 import point_from_compressed, point_mul_g
+from .secp256k1 import point_mul_g_jacobian
+
+HARDENED = 0x80000000
+MASTER_KEY_HMAC_KEY = b'Bitcoin seed'
+# version (4) + depth (1) + fingerprint (4) + child (4) + chain code (32)
+# + key (33)
+EXTENDED_KEY_LEN = 78
+
+DEFAULT_CACHE_SIZE = 1024
+
+EXTENDED_KEY_VERSIONS = {}
+for _network_type, _prefixes in NETWORK_TYPES.items():
+    EXTENDED_KEY_VERSIONS[_prefixes[XPRV]] = (_network_type, True)
+    EXTENDED_KEY_VERSIONS[_prefixes[XPUB]] = (_network_type, False)
+
+
+def parse_path(path):
+    '''Child indexes of a path like "m/44'/0'/0'/0", hardened as ' or h'''
+    if isinstance(path, (tuple, list)):
+        return tuple(path)
+    parts = path.split('/')
+    if parts[0] == 'm':
+        parts = parts[1:]
+    indexes = []
+    for part in parts:
+        if not part:
+            continue
+        hardened = part[-1] in ("'", 'h', 'H')
+        index = int(part[:-1] if hardened else part)
+        if not 0 <= index < HARDENED:
+            raise ValueError('Child index out of range: %s' % part)
+        indexes.append(index + HARDENED if hardened else index)
+    return tuple(indexes)
+
+
+def format_path(indexes):
+    '''Reverse of parse_path'''
+    return '/'.join(['m'] + [
+        "%d'" % (index - HARDENED) if index >= HARDENED else str(index)
+        for index in indexes
+    ])
+
+
+def ckd_hmac(chain_code, data):
+    '''Split HMAC-SHA512 into the key tweak IL and the child chain code'''
+    digest = hmac.new(chain_code, data, hashlib.sha512).digest()
+    tweak = int.from_bytes(digest[:32], 'big')
+    if tweak >= N:
+        raise ValueError('Invalid child key, use the next index')
+    return tweak, digest[32:]
+
+
+class HDNode(object):
+    '''A BIP32 extended key: private when priv_key_raw is set'''
+
+    __slots__ = ('network_type', 'depth', 'parent_fingerprint',
+                 'child_number', 'chain_code', 'priv_key_raw', 'point',
+                 '_pub_key', '_identifier')
+
+    def __init__(self, network_type, depth, parent_fingerprint, child_number,
+                 chain_code, point, priv_key_raw=None):
+        self.network_type = network_type
+        self.depth = depth
+        self.parent_fingerprint = parent_fingerprint
+        self.child_number = child_number
+        self.chain_code = chain_code
+        self.point = point
+        self.priv_key_raw = priv_key_raw
+        self._pub_key = None
+        self._identifier = None
+
+    @staticmethod
+    def from_seed(seed, network_type=MAINNET):
+        '''Master node of a seed (16 to 64 bytes)'''
+        digest = hmac.new(MASTER_KEY_HMAC_KEY, seed, hashlib.sha512).digest()
+        secexp = int.from_bytes(digest[:32], 'big')
+        if not 1 <= secexp < N:
+            raise ValueError('Invalid master key, use another seed')
+        return HDNode(network_type, 0, b'\x00' * 4, 0, digest[32:],
+                      point_mul_g(secexp), digest[:32])
+
+    @staticmethod
+    def from_extended_key(extended_key):
+        '''Node of a serialized xprv/xpub (or tprv/tpub)'''
+        version, payload = Base58.base58check_decode(extended_key)
+        raw = version + payload
+        if len(raw) != EXTENDED_KEY_LEN:
+            raise Exception('Invalid extended key length: %d' % len(raw))
+        if raw[:4] not in EXTENDED_KEY_VERSIONS:
+            raise Exception('Unknown extended key version')
+        network_type, is_private = EXTENDED_KEY_VERSIONS[raw[:4]]
+        depth = raw[4]
+        child_number = int.from_bytes(raw[9:13], 'big')
+        key = raw[45:]
+        if is_private:
+            if key[0] != 0:
+                raise Exception('Invalid extended private key')
+            secexp = int.from_bytes(key[1:], 'big')
+            if not 1 <= secexp < N:
+                raise ValueError('Private key out of range')
+            point, priv_key_raw = point_mul_g(secexp), key[1:]
+        else:
+            point, priv_key_raw = point_from_compressed(key), None
+        return HDNode(network_type, depth, raw[5:9], child_number, raw[13:45],
+                      point, priv_key_raw)
+
+    @property
+    def is_private(self):
+        return self.priv_key_raw is not None
+
+    @property
+    def pub_key(self):
+        '''33-byte compressed public key - read only property'''
+        if self._pub_key is None:
+            self._pub_key = compressed_pub_key_from_point(*self.point)
+        return self._pub_key
+
+    @property
+    def identifier(self):
+        '''hash160 of the public key - read only property'''
+        if self._identifier is None:
+            self._identifier = hash160(self.pub_key)
+        return self._identifier
+
+    @property
+    def fingerprint(self):
+        return self.identifier[:4]
+
+    @property
+    def address(self):
+        '''P2PKH address of the compressed public key'''
+        return bitcoin_addr_from_pub_key(self.pub_key, self.network_type)
+
+    def serialize(self, private):
+        '''Base58Check extended key'''
+        if private:
+            if not self.is_private:
+                raise Exception('Public node has no extended private key')
+            version = NETWORK_TYPES[self.network_type][XPRV]
+            key = b'\x00' + self.priv_key_raw
+        else:
+            version = NETWORK_TYPES[self.network_type][XPUB]
+            key = self.pub_key
+        payload = (bytes([self.depth]) + self.parent_fingerprint +
+                   self.child_number.to_bytes(4, 'big') + self.chain_code +
+                   key)
+        return Base58.base58check(version, payload)
+
+    @property
+    def xprv(self):
+        return self.serialize(True)
+
+    @property
+    def xpub(self):
+        return self.serialize(False)
+
+    def neuter(self):
+        '''Public node with the same key and chain code'''
+        return HDNode(self.network_type, self.depth, self.parent_fingerprint,
+                      self.child_number, self.chain_code, self.point)
+
+    def account(self):
+        '''Account for the private key, public key reused as is'''
+        if not self.is_private:
+            raise Exception('Public node has no private key')
+        p_x, p_y = self.point
+        return Account(self.priv_key_raw, self.network_type, COMPRESSED,
+                       p_x.to_bytes(32, 'big') + p_y.to_bytes(32, 'big'))
+
+    def ckd_tweak(self, index):
+        '''(IL, child chain code) for child index'''
+        if index >= HARDENED:
+            if not self.is_private:
+                raise Exception('Hardened derivation needs a private key')
+            data = b'\x00' + self.priv_key_raw
+        else:
+            data = self.pub_key
+        return ckd_hmac(self.chain_code, data + index.to_bytes(4, 'big'))
+
+    def child(self, index):
+        '''Child node at index, private if this node is'''
+        return self.children(index, 1)[0]
+
+    def children(self, start, count):
+        '''Nodes of the children start .. start+count-1 in one batch'''
+        tweaks = [self.ckd_tweak(index) for index in range(start,
+                                                           start + count)]
+        p_x, p_y = self.point
+        points = batch_to_affine([
+            jacobian_add_affine(point_mul_g_jacobian(tweak), p_x, p_y)
+            for tweak, _ in tweaks
+        ])
+        secexp = self.is_private and int.from_bytes(self.priv_key_raw, 'big')
+        nodes = []
+        for index, (tweak, chain_code), point in zip(
+                range(start, start + count), tweaks, points):
+            priv_key_raw = None
+            if secexp:
+                child_secexp = (tweak + secexp) % N
+                if not child_secexp:
+                    raise ValueError('Invalid child key, use the next index')
+                priv_key_raw = child_secexp.to_bytes(32, 'big')
+            nodes.append(HDNode(self.network_type, self.depth + 1,
+                                self.fingerprint, index, chain_code, point,
+                                priv_key_raw))
+        return nodes
+
+
+class HDKeychain(object):
+    '''BIP32 derivation from a root node with an LRU of derived nodes'''
+
+    def __init__(self, root, cache_size=DEFAULT_CACHE_SIZE):
+        self.root = root
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    @staticmethod
+    def from_seed(seed, network_type=MAINNET, cache_size=DEFAULT_CACHE_SIZE):
+        return HDKeychain(HDNode.from_seed(seed, network_type), cache_size)
+
+    @staticmethod
+    def from_extended_key(extended_key, cache_size=DEFAULT_CACHE_SIZE):
+        return HDKeychain(HDNode.from_extended_key(extended_key), cache_size)
+
+    def _cached(self, indexes):
+        node = self._cache.get(indexes)
+        if node is not None:
+            self._cache.move_to_end(indexes)
+        return node
+
+    def _store(self, indexes, node):
+        self._cache[indexes] = node
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def node(self, path):
+        '''Node at path, relative to the root, derived from the deepest
+        cached ancestor'''
+        indexes = parse_path(path)
+        depth, node = len(indexes), None
+        while depth and node is None:
+            node = self._cached(indexes[:depth])
+            if node is None:
+                depth -= 1
+        if node is None:
+            node = self.root
+        for depth in range(depth, len(indexes)):
+            node = node.child(indexes[depth])
+            self._store(indexes[:depth + 1], node)
+        return node
+
+    def derive_range(self, path_prefix, start, count):
+        '''Addresses of the children start .. start+count-1 of path_prefix.
+
+        The parent comes from the cache and the children are derived in one
+        batch without being cached, so long scans keep their parents hot.
+        '''
+        parent = self.node(path_prefix)
+        network_type = parent.network_type
+        return [
+            bitcoin_addr_from_pub_key(
+                compressed_pub_key_from_point(*child.point), network_type)
+            for child in parent.children(start, count)
+        ]
+
+    def clear_cache(self):
+        self._cache.clear()
@@ -0,0 +1,113 @@
+# Async client of the local service, see service.py
+#
+# One connection carries any number of concurrent calls: requests are
+# written as they come and replies are matched back by id, so that the
+# service can batch them together.
+
+import asyncio
+import itertools
+import json
+
+from .constants import MAINNET, COMPRESSED, HEX
+
+
+class ServiceClient(object):
+    '''Connection to a service listening on a Unix socket'''
+
+    def __init__(self, path):
+        self.path = path
+        self._reader = None
+        self._writer = None
+        self._reply_reader = None
+        self._pending = {}
+        self._ids = itertools.count(1)
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_unix_connection(
+            self.path)
+        self._reply_reader = asyncio.ensure_future(self._read_replies())
+        return self
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._reply_reader is not None:
+            self._reply_reader.cancel()
+            try:
+                await self._reply_reader
+            except asyncio.CancelledError:
+                pass
+            self._reply_reader = None
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _read_replies(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                reply = json.loads(line.decode('utf-8'))
+                future = self._pending.pop(reply.get('id'), None)
+                if future is None or future.done():
+                    continue
+                if 'error' in reply:
+                    future.set_exception(Exception('%s (%d)' % (
+                        reply['error']['message'], reply['error']['code'])))
+                else:
+                    future.set_result(reply['result'])
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(Exception('Connection closed'))
+            self._pending.clear()
+
+    async def call(self, method, **params):
+        '''Result of a JSON-RPC call, raises with the service error'''
+        if self._writer is None:
+            raise Exception('Not connected')
+        request_id = next(self._ids)
+        future = asyncio.get_event_loop().create_future()
+        self._pending[request_id] = future
+        self._writer.write(json.dumps({
+            'jsonrpc': '2.0', 'id': request_id, 'method': method,
+            'params': params}).encode('utf-8') + b'\n')
+        await self._writer.drain()
+        return await future
+
+    async def derive_address(self, priv_key, priv_key_fmt=HEX,
+                             network_type=MAINNET, key_fmt=COMPRESSED):
+        '''{address, network_type, key_fmt, wif} of a HEX or WIF key'''
+        return await self.call('derive_address', priv_key=priv_key,
+                               priv_key_fmt=priv_key_fmt,
+                               network_type=network_type, key_fmt=key_fmt)
+
+    async def import_wif(self, priv_key_wif):
+        '''{priv_key_hex, address, network_type, key_fmt, wif} of a WIF'''
+        return await self.call('import_wif', wif=priv_key_wif)
+
+    async def export_wif(self, priv_key_hex, network_type=MAINNET,
+                         key_fmt=COMPRESSED):
+        '''WIF of a HEX private key'''
+        return await self.call('export_wif', priv_key_hex=priv_key_hex,
+                               network_type=network_type, key_fmt=key_fmt)
+
+    async def verify_bitcoin_addr(self, bitcoin_addr):
+        '''Is the address checksum valid?'''
+        return await self.call('verify_bitcoin_addr', address=bitcoin_addr)
+
+    async def p2sh_addr_hex(self, redeem_script_hex, network_type=MAINNET):
+        '''Pay-to-script-hash address of a HEX redeem script'''
+        return await self.call('p2sh_addr_hex',
+                               redeem_script_hex=redeem_script_hex,
+                               network_type=network_type)
+
+
+async def open_client(path):
+    '''Connected ServiceClient'''
+    return await ServiceClient(path).connect()
@@ -5,16 +5,37 @@ TESTNET = 'TESTNET'
 PUBKEY = 'PUBKEY'
 PRIVKEY = 'PRIVKEY'
 P2SH = 'P2SH'
+XPRV = 'XPRV'
+XPUB = 'XPUB'
+
+# Private key formats
+HEX = 'HEX'
+WIF = 'WIF'
+
+# Signature formats
+DER = 'DER'
+COMPACT = 'COMPACT'
+
+# Keystore key derivation rounds
+DEFAULT_PBKDF2_ITERATIONS = 200000
+
+# Work is shipped to the worker processes in chunks so that the pickling
+# and IPC overhead is paid once per chunk instead of once per key.
+DEFAULT_CHUNK_SIZE = 1000
 
 NETWORK_TYPES = {
     MAINNET: {
         PUBKEY: b'\x00',
         PRIVKEY: b'\x80',
         P2SH: b'\x05',
+        XPRV: b'\x04\x88\xAD\xE4',
+        XPUB: b'\x04\x88\xB2\x1E',
     },
     TESTNET: {
         PUBKEY: b'\x6F',
         PRIVKEY: b'\xEF',
         P2SH: b'\xC4',
+        XPRV: b'\x04\x35\x83\x94',
+        XPUB: b'\x04\x35\x87\xCF',
     },
 }
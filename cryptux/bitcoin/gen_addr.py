@@ -3,13 +3,14 @@
 # https://docs.python.org/3/library/hashlib.html
 # Terminal: openssl ecparam -list_curves | grep -i secp256k1
 
-from ecdsa import SigningKey, SECP256k1
-from binascii import hexlify, unhexlify
+from binascii import unhexlify
 from .constants import UNCOMPRESSED, COMPRESSED, MAINNET, TESTNET
-from .constants import PUBKEY, PRIVKEY, P2SH
+from .constants import PUBKEY, P2SH
 from cryptux.bitcoin.constants import NETWORK_TYPES
 from cryptux.bitcoin.hashes import hash160, hash256
 from .base58 import Base58
+from .backends import pub_key_from_secexp, points_mul_g
+from .wif import decode_wif
 
 # http://www.secg.org/sec1-v2.pdf - Section 2.3.3
 # https://tools.ietf.org/html/rfc5480 - Section 2.2
@@ -40,9 +41,7 @@ def get_compressed_pub_key(pub_key_raw):
     '''Represent public key in the compressed format'''
     assert len(pub_key_raw) == 64
     p_x = pub_key_raw[:32]
-    p_y = pub_key_raw[32:]
-    p_y_num = int(hexlify(p_y), 16)
-    prefix = b'\x03' if p_y_num % 2 else b'\x02'
+    prefix = b'\x03' if pub_key_raw[63] & 1 else b'\x02'
     compressed_pub_key = prefix + p_x
     assert len(compressed_pub_key) == 33
     return compressed_pub_key
@@ -58,11 +57,27 @@ def get_uncompressed_pub_key(pub_key_raw):
     return full_pub_key
 
 
+def compressed_pub_key_from_point(p_x, p_y):
+    '''Compressed public key straight from the affine coordinates'''
+    prefix = b'\x03' if p_y & 1 else b'\x02'
+    return prefix + p_x.to_bytes(32, 'big')
+
+
+def uncompressed_pub_key_from_point(p_x, p_y):
+    '''Uncompressed public key straight from the affine coordinates'''
+    return b'\x04' + p_x.to_bytes(32, 'big') + p_y.to_bytes(32, 'big')
+
+
 PUB_KEY_FORMATS = {
     COMPRESSED: get_compressed_pub_key,
     UNCOMPRESSED: get_uncompressed_pub_key,
 }
 
+PUB_KEY_POINT_FORMATS = {
+    COMPRESSED: compressed_pub_key_from_point,
+    UNCOMPRESSED: uncompressed_pub_key_from_point,
+}
+
 
 def guess_wif_details(priv_key_wif):
     '''Deduce details of WIF private key'''
@@ -82,9 +97,29 @@ def guess_wif_details(priv_key_wif):
 def pub_key_from_priv_key_hex(priv_key_hex):
     '''Obtain public key from the private key in HEX'''
     secexp = int(priv_key_hex, 16)
-    signing_key = SigningKey.from_secret_exponent(secexp, curve=SECP256k1)
-    vk = signing_key.get_verifying_key()
-    return vk.to_string()
+    return pub_key_from_secexp(secexp)
+
+
+def pub_keys_from_secexps(secexps, key_fmt):
+    '''Formatted public keys for many secret exponents at once'''
+    # All points share a single modular inversion for the affine conversion
+    fmt_point = PUB_KEY_POINT_FORMATS[key_fmt]
+    return [fmt_point(p_x, p_y) for p_x, p_y in points_mul_g(secexps)]
+
+
+def pub_keys_from_priv_keys_hex(priv_keys_hex, key_fmt):
+    '''Formatted public keys for many private keys in HEX'''
+    secexps = [int(priv_key_hex, 16) for priv_key_hex in priv_keys_hex]
+    return pub_keys_from_secexps(secexps, key_fmt)
+
+
+def bitcoin_addrs_from_priv_keys_hex(priv_keys_hex, network_type, key_fmt):
+    '''Create Bitcoin addresses for many private keys in HEX'''
+    return [
+        bitcoin_addr_from_pub_key(pub_key_formatted, network_type)
+        for pub_key_formatted in pub_keys_from_priv_keys_hex(
+            priv_keys_hex, key_fmt)
+    ]
 
 
 def bitcoin_addr_from_priv_key_hex(priv_key_hex, network_type, key_fmt):
@@ -97,36 +132,18 @@ def bitcoin_addr_from_priv_key_hex(priv_key_hex, network_type, key_fmt):
 
 def priv_key_from_wif(priv_key_wif):
     '''Extract raw private key from the WIF string'''
-    wif_details = guess_wif_details(priv_key_wif)
-    network_type = wif_details['network_type']
-    key_fmt = wif_details['key_fmt']
-    decoded_wif = Base58.to_base256(priv_key_wif)
-    # Verify the WIF string
-    if key_fmt == COMPRESSED:
-        assert len(decoded_wif) == 38
-        network_prefix, priv_key_raw = decoded_wif[0:1], decoded_wif[1:33]
-        padding, checksum = decoded_wif[33:34], decoded_wif[34:]
-        payload = decoded_wif[:34]
-        assert padding == b'\x01'
-    elif key_fmt == UNCOMPRESSED:
-        assert len(decoded_wif) == 37
-        payload = decoded_wif[:33]
-        checksum = decoded_wif[33:]
-        network_prefix, priv_key_raw = payload[:1], payload[1:]
-    else:
-        raise Exception('Invalid key format: %s' % key_fmt)
-    assert network_prefix == NETWORK_TYPES[network_type][PRIVKEY]
-    assert hash256(payload)[:4] == checksum
-    return (priv_key_raw, network_type, key_fmt)
+    decoded = decode_wif(priv_key_wif)
+    if decoded.error is not None:
+        # The error code only: the string may be a key with a typo
+        raise Exception('Invalid WIF: %s' % decoded.error)
+    return (decoded.priv_key_raw, decoded.network_type, decoded.key_fmt)
 
 
 def pub_key_from_priv_key_wif(priv_key_wif):
     '''Obtain public key from the private key in WIF'''
     # Obtain the raw public key from raw private key
     priv_key_raw, network_type, key_fmt = priv_key_from_wif(priv_key_wif)
-    signing_key = SigningKey.from_string(priv_key_raw, curve=SECP256k1)
-    vk = signing_key.get_verifying_key()
-    pub_key_raw = vk.to_string()
+    pub_key_raw = pub_key_from_secexp(int.from_bytes(priv_key_raw, 'big'))
     return (pub_key_raw, network_type, key_fmt)
 
 
@@ -153,8 +170,12 @@ def bitcoin_addr_from_pub_key(pub_key_formatted, network_type):
 
 def verify_bitcoin_addr(bitcoin_addr):
     '''Verify Bitcoin address'''
-    bitcoin_addr_raw = Base58.to_base256(bitcoin_addr)
-    assert len(bitcoin_addr_raw) == 25
+    try:
+        bitcoin_addr_raw = Base58.to_base256(bitcoin_addr)
+    except Exception:
+        return False
+    if len(bitcoin_addr_raw) != 25:
+        return False
     fmt_pubkey_hash = bitcoin_addr_raw[:21]
     checksum_4bytes = bitcoin_addr_raw[21:]
 
@@ -1,11 +1,22 @@
 import hashlib
 
+from .backends import ripemd160, ripemd160_many
+
 
 def hash160(in_bytes):
     '''Performs RIPEMD160(SHA256(in_bytes)) and returns raw digest'''
-    ripemd160_hasher = hashlib.new('ripemd160')
-    ripemd160_hasher.update(hashlib.sha256(in_bytes).digest())
-    return ripemd160_hasher.digest()
+    return ripemd160(hashlib.sha256(in_bytes).digest())
+
+
+def hash160_many(in_bytes_list):
+    '''hash160 of many inputs, such as 33/65-byte public keys.
+
+    Every RIPEMD-160 input is a 32-byte SHA-256 digest, which the builtin
+    backend hashes as one vectorized batch when NumPy is installed.
+    '''
+    sha256 = hashlib.sha256
+    return ripemd160_many([sha256(in_bytes).digest()
+                           for in_bytes in in_bytes_list])
 
 
 def hash256(in_bytes):
@@ -0,0 +1,435 @@
+import hashlib
+import hmac
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from collections import namedtuple
+
+from .account import Account
+from .base58 import Base58
+from .constants import MAINNET, TESTNET, COMPRESSED, UNCOMPRESSED
+from .constants import NETWORK_TYPES, PUBKEY, DEFAULT_PBKDF2_ITERATIONS
+
+# On-disk layout of a keystore, two files read through mmaps:
+#   <path>       header | fixed-size account records, append-only
+#   <path>.idx   header | open-addressing hash table hash160 -> record
+# Private keys are encrypted with a keystream derived from the passphrase
+# (PBKDF2) and a random nonce per record, and authenticated with an HMAC
+# tag. Every record carries a CRC32, so a torn append at the end of the
+# file is detected and dropped. The index only caches what the records
+# hold: it is caught up or rebuilt from them whenever it lags behind.
+KEYSTORE_MAGIC = b'CRYPTUXK'
+KEYSTORE_VERSION = 1
+# magic, version, PBKDF2 iterations, salt, passphrase check
+KEYSTORE_HEADER = struct.Struct('>8sHI16s16s')
+# network, key format, nonce, encrypted private key, raw public key,
+# hash160, tag, CRC32 of everything before it
+RECORD = struct.Struct('>BB8s32s64s20s16sI')
+HASH160_OFFSET = struct.calcsize('>BB8s32s64s')
+
+INDEX_MAGIC = b'CRYPTUXI'
+INDEX_VERSION = 1
+# magic, version, salt of the keystore, slot count, records indexed
+INDEX_HEADER = struct.Struct('>8sH16sQQ')
+# Last 8 bytes of the hash160, record number + 1 (0 for an empty slot).
+# The first 8 bytes pick the slot, a full match is checked on the record.
+INDEX_SLOT = struct.Struct('>8sI')
+INDEX_SUFFIX = '.idx'
+DEFAULT_INDEX_SLOTS = 1 << 16
+# The table doubles when more than half full, keeping probe chains short
+MAX_INDEX_LOAD = 0.5
+
+SALT_LEN = 16
+NONCE_LEN = 8
+TAG_LEN = 16
+
+NETWORK_CODES = (MAINNET, TESTNET)
+KEY_FMT_CODES = (COMPRESSED, UNCOMPRESSED)
+
+# Public part of a record, readable without the passphrase
+KeyRecord = namedtuple(
+    'KeyRecord', ['network_type', 'key_fmt', 'pub_key_raw', 'hash160'])
+
+
+def derive_keys(passphrase, salt, iterations):
+    '''(encryption key, MAC key) of a passphrase'''
+    if not isinstance(passphrase, bytes):
+        passphrase = passphrase.encode('utf-8')
+    master = hashlib.pbkdf2_hmac('sha256', passphrase, salt, iterations, 64)
+    return master[:32], master[32:]
+
+
+def passphrase_check(mac_key):
+    '''Tag stored in the header to recognize the right passphrase'''
+    return hmac.new(mac_key, b'passphrase', hashlib.sha256).digest()[:TAG_LEN]
+
+
+def xor_keystream(enc_key, nonce, data):
+    '''Encrypt or decrypt 32 bytes with HMAC-SHA256(key, nonce)'''
+    keystream = hmac.new(enc_key, nonce, hashlib.sha256).digest()
+    return (int.from_bytes(data, 'big') ^
+            int.from_bytes(keystream, 'big')).to_bytes(32, 'big')
+
+
+def record_tag(mac_key, network_code, key_fmt_code, nonce, priv_key_enc,
+               pub_key_raw, hash160):
+    '''MAC of every field of a record, checked before decrypting'''
+    return hmac.new(mac_key, bytes([network_code, key_fmt_code]) + nonce +
+                    priv_key_enc + pub_key_raw + hash160,
+                    hashlib.sha256).digest()[:TAG_LEN]
+
+
+def pack_record(account, enc_key, mac_key):
+    '''Fixed-size record of an account'''
+    network_code = NETWORK_CODES.index(account.network_type)
+    key_fmt_code = KEY_FMT_CODES.index(account.key_fmt)
+    nonce = os.urandom(NONCE_LEN)
+    priv_key_enc = xor_keystream(enc_key, nonce, account.priv_key_raw)
+    pub_key_raw, hash160 = account.pub_key_raw, account.hash160
+    tag = record_tag(mac_key, network_code, key_fmt_code, nonce,
+                     priv_key_enc, pub_key_raw, hash160)
+    body = RECORD.pack(network_code, key_fmt_code, nonce, priv_key_enc,
+                       pub_key_raw, hash160, tag, 0)[:-4]
+    return body + struct.pack('>I', zlib.crc32(body))
+
+
+def record_is_intact(raw):
+    '''Does the CRC of a record match, i.e. was it fully written?'''
+    return zlib.crc32(raw[:-4]) == struct.unpack('>I', raw[-4:])[0]
+
+
+def index_path_of(path):
+    return path + INDEX_SUFFIX
+
+
+def slot_of(hash160, slot_count):
+    '''First probe of a hash160, already uniformly distributed'''
+    return int.from_bytes(hash160[:8], 'little') & (slot_count - 1)
+
+
+def index_table(salt, slot_count, entries, record_count):
+    '''Header and slots of an index of (hash160, record number) entries'''
+    table = bytearray(INDEX_HEADER.size + slot_count * INDEX_SLOT.size)
+    INDEX_HEADER.pack_into(table, 0, INDEX_MAGIC, INDEX_VERSION, salt,
+                           slot_count, record_count)
+    for hash160, record_no in entries:
+        slot = slot_of(hash160, slot_count)
+        while INDEX_SLOT.unpack_from(
+                table, INDEX_HEADER.size + slot * INDEX_SLOT.size)[1]:
+            slot = (slot + 1) & (slot_count - 1)
+        INDEX_SLOT.pack_into(table, INDEX_HEADER.size +
+                             slot * INDEX_SLOT.size, hash160[12:],
+                             record_no + 1)
+    return table
+
+
+def write_index(index_path, salt, slot_count, entries, record_count):
+    '''Write a fresh index of (hash160, record number) entries atomically'''
+    table = index_table(salt, slot_count, entries, record_count)
+    directory = os.path.dirname(os.path.abspath(index_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as tmp_fd:
+            tmp_fd.write(table)
+        os.rename(tmp_path, index_path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+class Keystore(object):
+    '''Append-only file of encrypted accounts, indexed by hash160.
+
+    Opening maps the files and reads two headers, whatever the number of
+    accounts. Without a passphrase only the public part of the records is
+    available.
+    '''
+
+    def __init__(self, path, passphrase=None, writable=False):
+        '''Open a keystore created by Keystore.create'''
+        self.path = path
+        self.writable = writable
+        self._fd = open(path, 'r+b' if writable else 'rb')
+        self._mm = self._index_fd = self._index_mm = None
+        try:
+            header = self._fd.read(KEYSTORE_HEADER.size)
+            if len(header) != KEYSTORE_HEADER.size:
+                raise Exception('Not a keystore: %s' % path)
+            magic, version, self.iterations, self.salt, check = (
+                KEYSTORE_HEADER.unpack(header))
+            if (magic, version) != (KEYSTORE_MAGIC, KEYSTORE_VERSION):
+                raise Exception('Not a keystore: %s' % path)
+            self._enc_key = self._mac_key = None
+            if passphrase is not None:
+                self._enc_key, self._mac_key = derive_keys(
+                    passphrase, self.salt, self.iterations)
+                if not hmac.compare_digest(passphrase_check(self._mac_key),
+                                           check):
+                    raise Exception('Wrong keystore passphrase')
+            self._recover_tail()
+            self._map()
+            self._open_index()
+        except Exception:
+            self.close()
+            raise
+
+    @staticmethod
+    def create(path, passphrase, iterations=DEFAULT_PBKDF2_ITERATIONS,
+               index_slots=DEFAULT_INDEX_SLOTS):
+        '''Create an empty keystore and open it for appending'''
+        if index_slots & (index_slots - 1):
+            raise ValueError('Index slots must be a power of 2')
+        salt = os.urandom(SALT_LEN)
+        _, mac_key = derive_keys(passphrase, salt, iterations)
+        with open(path, 'xb') as fd:
+            fd.write(KEYSTORE_HEADER.pack(KEYSTORE_MAGIC, KEYSTORE_VERSION,
+                                          iterations, salt,
+                                          passphrase_check(mac_key)))
+            fd.flush()
+            os.fsync(fd.fileno())
+        write_index(index_path_of(path), salt, index_slots, [], 0)
+        return Keystore(path, passphrase, writable=True)
+
+    def _recover_tail(self):
+        '''Count the intact records, dropping a torn last append'''
+        size = os.fstat(self._fd.fileno()).st_size
+        count = (size - KEYSTORE_HEADER.size) // RECORD.size
+        while count:
+            self._fd.seek(KEYSTORE_HEADER.size + (count - 1) * RECORD.size)
+            if record_is_intact(self._fd.read(RECORD.size)):
+                break
+            count -= 1
+        self.record_count = count
+        end = KEYSTORE_HEADER.size + count * RECORD.size
+        if self.writable and size != end:
+            self._fd.truncate(end)
+            os.fsync(self._fd.fileno())
+
+    def _map(self):
+        if self._mm is not None:
+            self._mm.close()
+        self._mm = mmap.mmap(self._fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _open_index(self):
+        '''Map the index, catching it up with the records or rebuilding it'''
+        index_path = index_path_of(self.path)
+        try:
+            self._map_index(index_path)
+        except Exception:
+            self._close_index()
+            self.rebuild_index()
+            return
+        if self.indexed < self.record_count:
+            if self.writable:
+                self._index_records(self.indexed, self.record_count)
+            else:
+                self._unindexed = self.record_count - self.indexed
+
+    def _map_index(self, index_path):
+        self._index_fd = open(index_path, 'r+b' if self.writable else 'rb')
+        self._index_mm = mmap.mmap(
+            self._index_fd.fileno(), 0,
+            access=mmap.ACCESS_WRITE if self.writable else mmap.ACCESS_READ)
+        magic, version, salt, self.slot_count, self.indexed = (
+            INDEX_HEADER.unpack_from(self._index_mm))
+        if ((magic, version, salt) != (INDEX_MAGIC, INDEX_VERSION, self.salt)
+                or len(self._index_mm) != INDEX_HEADER.size +
+                self.slot_count * INDEX_SLOT.size
+                or self.indexed > self.record_count):
+            raise Exception('Stale keystore index: %s' % index_path)
+        self._unindexed = 0
+
+    def _close_index(self):
+        # The in-memory table of a read-only open has no file to release
+        if self._index_fd is not None:
+            if self._index_mm is not None:
+                self._index_mm.close()
+            self._index_fd.close()
+        self._index_mm = self._index_fd = None
+
+    def rebuild_index(self, slot_count=None):
+        '''Rewrite the index from the records, only in memory when the
+        keystore is read-only'''
+        if slot_count is None:
+            slot_count = DEFAULT_INDEX_SLOTS
+            while self.record_count > slot_count * MAX_INDEX_LOAD:
+                slot_count <<= 1
+        self._close_index()
+        entries = ((self.record_hash160(record_no), record_no)
+                   for record_no in range(self.record_count))
+        if not self.writable:
+            self._index_mm = index_table(self.salt, slot_count, entries,
+                                         self.record_count)
+            self.slot_count, self.indexed = slot_count, self.record_count
+            self._unindexed = 0
+            return
+        write_index(index_path_of(self.path), self.salt, slot_count,
+                    entries, self.record_count)
+        self._map_index(index_path_of(self.path))
+
+    def _index_records(self, start, end):
+        '''Insert records [start, end) in the index, growing it as needed'''
+        if end > self.slot_count * MAX_INDEX_LOAD:
+            slot_count = self.slot_count
+            while end > slot_count * MAX_INDEX_LOAD:
+                slot_count <<= 1
+            self.rebuild_index(slot_count)
+            return
+        mm = self._index_mm
+        mask = self.slot_count - 1
+        for record_no in range(start, end):
+            hash160 = self.record_hash160(record_no)
+            slot = slot_of(hash160, self.slot_count)
+            while True:
+                offset = INDEX_HEADER.size + slot * INDEX_SLOT.size
+                entry = INDEX_SLOT.unpack_from(mm, offset)[1]
+                # A crash may have left this record's slot without the count
+                if not entry or entry == record_no + 1:
+                    break
+                slot = (slot + 1) & mask
+            INDEX_SLOT.pack_into(mm, offset, hash160[12:], record_no + 1)
+        # The count goes last: a slot written before a crash is found again
+        self.indexed = end
+        INDEX_HEADER.pack_into(mm, 0, INDEX_MAGIC, INDEX_VERSION, self.salt,
+                               self.slot_count, end)
+        mm.flush()
+
+    def __len__(self):
+        return self.record_count
+
+    def _record(self, record_no):
+        if not 0 <= record_no < self.record_count:
+            raise IndexError('Keystore record out of range: %d' % record_no)
+        return RECORD.unpack_from(self._mm, KEYSTORE_HEADER.size +
+                                  record_no * RECORD.size)
+
+    def record_hash160(self, record_no):
+        '''hash160 of a record number, read without unpacking the record'''
+        offset = (KEYSTORE_HEADER.size + record_no * RECORD.size +
+                  HASH160_OFFSET)
+        return self._mm[offset:offset + 20]
+
+    def record(self, record_no):
+        '''KeyRecord of a record number'''
+        network_code, key_fmt_code, _, _, pub_key_raw, hash160, _, _ = (
+            self._record(record_no))
+        return KeyRecord(NETWORK_CODES[network_code],
+                         KEY_FMT_CODES[key_fmt_code], pub_key_raw, hash160)
+
+    def account(self, record_no):
+        '''Decrypted Account of a record number'''
+        if self._enc_key is None:
+            raise Exception('Keystore opened without a passphrase')
+        (network_code, key_fmt_code, nonce, priv_key_enc, pub_key_raw,
+         hash160, tag, _) = self._record(record_no)
+        if not hmac.compare_digest(
+                record_tag(self._mac_key, network_code, key_fmt_code, nonce,
+                           priv_key_enc, pub_key_raw, hash160), tag):
+            raise Exception('Keystore record %d failed authentication' %
+                            record_no)
+        account = Account(xor_keystream(self._enc_key, nonce, priv_key_enc),
+                          NETWORK_CODES[network_code],
+                          KEY_FMT_CODES[key_fmt_code], pub_key_raw)
+        account._hash160 = hash160
+        return account
+
+    def find_hash160(self, hash160, network_type=None):
+        '''Record numbers holding hash160, on a network if given'''
+        found = []
+        slot = slot_of(hash160, self.slot_count)
+        mm = self._index_mm
+        while True:
+            fingerprint, entry = INDEX_SLOT.unpack_from(
+                mm, INDEX_HEADER.size + slot * INDEX_SLOT.size)
+            if not entry:
+                break
+            if (fingerprint == hash160[12:] and
+                    self.record_hash160(entry - 1) == hash160):
+                found.append(entry - 1)
+            slot = (slot + 1) & (self.slot_count - 1)
+        # Read-only opens scan the few records the index lags behind
+        for record_no in range(self.indexed,
+                               self.indexed + self._unindexed):
+            if self.record_hash160(record_no) == hash160:
+                found.append(record_no)
+        if network_type is not None:
+            network_code = NETWORK_CODES.index(network_type)
+            found = [record_no for record_no in found
+                     if self._record(record_no)[0] == network_code]
+        return found
+
+    def find(self, bitcoin_addr):
+        '''Record number of an address, -1 if absent'''
+        try:
+            version, payload = Base58.base58check_decode(bitcoin_addr)
+        except Exception:
+            return -1
+        for network_type in NETWORK_CODES:
+            if NETWORK_TYPES[network_type][PUBKEY] == version:
+                found = self.find_hash160(payload, network_type)
+                return found[0] if found else -1
+        return -1
+
+    def __contains__(self, bitcoin_addr):
+        return self.find(bitcoin_addr) >= 0
+
+    def get(self, bitcoin_addr):
+        '''Decrypted Account of an address, None if absent'''
+        record_no = self.find(bitcoin_addr)
+        return self.account(record_no) if record_no >= 0 else None
+
+    def iter_records(self):
+        '''Stream the KeyRecord of every account, in append order'''
+        view = memoryview(self._mm)[KEYSTORE_HEADER.size:KEYSTORE_HEADER.size +
+                                    self.record_count * RECORD.size]
+        try:
+            for (network_code, key_fmt_code, _, _, pub_key_raw, hash160, _,
+                 _) in RECORD.iter_unpack(view):
+                yield KeyRecord(NETWORK_CODES[network_code],
+                                KEY_FMT_CODES[key_fmt_code], pub_key_raw,
+                                hash160)
+        finally:
+            view.release()
+
+    def __iter__(self):
+        '''Stream the decrypted Accounts, in append order'''
+        for record_no in range(self.record_count):
+            yield self.account(record_no)
+
+    def extend(self, accounts):
+        '''Append accounts, durable once this returns'''
+        if not self.writable or self._enc_key is None:
+            raise Exception('Keystore not opened for appending')
+        records = b''.join(pack_record(account, self._enc_key, self._mac_key)
+                           for account in accounts)
+        if not records:
+            return
+        self._fd.seek(KEYSTORE_HEADER.size + self.record_count * RECORD.size)
+        self._fd.write(records)
+        self._fd.flush()
+        os.fsync(self._fd.fileno())
+        start = self.record_count
+        self.record_count += len(records) // RECORD.size
+        self._map()
+        self._index_records(start, self.record_count)
+
+    def append(self, account):
+        '''Append one account, returns its record number'''
+        self.extend([account])
+        return self.record_count - 1
+
+    def close(self):
+        '''Release the mappings and the files'''
+        self._close_index()
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._fd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
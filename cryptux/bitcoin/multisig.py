@@ -0,0 +1,154 @@
+# m-of-n multisig redeem scripts and their P2SH addresses
+# https://github.com/bitcoin/bips/blob/master/bip-0016.mediawiki
+# https://github.com/bitcoin/bips/blob/master/bip-0067.mediawiki
+#
+#   redeemScript: OP_m <pubkey 1> ... <pubkey n> OP_n OP_CHECKMULTISIG
+#
+# For combinations over a pool of cosigners every key is encoded once, and
+# the pool is sorted once (BIP67), so that the combinations in order are
+# already sorted scripts. Consecutive combinations share all keys but the
+# last: the SHA-256 state of that shared part is computed once and copied.
+
+import functools
+import hashlib
+import itertools
+from binascii import unhexlify
+from collections import namedtuple
+
+from .backends import ripemd160_many
+from .base58 import Base58
+from .constants import MAINNET, NETWORK_TYPES, P2SH
+from .gen_addr import get_compressed_pub_key
+from .hashes import hash160
+from .parallel import cpu_count, imap_chunks
+
+# OP_1 to OP_16 push the numbers 1 to 16
+OP_1 = 0x51
+OP_CHECKMULTISIG = 0xAE
+MAX_MULTISIG_KEYS = 16
+# Consensus limit of a P2SH redeem script, 15 compressed keys at most
+MAX_REDEEM_SCRIPT_SIZE = 520
+PUB_KEY_CACHE_SIZE = 4096
+DEFAULT_MULTISIG_CHUNK_SIZE = 2000
+
+# key_indices are positions in the pool, in script order
+MultisigAddress = namedtuple('MultisigAddress', ['key_indices', 'address'])
+
+
+@functools.lru_cache(maxsize=PUB_KEY_CACHE_SIZE)
+def pub_key_push(pub_key, compress=True):
+    '''Script push of a public key: raw, compressed or uncompressed bytes
+    or HEX. Raw 64-byte and uncompressed keys are compressed if asked.'''
+    if isinstance(pub_key, str):
+        pub_key = unhexlify(pub_key)
+    if len(pub_key) == 65 and pub_key[0] == 0x04:
+        if compress:
+            pub_key = get_compressed_pub_key(pub_key[1:])
+    elif len(pub_key) == 64:
+        pub_key = (get_compressed_pub_key(pub_key) if compress
+                   else b'\x04' + pub_key)
+    elif len(pub_key) != 33 or pub_key[0] not in (0x02, 0x03):
+        raise Exception('Invalid public key: %s' % pub_key.hex())
+    return bytes([len(pub_key)]) + pub_key
+
+
+def check_m_n(m, n):
+    if not 1 <= m <= n <= MAX_MULTISIG_KEYS:
+        raise ValueError('Invalid multisig %d-of-%d' % (m, n))
+
+
+def script_prefix_suffix(m, n):
+    '''OP_m, and OP_n OP_CHECKMULTISIG'''
+    return bytes([OP_1 - 1 + m]), bytes([OP_1 - 1 + n, OP_CHECKMULTISIG])
+
+
+def multisig_redeem_script(m, pub_keys, sort=True, compress=True):
+    '''OP_m <pub_keys> OP_n OP_CHECKMULTISIG, keys sorted per BIP67'''
+    check_m_n(m, len(pub_keys))
+    pushes = [pub_key_push(pub_key, compress) for pub_key in pub_keys]
+    if sort:
+        pushes.sort(key=lambda push: push[1:])
+    prefix, suffix = script_prefix_suffix(m, len(pub_keys))
+    redeem_script = prefix + b''.join(pushes) + suffix
+    if len(redeem_script) > MAX_REDEEM_SCRIPT_SIZE:
+        raise Exception('Redeem script too large: %d bytes' %
+                        len(redeem_script))
+    return redeem_script
+
+
+def multisig_p2sh_addr(m, pub_keys, network_type=MAINNET, sort=True,
+                       compress=True):
+    '''P2SH address of an m-of-n multisig'''
+    redeem_script = multisig_redeem_script(m, pub_keys, sort, compress)
+    return Base58.base58check(NETWORK_TYPES[network_type][P2SH],
+                              hash160(redeem_script))
+
+
+# Pushes of the pool, in script order, set in every pool worker so that
+# they are not pickled with each chunk
+_POOL_PUSHES = None
+
+
+def init_pool_pushes(pushes):
+    '''Pool worker initializer: keep the pushes of the pool'''
+    global _POOL_PUSHES
+    _POOL_PUSHES = pushes
+
+
+def p2sh_chunk(m, n, version, pushes, combinations):
+    '''Worker: P2SH payload addresses of combinations of pool positions,
+    pushes is None in pool workers, which use the initializer's'''
+    if pushes is None:
+        pushes = _POOL_PUSHES
+    prefix, suffix = script_prefix_suffix(m, n)
+    last_head, head_sha256 = None, None
+    digests = []
+    for combination in combinations:
+        head = combination[:-1]
+        if head != last_head:
+            head_sha256 = hashlib.sha256(
+                prefix + b''.join(pushes[i] for i in head))
+            last_head = head
+        sha256 = head_sha256.copy()
+        sha256.update(pushes[combination[-1]] + suffix)
+        digests.append(sha256.digest())
+    return [Base58.base58check(version, payload)
+            for payload in ripemd160_many(digests)]
+
+
+def iter_multisig_p2sh_addrs(m, n, pub_keys, network_type=MAINNET, sort=True,
+                             compress=True, workers=None,
+                             chunk_size=DEFAULT_MULTISIG_CHUNK_SIZE):
+    '''Stream the P2SH address of every m-of-n multisig over a key pool.
+
+    Yields a MultisigAddress per combination of n keys, in lexicographic
+    order of the script. key_indices refer to positions in pub_keys.
+    '''
+    check_m_n(m, n)
+    pushes = [pub_key_push(pub_key, compress) for pub_key in pub_keys]
+    order = list(range(len(pushes)))
+    if sort:
+        order.sort(key=lambda i: pushes[i][1:])
+    sorted_pushes = [pushes[i] for i in order]
+    if 3 + sum(sorted(map(len, pushes))[-n:]) > MAX_REDEEM_SCRIPT_SIZE:
+        raise Exception('Redeem script too large for %d keys' % n)
+    version = NETWORK_TYPES[network_type][P2SH]
+    if workers is None:
+        workers = cpu_count()
+    # The second copy only lags by the chunks in flight
+    combinations, in_order = itertools.tee(
+        itertools.combinations(range(len(pushes)), n))
+    if workers <= 1:
+        # In-process generators may interleave: each holds its own pool
+        addresses = imap_chunks(
+            functools.partial(p2sh_chunk, m, n, version, sorted_pushes),
+            combinations, workers, chunk_size)
+    else:
+        addresses = imap_chunks(
+            functools.partial(p2sh_chunk, m, n, version, None),
+            combinations, workers, chunk_size,
+            initializer=init_pool_pushes, initargs=(sorted_pushes, ))
+    for chunk in addresses:
+        for address in chunk:
+            yield MultisigAddress(
+                tuple(order[i] for i in next(in_order)), address)
@@ -0,0 +1,60 @@
+import itertools
+import multiprocessing
+from collections import deque
+
+from .constants import DEFAULT_CHUNK_SIZE
+
+
+def cpu_count():
+    '''Number of CPUs available, at least 1'''
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+def iter_chunks(iterable, chunk_size):
+    '''Split an iterable into lists of at most chunk_size items'''
+    if chunk_size < 1:
+        raise ValueError('Chunk size must be positive: %s' % chunk_size)
+    items = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(items, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def imap_chunks(func, iterable, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                max_pending=None, initializer=None, initargs=()):
+    '''Apply func to chunks of iterable, yield the results in input order.
+
+    func receives a list of items and must be picklable (module level).
+    At most max_pending chunks are in flight, so the input is consumed
+    lazily and memory stays bounded. A single chunk or workers <= 1 runs
+    in the calling process without starting a pool.
+    '''
+    if workers is None:
+        workers = cpu_count()
+    chunks = iter_chunks(iterable, chunk_size)
+    head = list(itertools.islice(chunks, 2))
+    if workers <= 1 or len(head) < 2:
+        if initializer is not None:
+            initializer(*initargs)
+        for chunk in itertools.chain(head, chunks):
+            yield func(chunk)
+        return
+    if max_pending is None:
+        max_pending = 2 * workers
+    pool = multiprocessing.Pool(workers, initializer, initargs)
+    try:
+        pending = deque()
+        for chunk in itertools.chain(head, chunks):
+            pending.append(pool.apply_async(func, (chunk, )))
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
+        pool.join()
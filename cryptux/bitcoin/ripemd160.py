@@ -0,0 +1,178 @@
+# RIPEMD-160 in pure Python, for OpenSSL builds without it
+# https://homes.esat.kuleuven.be/~bosselae/ripemd160.html
+#
+# The 160 steps of the compression function are unrolled into straight-line
+# code generated on first use, with the five chaining variables renamed at
+# each step instead of shuffled. hash160 only ever hashes a 32-byte SHA-256
+# digest, a single block whose padding words are constants: that case has
+# its own compression function with them folded in, which also runs on
+# NumPy uint32 arrays to hash a whole batch of digests at once.
+
+import struct
+
+from .base58 import load_numpy
+
+MASK = 0xFFFFFFFF
+IV = (0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476, 0xC3D2E1F0)
+
+# Message word and rotation of every step, left and right lines
+R_LEFT = [
+    0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15,
+    7, 4, 13, 1, 10, 6, 15, 3, 12, 0, 9, 5, 2, 14, 11, 8,
+    3, 10, 14, 4, 9, 15, 8, 1, 2, 7, 0, 6, 13, 11, 5, 12,
+    1, 9, 11, 10, 0, 8, 12, 4, 13, 3, 7, 15, 14, 5, 6, 2,
+    4, 0, 5, 9, 7, 12, 2, 10, 14, 1, 3, 8, 11, 6, 15, 13,
+]
+R_RIGHT = [
+    5, 14, 7, 0, 9, 2, 11, 4, 13, 6, 15, 8, 1, 10, 3, 12,
+    6, 11, 3, 7, 0, 13, 5, 10, 14, 15, 8, 12, 4, 9, 1, 2,
+    15, 5, 1, 3, 7, 14, 6, 9, 11, 8, 12, 2, 10, 0, 4, 13,
+    8, 6, 4, 1, 3, 11, 15, 0, 5, 12, 2, 13, 9, 7, 10, 14,
+    12, 15, 10, 4, 1, 5, 8, 7, 6, 2, 13, 14, 0, 3, 9, 11,
+]
+S_LEFT = [
+    11, 14, 15, 12, 5, 8, 7, 9, 11, 13, 14, 15, 6, 7, 9, 8,
+    7, 6, 8, 13, 11, 9, 7, 15, 7, 12, 15, 9, 11, 7, 13, 12,
+    11, 13, 6, 7, 14, 9, 13, 15, 14, 8, 13, 6, 5, 12, 7, 5,
+    11, 12, 14, 15, 14, 15, 9, 8, 9, 14, 5, 6, 8, 6, 5, 12,
+    9, 15, 5, 11, 6, 8, 13, 12, 5, 12, 13, 14, 11, 8, 5, 6,
+]
+S_RIGHT = [
+    8, 9, 9, 11, 13, 15, 15, 5, 7, 7, 8, 11, 14, 14, 12, 6,
+    9, 13, 15, 7, 12, 8, 9, 11, 7, 7, 12, 7, 6, 15, 13, 11,
+    9, 7, 15, 11, 8, 6, 6, 14, 12, 13, 5, 14, 13, 13, 7, 5,
+    15, 5, 8, 11, 14, 14, 6, 14, 6, 9, 12, 9, 12, 5, 15, 8,
+    8, 5, 12, 9, 12, 5, 14, 6, 8, 13, 6, 5, 15, 13, 11, 11,
+]
+K_LEFT = [0x00000000, 0x5A827999, 0x6ED9EBA1, 0x8F1BBCDC, 0xA953FD4E]
+K_RIGHT = [0x50A28BE6, 0x5C4DD124, 0x6D703EF3, 0x7A6D76E9, 0x00000000]
+
+# Boolean function of each round, the right line uses them in reverse.
+# The two selections are in their one-operation-shorter xor form.
+ROUND_FUNCS = [
+    '({x} ^ {y} ^ {z})',
+    '({z} ^ ({x} & ({y} ^ {z})))',
+    '(({x} | ({y} ^ MASK)) ^ {z})',
+    '({y} ^ ({z} & ({x} ^ {y})))',
+    '({x} ^ ({y} | ({z} ^ MASK)))',
+]
+
+BLOCK = struct.Struct('<16I')
+WORDS = struct.Struct('<8I')
+DIGEST = struct.Struct('<5I')
+# Padding of a 32-byte message: 0x80, zeros, then the length in bits
+WORDS_32 = ['x0', 'x1', 'x2', 'x3', 'x4', 'x5', 'x6', 'x7',
+            0x80, 0, 0, 0, 0, 0, 256, 0]
+
+
+def rol_code(value, bits, mask):
+    code = '(({0} << {1}) | ({0} >> {2}))'.format(value, bits, 32 - bits)
+    return '(%s & MASK)' % code if mask else code
+
+
+def line_code(names, order, shifts, constants, funcs, words, mask):
+    '''Statements of the 80 steps of one line, names are renamed in place'''
+    a, b, c, d, e = names
+    lines = []
+    for step in range(80):
+        round_ = step // 16
+        word = words[order[step]]
+        if isinstance(word, int):
+            added = '0x%08X' % ((word + constants[round_]) & MASK)
+        else:
+            added = '%s + 0x%08X' % (word, constants[round_])
+        total = '%s + %s + %s' % (a, funcs[round_].format(x=b, y=c, z=d),
+                                  added)
+        if mask:
+            total = '(%s) & MASK' % total
+        value = '%s + %s' % (rol_code('(%s)' % total, shifts[step], mask), e)
+        if mask:
+            value = '(%s) & MASK' % value
+        lines.append('%s = %s' % (a, value))
+        lines.append('%s = %s' % (c, rol_code(c, 10, mask)))
+        a, b, c, d, e = e, a, b, c, d
+    return lines, (a, b, c, d, e)
+
+
+def compress_code(name, words, mask):
+    '''Source of an unrolled compression function over the words'''
+    params = [word for word in words if not isinstance(word, int)]
+    left, (al, bl, cl, dl, el) = line_code(
+        ['al', 'bl', 'cl', 'dl', 'el'], R_LEFT, S_LEFT, K_LEFT, ROUND_FUNCS,
+        words, mask)
+    right, (ar, br, cr, dr, er) = line_code(
+        ['ar', 'br', 'cr', 'dr', 'er'], R_RIGHT, S_RIGHT, K_RIGHT,
+        ROUND_FUNCS[::-1], words, mask)
+    final = [
+        '%s + %s + %s' % ('h1', cl, dr),
+        '%s + %s + %s' % ('h2', dl, er),
+        '%s + %s + %s' % ('h3', el, ar),
+        '%s + %s + %s' % ('h4', al, br),
+        '%s + %s + %s' % ('h0', bl, cr),
+    ]
+    if mask:
+        final = ['(%s) & MASK' % value for value in final]
+    body = [
+        'def %s(h0, h1, h2, h3, h4, %s):' % (name, ', '.join(params)),
+        'al = ar = h0', 'bl = br = h1', 'cl = cr = h2', 'dl = dr = h3',
+        'el = er = h4',
+    ] + left + right + ['return (%s)' % ', '.join(final)]
+    return '\n    '.join(body) + '\n'
+
+
+_COMPRESS = {}
+
+
+def compress_func(name, words, mask):
+    '''Compile an unrolled compression function once per process'''
+    func = _COMPRESS.get(name)
+    if func is None:
+        namespace = {'MASK': MASK}
+        exec(compile(compress_code(name, words, mask),
+                     '<ripemd160 %s>' % name, 'exec'), namespace)
+        func = _COMPRESS[name] = namespace[name]
+    return func
+
+
+def ripemd160(data):
+    '''RIPEMD-160 digest of bytes'''
+    if len(data) == 32:
+        compress = compress_func('compress_32', WORDS_32, True)
+        return DIGEST.pack(*compress(*IV, *WORDS.unpack(data)))
+    compress = compress_func('compress', ['x%d' % i for i in range(16)], True)
+    padded = (bytes(data) + b'\x80' + b'\x00' * ((55 - len(data)) % 64) +
+              struct.pack('<Q', (len(data) << 3) & 0xFFFFFFFFFFFFFFFF))
+    state = IV
+    for offset in range(0, len(padded), 64):
+        state = compress(*state, *BLOCK.unpack_from(padded, offset))
+    return DIGEST.pack(*state)
+
+
+# Below this many 32-byte messages the NumPy setup costs more than it saves
+NUMPY_MIN_BATCH = 64
+# Messages per vectorized pass, keeping the temporaries in cache
+NUMPY_CHUNK_SIZE = 8192
+
+
+def numpy_ripemd160_32(messages):
+    '''RIPEMD-160 of many 32-byte messages, vectorized across messages'''
+    numpy = load_numpy()
+    compress = compress_func('numpy_compress_32', WORDS_32, False)
+    digests = []
+    for start in range(0, len(messages), NUMPY_CHUNK_SIZE):
+        chunk = messages[start:start + NUMPY_CHUNK_SIZE]
+        words = numpy.frombuffer(b''.join(chunk), dtype='<u4').reshape(
+            len(chunk), 8).T.astype(numpy.uint32)
+        state = [numpy.full(len(chunk), h, dtype=numpy.uint32) for h in IV]
+        raw = numpy.stack(compress(*state, *words), axis=1).astype(
+            '<u4').tobytes()
+        digests.extend(raw[i:i + 20] for i in range(0, len(raw), 20))
+    return digests
+
+
+def ripemd160_many(messages):
+    '''RIPEMD-160 digests of many messages, in order'''
+    if (len(messages) >= NUMPY_MIN_BATCH and load_numpy() is not None and
+            all(len(message) == 32 for message in messages)):
+        return numpy_ripemd160_32(messages)
+    return [ripemd160(message) for message in messages]
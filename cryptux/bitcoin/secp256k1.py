@@ -0,0 +1,438 @@
+# Built-in secp256k1 engine for public key derivation
+# http://www.secg.org/sec2-v2.pdf - Section 2.4.1
+# https://hyperelliptic.org/EFD/g1p/auto-shortw-jacobian-0.html
+#
+# Points are kept in Jacobian coordinates (X, Y, Z) <-> (X/Z^2, Y/Z^3)
+# so that additions need no modular inversion. The generator is multiplied
+# with a fixed-base table: the 256-bit scalar is cut into 32 windows of
+# 8 bits and the table holds j * 256^i * G for every window i and digit j,
+# so k*G costs 32 mixed additions and no doubling at all.
+
+import hashlib
+import os
+import struct
+import tempfile
+
+P = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F
+N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+A = 0
+B = 7
+GX = 0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798
+GY = 0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8
+G = (GX, GY)
+
+# Jacobian representation of the point at infinity
+INFINITY = (0, 1, 0)
+
+WINDOW_BITS = 8
+WINDOW_SIZE = 1 << WINDOW_BITS
+WINDOW_COUNT = 256 // WINDOW_BITS
+
+TABLE_MAGIC = b'CRYPTUXG'
+TABLE_VERSION = 1
+TABLE_HEADER = struct.Struct('>8sHH')
+TABLE_FILE_NAME = 'secp256k1-g-w%d.bin' % WINDOW_BITS
+
+
+def inverse_mod(a, m=P):
+    '''Modular inverse with the native pow()'''
+    if a % m == 0:
+        raise ZeroDivisionError('No inverse for 0 mod %x' % m)
+    return pow(a, -1, m)
+
+
+def batch_inverse(values, m=P):
+    '''Inverses of many non-zero values modulo m with a single inversion'''
+    prefix = []
+    acc = 1
+    for value in values:
+        prefix.append(acc)
+        acc = acc * value % m
+    if not prefix:
+        return []
+    acc_inv = inverse_mod(acc, m)
+    inverses = [None] * len(prefix)
+    for i in range(len(prefix) - 1, -1, -1):
+        inverses[i] = acc_inv * prefix[i] % m
+        acc_inv = acc_inv * values[i] % m
+    return inverses
+
+
+def jacobian_double(pt):
+    '''Double a point in Jacobian coordinates (a = 0)'''
+    X1, Y1, Z1 = pt
+    if not Y1 or not Z1:
+        return INFINITY
+    YY = Y1 * Y1 % P
+    S = 4 * X1 * YY % P
+    M = 3 * X1 * X1 % P
+    X3 = (M * M - 2 * S) % P
+    Y3 = (M * (S - X3) - 8 * YY * YY) % P
+    Z3 = 2 * Y1 * Z1 % P
+    return (X3, Y3, Z3)
+
+
+def jacobian_add_affine(pt, x2, y2):
+    '''Add an affine point (x2, y2) to a Jacobian point'''
+    X1, Y1, Z1 = pt
+    if not Z1:
+        return (x2, y2, 1)
+    Z1Z1 = Z1 * Z1 % P
+    U2 = x2 * Z1Z1 % P
+    S2 = y2 * Z1 * Z1Z1 % P
+    H = (U2 - X1) % P
+    R = (S2 - Y1) % P
+    if not H:
+        if not R:
+            return jacobian_double((x2, y2, 1))
+        return INFINITY
+    HH = H * H % P
+    HHH = H * HH % P
+    V = X1 * HH % P
+    X3 = (R * R - HHH - 2 * V) % P
+    Y3 = (R * (V - X3) - Y1 * HHH) % P
+    Z3 = Z1 * H % P
+    return (X3, Y3, Z3)
+
+
+def jacobian_add(pt1, pt2):
+    '''Add two points in Jacobian coordinates'''
+    X1, Y1, Z1 = pt1
+    X2, Y2, Z2 = pt2
+    if not Z1:
+        return pt2
+    if not Z2:
+        return pt1
+    Z1Z1 = Z1 * Z1 % P
+    Z2Z2 = Z2 * Z2 % P
+    U1 = X1 * Z2Z2 % P
+    U2 = X2 * Z1Z1 % P
+    S1 = Y1 * Z2 * Z2Z2 % P
+    S2 = Y2 * Z1 * Z1Z1 % P
+    H = (U2 - U1) % P
+    R = (S2 - S1) % P
+    if not H:
+        if not R:
+            return jacobian_double(pt1)
+        return INFINITY
+    HH = H * H % P
+    HHH = H * HH % P
+    V = U1 * HH % P
+    X3 = (R * R - HHH - 2 * V) % P
+    Y3 = (R * (V - X3) - S1 * HHH) % P
+    Z3 = Z1 * Z2 * H % P
+    return (X3, Y3, Z3)
+
+
+def to_affine(pt):
+    '''Convert a Jacobian point to affine (x, y)'''
+    X, Y, Z = pt
+    if not Z:
+        raise ValueError('Point at infinity has no affine form')
+    z_inv = inverse_mod(Z)
+    z_inv2 = z_inv * z_inv % P
+    return (X * z_inv2 % P, Y * z_inv2 * z_inv % P)
+
+
+def batch_to_affine(points):
+    '''Convert many Jacobian points to affine with a single inversion.
+
+    Montgomery's trick: invert the product of all Z, then peel off each
+    1/Z with two multiplications while walking the prefix products back.
+    '''
+    prefix = []
+    acc = 1
+    for X, Y, Z in points:
+        if not Z:
+            raise ValueError('Point at infinity has no affine form')
+        prefix.append(acc)
+        acc = acc * Z % P
+    if not prefix:
+        return []
+    acc_inv = inverse_mod(acc)
+    affine = [None] * len(points)
+    for i in range(len(points) - 1, -1, -1):
+        X, Y, Z = points[i]
+        z_inv = acc_inv * prefix[i] % P
+        acc_inv = acc_inv * Z % P
+        z_inv2 = z_inv * z_inv % P
+        affine[i] = (X * z_inv2 % P, Y * z_inv2 * z_inv % P)
+    return affine
+
+
+def build_g_table():
+    '''Compute j * 256^i * G for all windows i and digits j in [1, 255]'''
+    rows = []
+    base = G
+    for _ in range(WINDOW_COUNT):
+        row = [None, base]
+        acc = (base[0], base[1], 1)
+        for _ in range(WINDOW_SIZE - 2):
+            acc = jacobian_add_affine(acc, base[0], base[1])
+            row.append(to_affine(acc))
+        rows.append(row)
+        # 256^(i+1) * G = 2 * (128 * 256^i * G)
+        base = to_affine(
+            jacobian_double((row[WINDOW_SIZE // 2][0],
+                             row[WINDOW_SIZE // 2][1], 1)))
+    return rows
+
+
+def serialize_g_table(rows):
+    '''Flatten the table into bytes: a header then x||y for every entry'''
+    chunks = [TABLE_HEADER.pack(TABLE_MAGIC, TABLE_VERSION, WINDOW_BITS)]
+    for row in rows:
+        for x, y in row[1:]:
+            chunks.append(x.to_bytes(32, 'big'))
+            chunks.append(y.to_bytes(32, 'big'))
+    body = b''.join(chunks)
+    return body + hashlib.sha256(body).digest()
+
+
+def deserialize_g_table(raw):
+    '''Parse bytes produced by serialize_g_table, None if unusable'''
+    expected_len = (TABLE_HEADER.size + WINDOW_COUNT *
+                    (WINDOW_SIZE - 1) * 64 + 32)
+    if len(raw) != expected_len:
+        return None
+    body, digest = raw[:-32], raw[-32:]
+    if hashlib.sha256(body).digest() != digest:
+        return None
+    magic, version, window_bits = TABLE_HEADER.unpack_from(body)
+    if (magic, version, window_bits) != (TABLE_MAGIC, TABLE_VERSION,
+                                         WINDOW_BITS):
+        return None
+    from_bytes = int.from_bytes
+    rows = []
+    offset = TABLE_HEADER.size
+    for _ in range(WINDOW_COUNT):
+        row = [None]
+        for _ in range(WINDOW_SIZE - 1):
+            row.append((from_bytes(body[offset:offset + 32], 'big'),
+                        from_bytes(body[offset + 32:offset + 64], 'big')))
+            offset += 64
+        rows.append(row)
+    if rows[0][1] != G:
+        return None
+    return rows
+
+
+def cache_dir():
+    '''Directory for cached tables, overridable with CRYPTUX_CACHE_DIR'''
+    path = os.environ.get('CRYPTUX_CACHE_DIR')
+    if path:
+        return path
+    xdg_cache = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    return os.path.join(xdg_cache, 'cryptux')
+
+
+def load_g_table(path):
+    '''Read the table from disk, None if missing or corrupted'''
+    try:
+        with open(path, 'rb') as fd:
+            return deserialize_g_table(fd.read())
+    except (IOError, OSError):
+        return None
+
+
+def save_g_table(rows, path):
+    '''Atomically write the table to disk. Failures are not fatal'''
+    try:
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'wb') as tmp_fd:
+            tmp_fd.write(serialize_g_table(rows))
+        os.rename(tmp_path, path)
+    except (IOError, OSError):
+        pass
+
+
+_G_TABLE = None
+
+
+def get_g_table():
+    '''Fixed-base table for G: loaded once from disk or built and cached'''
+    global _G_TABLE
+    if _G_TABLE is None:
+        path = os.path.join(cache_dir(), TABLE_FILE_NAME)
+        rows = load_g_table(path)
+        if rows is None:
+            rows = build_g_table()
+            save_g_table(rows, path)
+        _G_TABLE = rows
+    return _G_TABLE
+
+
+def check_secexp(secexp):
+    '''Private keys must be in the range [1, N-1]'''
+    if not 1 <= secexp < N:
+        raise ValueError('Private key out of range')
+
+
+def point_mul_g_jacobian(secexp):
+    '''Multiply G by secexp using the fixed-base table, Jacobian result'''
+    check_secexp(secexp)
+    rows = get_g_table()
+    # The partial sums are the low windows of secexp, never equal to +/- the
+    # next table entry, so the mixed addition below is inlined without the
+    # doubling/infinity branches of jacobian_add_affine.
+    X1 = Y1 = Z1 = None
+    window = 0
+    while secexp:
+        digit = secexp & 0xFF
+        if digit:
+            x2, y2 = rows[window][digit]
+            if Z1 is None:
+                X1, Y1, Z1 = x2, y2, 1
+            else:
+                Z1Z1 = Z1 * Z1 % P
+                H = (x2 * Z1Z1 - X1) % P
+                R = (y2 * Z1 * Z1Z1 - Y1) % P
+                HH = H * H % P
+                HHH = H * HH % P
+                V = X1 * HH % P
+                X1, Y1, Z1 = ((R * R - HHH - 2 * V) % P,
+                              (R * (V - (R * R - HHH - 2 * V)) - Y1 * HHH) % P,
+                              Z1 * H % P)
+        secexp >>= 8
+        window += 1
+    return (X1, Y1, Z1)
+
+
+def point_mul_g(secexp):
+    '''Multiply G by secexp, affine (x, y) result'''
+    return to_affine(point_mul_g_jacobian(secexp))
+
+
+def points_mul_g(secexps):
+    '''Multiply G by many scalars, sharing one inversion across them'''
+    return batch_to_affine([point_mul_g_jacobian(secexp)
+                            for secexp in secexps])
+
+
+# Variable-base multiplication (verification, key recovery): width-w NAF
+# digits with the odd multiples Q, 3Q, ..., (2^(w-1)-1)Q precomputed.
+WNAF_BITS = 5
+
+# GLV endomorphism: lambda*(x, y) = (beta*x, y). k*Q is split into
+# k1*Q + k2*(lambda*Q) with k1, k2 of ~128 bits, which halves the doublings
+# once both halves share a single chain (Shamir's trick).
+LAMBDA = 0x5363AD4CC05C30E0A5261C028812645A122E22EA20816678DF02967C1B23BD72
+BETA = 0x7AE96A2B657C07106E64479EAC3434E99CF0497512F58995C1396C28719501EE
+GLV_A1 = 0x3086D221A7D46BCDE86C90E49284EB15
+GLV_B1 = -0xE4437ED6010E88286F547FA90ABFE4C3
+GLV_A2 = 0x114CA50F7A8E2F3F657C1108D9D44CFD8
+GLV_B2 = GLV_A1
+
+
+def wnaf(k, w=WNAF_BITS):
+    '''Width-w non-adjacent form of k, least significant digit first'''
+    digits = []
+    half, full = 1 << (w - 1), 1 << w
+    while k:
+        if k & 1:
+            digit = k & (full - 1)
+            if digit >= half:
+                digit -= full
+            k -= digit
+        else:
+            digit = 0
+        digits.append(digit)
+        k >>= 1
+    return digits
+
+
+def odd_multiples(x, y, w=WNAF_BITS):
+    '''Affine Q, 3Q, 5Q, ... for wNAF multiplication of Q = (x, y)'''
+    double_q = to_affine(jacobian_double((x, y, 1)))
+    points = [(x, y, 1)]
+    for _ in range((1 << (w - 2)) - 1):
+        points.append(jacobian_add_affine(points[-1], *double_q))
+    return batch_to_affine(points)
+
+
+def split_scalar(k):
+    '''(k1, k2) with k = k1 + k2*LAMBDA mod N, both about 128 bits'''
+    c1 = (GLV_B2 * k + N // 2) // N
+    c2 = (-GLV_B1 * k + N // 2) // N
+    return (k - c1 * GLV_A1 - c2 * GLV_A2, -c1 * GLV_B1 - c2 * GLV_B2)
+
+
+def signed_table(table, k, endomorphism):
+    '''Table for |k|, negated when k < 0, mapped by lambda if asked'''
+    if endomorphism:
+        table = [(BETA * x % P, y) for x, y in table]
+    if k < 0:
+        table = [(x, P - y) for x, y in table]
+    return table
+
+
+def point_mul_add_g(u1, u2, table):
+    '''u1*G + u2*Q in Jacobian coordinates, table = odd_multiples(Q).
+
+    u2*Q = k1*Q + k2*(lambda*Q) runs both halves in one wNAF doubling chain
+    (Shamir's trick). u1*G comes from the fixed-base table, which needs no
+    doubling at all, and is added once at the end.
+    '''
+    k1, k2 = split_scalar(u2 % N)
+    tables = (signed_table(table, k1, False), signed_table(table, k2, True))
+    nafs = (wnaf(abs(k1)), wnaf(abs(k2)))
+    acc = INFINITY
+    for i in range(max(len(nafs[0]), len(nafs[1])) - 1, -1, -1):
+        acc = jacobian_double(acc)
+        for naf, naf_table in zip(nafs, tables):
+            digit = naf[i] if i < len(naf) else 0
+            if digit > 0:
+                acc = jacobian_add_affine(acc, *naf_table[digit >> 1])
+            elif digit < 0:
+                x, y = naf_table[-digit >> 1]
+                acc = jacobian_add_affine(acc, x, P - y)
+    if u1 % N:
+        acc = jacobian_add(acc, point_mul_g_jacobian(u1 % N))
+    return acc
+
+
+def point_from_x(x, y_is_odd):
+    '''Affine point with abscissa x, y chosen by parity (decompression)'''
+    if not 0 <= x < P:
+        raise ValueError('Invalid point abscissa')
+    y_square = (x * x * x + B) % P
+    # P = 3 mod 4, so the square root is a single exponentiation
+    y = pow(y_square, (P + 1) // 4, P)
+    if y * y % P != y_square:
+        raise ValueError('Point not on the curve')
+    if y & 1 != y_is_odd:
+        y = P - y
+    return (x, y)
+
+
+def point_from_compressed(pub_key_compressed):
+    '''Affine point of a 33-byte compressed public key'''
+    if len(pub_key_compressed) != 33 or pub_key_compressed[0] not in (2, 3):
+        raise ValueError('Invalid compressed public key')
+    return point_from_x(int.from_bytes(pub_key_compressed[1:], 'big'),
+                        pub_key_compressed[0] & 1)
+
+
+def point_from_pub_key(pub_key):
+    '''Affine point of a compressed, uncompressed or raw public key'''
+    if len(pub_key) == 33:
+        return point_from_compressed(pub_key)
+    if len(pub_key) == 65 and pub_key[0] == 4:
+        pub_key = pub_key[1:]
+    if len(pub_key) != 64:
+        raise ValueError('Invalid public key length: %d' % len(pub_key))
+    x = int.from_bytes(pub_key[:32], 'big')
+    y = int.from_bytes(pub_key[32:], 'big')
+    if not (x < P and y < P and (y * y - x * x * x - B) % P == 0):
+        raise ValueError('Point not on the curve')
+    return (x, y)
+
+
+def pub_key_from_secexp(secexp):
+    '''Raw 64-byte public key x||y, same as ecdsa VerifyingKey.to_string()'''
+    x, y = point_mul_g(secexp)
+    return x.to_bytes(32, 'big') + y.to_bytes(32, 'big')
@@ -0,0 +1,381 @@
+# Local derivation/validation service: JSON-RPC 2.0 over a Unix socket
+#
+# One JSON object per line in both directions, requests of a connection
+# may be pipelined and are answered as they complete, matched by id.
+# Requests from every connection go through one bounded queue and are
+# dispatched to a process pool in micro-batches: while the pool is busy
+# the queue fills up and the next batch takes everything waiting, so
+# batches grow with the load and an idle service answers at once. When
+# the queue is full, connections stop being read (backpressure).
+
+import asyncio
+import concurrent.futures
+import json
+import os
+import signal
+import stat
+
+from .batch import derive_chunk, parse_key_hex, parse_key_wif
+from .constants import MAINNET, COMPRESSED, UNCOMPRESSED, HEX, WIF
+from .constants import NETWORK_TYPES
+from .gen_addr import p2sh_addr_hex, verify_bitcoin_addr
+from .parallel import cpu_count
+from .wif import priv_key_to_wif
+
+DEFAULT_MAX_BATCH = 1000
+# Seconds to wait for more requests once a batch has started, 0 to only
+# take what is already queued
+DEFAULT_MAX_DELAY = 0.0
+DEFAULT_MAX_QUEUE = 10000
+# Requests of one connection being processed before it is read again
+MAX_PENDING_PER_CONNECTION = 1000
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+CALL_ERROR = -32000
+
+# Optional params -> allowed values, checked before a call joins a batch
+OPTIONAL_PARAMS = {
+    'network_type': tuple(NETWORK_TYPES),
+    'key_fmt': (COMPRESSED, UNCOMPRESSED),
+    'priv_key_fmt': (HEX, WIF),
+}
+
+
+def derive_parsed(parsed_keys):
+    '''(result, error) of derivations sharing one EC batch'''
+    results = []
+    for derived in derive_chunk(parsed_keys, True):
+        if derived.error is not None:
+            results.append((None, derived.error))
+            continue
+        results.append(({
+            'address': derived.address,
+            'network_type': derived.network_type,
+            'key_fmt': derived.key_fmt,
+            'wif': derived.wif,
+        }, None))
+    return results
+
+
+def parse_derive_params(params):
+    priv_key_fmt = params.get('priv_key_fmt', HEX)
+    if priv_key_fmt == WIF:
+        return parse_key_wif(params['priv_key'])
+    if priv_key_fmt != HEX:
+        return (params['priv_key'], None, None, None,
+                'Invalid private key format: %s' % priv_key_fmt)
+    return parse_key_hex(params['priv_key'],
+                         params.get('network_type', MAINNET),
+                         params.get('key_fmt', COMPRESSED))
+
+
+def parse_each(parse, calls):
+    '''Parsed keys of calls, with an error for a call failing to parse'''
+    parsed_keys = []
+    for params in calls:
+        try:
+            parsed_keys.append(parse(params))
+        except Exception as exc:
+            parsed_keys.append((None, None, None, None,
+                                'Invalid params: %s' % type(exc).__name__))
+    return parsed_keys
+
+
+def derive_address_many(calls):
+    return derive_parsed(parse_each(parse_derive_params, calls))
+
+
+def import_wif_many(calls):
+    parsed_keys = parse_each(lambda params: parse_key_wif(params['wif']),
+                             calls)
+    results = derive_parsed(parsed_keys)
+    for (result, _), parsed in zip(results, parsed_keys):
+        if result is not None:
+            result['priv_key_hex'] = '%064x' % parsed[1]
+    return results
+
+
+def export_wif_one(params):
+    # Parsed like derive_address: the errors never repeat the key
+    _, secexp, network_type, key_fmt, error = parse_key_hex(
+        params['priv_key_hex'], params.get('network_type', MAINNET),
+        params.get('key_fmt', COMPRESSED))
+    if error is not None:
+        raise ValueError(error)
+    return priv_key_to_wif(secexp.to_bytes(32, 'big'), network_type, key_fmt)
+
+
+def verify_bitcoin_addr_one(params):
+    return verify_bitcoin_addr(params['address'])
+
+
+def p2sh_addr_hex_one(params):
+    return p2sh_addr_hex(params['redeem_script_hex'],
+                         params.get('network_type', MAINNET))
+
+
+def one_by_one(func):
+    '''Batch handler calling func per request, capturing errors'''
+    def handle_many(calls):
+        results = []
+        for params in calls:
+            try:
+                results.append((func(params), None))
+            except Exception as exc:
+                results.append((None, '%s: %s' % (type(exc).__name__, exc)))
+        return results
+    return handle_many
+
+
+# method -> (required params, handler of a list of params)
+METHODS = {
+    'derive_address': (('priv_key', ), derive_address_many),
+    'import_wif': (('wif', ), import_wif_many),
+    'export_wif': (('priv_key_hex', ), one_by_one(export_wif_one)),
+    'verify_bitcoin_addr': (('address', ),
+                            one_by_one(verify_bitcoin_addr_one)),
+    'p2sh_addr_hex': (('redeem_script_hex', ),
+                      one_by_one(p2sh_addr_hex_one)),
+}
+
+
+def run_batch(calls):
+    '''Worker: (result, error) of (method, params) calls, grouped by method'''
+    by_method = {}
+    for index, (method, params) in enumerate(calls):
+        by_method.setdefault(method, []).append((index, params))
+    results = [None] * len(calls)
+    for method, indexed in by_method.items():
+        handle_many = METHODS[method][1]
+        try:
+            method_results = handle_many([params for _, params in indexed])
+        except Exception:
+            # One bad call must not fail the others: run them one by one
+            method_results = []
+            for _, params in indexed:
+                try:
+                    method_results.extend(handle_many([params]))
+                except Exception as exc:
+                    method_results.append(
+                        (None, '%s: %s' % (type(exc).__name__, exc)))
+        for (index, _), result in zip(indexed, method_results):
+            results[index] = result
+    return results
+
+
+def check_request(request):
+    '''(id, method, params) of a request, raises (code, message)'''
+    if not isinstance(request, dict) or not isinstance(
+            request.get('method'), str):
+        raise ValueError(INVALID_REQUEST, 'Invalid request')
+    method, params = request['method'], request.get('params', {})
+    if method not in METHODS:
+        raise ValueError(METHOD_NOT_FOUND, 'Method not found: %s' % method)
+    if not isinstance(params, dict):
+        raise ValueError(INVALID_PARAMS, 'Params must be an object')
+    for name in METHODS[method][0]:
+        if not isinstance(params.get(name), str):
+            raise ValueError(INVALID_PARAMS, 'Missing param: %s' % name)
+    for name, allowed in OPTIONAL_PARAMS.items():
+        if name in params and not (isinstance(params[name], str) and
+                                   params[name] in allowed):
+            raise ValueError(INVALID_PARAMS, 'Invalid param: %s' % name)
+    return request.get('id'), method, params
+
+
+def response(request_id, result=None, error=None):
+    if error is not None:
+        code, message = error
+        return {'jsonrpc': '2.0', 'id': request_id,
+                'error': {'code': code, 'message': message}}
+    return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+
+
+class Service(object):
+    '''Micro-batching front of a process pool, see serve()'''
+
+    def __init__(self, workers=None, max_batch=DEFAULT_MAX_BATCH,
+                 max_delay=DEFAULT_MAX_DELAY, max_queue=DEFAULT_MAX_QUEUE):
+        if workers is None:
+            workers = cpu_count()
+        self.workers = max(1, workers)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self._executor = None
+        self._queue = None
+        self._collector = None
+        self._server = None
+        # (device, inode) of the socket file created by start()
+        self._socket = None
+        self._path = None
+        # writer -> future done when its connection handler returns
+        self._connections = {}
+
+    async def start(self, path=None):
+        '''Start the pool and the batching, listen on path if given.
+        A socket left at path is replaced, any other file is refused.'''
+        if path is not None and os.path.lexists(path):
+            if not stat.S_ISSOCK(os.lstat(path).st_mode):
+                raise Exception('Not a socket, refusing to replace: %s' %
+                                path)
+            os.unlink(path)
+        self._executor = concurrent.futures.ProcessPoolExecutor(self.workers)
+        self._queue = asyncio.Queue(self.max_queue)
+        # Batches in flight: one running and one ready per worker
+        self._slots = asyncio.Semaphore(2 * self.workers)
+        self._collector = asyncio.ensure_future(self._collect())
+        if path is not None:
+            self._server = await asyncio.start_unix_server(
+                self._handle_connection, path)
+            path_stat = os.lstat(path)
+            self._socket = (path_stat.st_dev, path_stat.st_ino)
+            self._path = path
+        return self
+
+    async def close(self):
+        '''Stop listening, the batching and the pool'''
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._socket is not None:
+            self._unlink_socket()
+        for writer in list(self._connections):
+            writer.close()
+        if self._connections:
+            await asyncio.wait(list(self._connections.values()))
+        if self._collector is not None:
+            self._collector.cancel()
+            try:
+                await self._collector
+            except asyncio.CancelledError:
+                pass
+            self._collector = None
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _unlink_socket(self):
+        '''Remove the socket file of start(), unless it was replaced'''
+        try:
+            path_stat = os.lstat(self._path)
+        except FileNotFoundError:
+            pass
+        else:
+            if (path_stat.st_dev, path_stat.st_ino) == self._socket:
+                os.unlink(self._path)
+        self._socket = self._path = None
+
+    async def call(self, method, params):
+        '''Result of one call, waits while the queue is full'''
+        future = asyncio.get_event_loop().create_future()
+        await self._queue.put((method, params, future))
+        return await future
+
+    async def _collect(self):
+        '''Take everything queued as a batch whenever a slot is free'''
+        while True:
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            # Let the handlers that are ready queue their requests too
+            await asyncio.sleep(self.max_delay)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        try:
+            loop = asyncio.get_event_loop()
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, run_batch,
+                    [(method, params) for method, params, _ in batch])
+            except Exception as exc:
+                results = [(None, '%s: %s' % (type(exc).__name__, exc))
+                           ] * len(batch)
+            for (_, _, future), (result, error) in zip(batch, results):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(Exception(error))
+                else:
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    async def _respond(self, line, writer, write_lock, pending):
+        try:
+            try:
+                request = json.loads(line.decode('utf-8'))
+            except ValueError:
+                reply = response(None, error=(PARSE_ERROR, 'Parse error'))
+            else:
+                try:
+                    request_id, method, params = check_request(request)
+                except ValueError as exc:
+                    reply = response(request.get('id') if isinstance(
+                        request, dict) else None, error=exc.args)
+                else:
+                    try:
+                        reply = response(request_id,
+                                         await self.call(method, params))
+                    except Exception as exc:
+                        reply = response(request_id,
+                                         error=(CALL_ERROR, str(exc)))
+            async with write_lock:
+                writer.write(json.dumps(reply).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            pending.release()
+
+    async def _handle_connection(self, reader, writer):
+        write_lock = asyncio.Lock()
+        pending = asyncio.Semaphore(MAX_PENDING_PER_CONNECTION)
+        tasks = set()
+        done = self._connections[writer] = (
+            asyncio.get_event_loop().create_future())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                await pending.acquire()
+                task = asyncio.ensure_future(
+                    self._respond(line, writer, write_lock, pending))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            # Answer what is still in flight before closing
+            if tasks:
+                await asyncio.wait(tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            del self._connections[writer]
+            done.set_result(None)
+
+
+def serve(path, workers=None, max_batch=DEFAULT_MAX_BATCH,
+          max_delay=DEFAULT_MAX_DELAY, max_queue=DEFAULT_MAX_QUEUE):
+    '''Run the service on a Unix socket until interrupted'''
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    service = Service(workers, max_batch, max_delay, max_queue)
+    loop.run_until_complete(service.start(path))
+    loop.add_signal_handler(signal.SIGTERM, loop.stop)
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(service.close())
+        loop.close()
@@ -0,0 +1,210 @@
+# ECDSA signing over secp256k1
+# https://tools.ietf.org/html/rfc6979 - deterministic nonces
+# https://github.com/bitcoin/bips/blob/master/bip-0062.mediawiki - low S
+#
+# Every nonce point k*G comes from the fixed-base table, and a batch shares
+# one inversion for the affine R points and one for the k^-1 mod N.
+
+import base64
+import functools
+import hashlib
+import hmac
+
+from .constants import DER, COMPACT
+from .hashes import hash256
+from .parallel import imap_chunks
+from .secp256k1 import N, batch_inverse, batch_to_affine, check_secexp
+from .secp256k1 import point_mul_g, point_mul_g_jacobian, inverse_mod
+
+# Signatures per work unit when signing across a process pool
+DEFAULT_SIGN_CHUNK_SIZE = 256
+
+# Compact signature header: 27 + recovery id, + 4 for compressed keys
+COMPACT_HEADER_BASE = 27
+COMPACT_HEADER_COMPRESSED = 4
+
+MESSAGE_MAGIC = b'\x18Bitcoin Signed Message:\n'
+
+
+def varint(n):
+    '''Bitcoin variable length integer'''
+    if n < 0xFD:
+        return bytes([n])
+    elif n <= 0xFFFF:
+        return b'\xFD' + n.to_bytes(2, 'little')
+    elif n <= 0xFFFFFFFF:
+        return b'\xFE' + n.to_bytes(4, 'little')
+    return b'\xFF' + n.to_bytes(8, 'little')
+
+
+def message_digest(message):
+    '''Digest signed by Bitcoin signmessage'''
+    if not isinstance(message, bytes):
+        message = message.encode('utf-8')
+    return hash256(MESSAGE_MAGIC + varint(len(message)) + message)
+
+
+def check_digest(digest):
+    '''Digests are 32 bytes: SHA-256 or double SHA-256'''
+    if len(digest) != 32:
+        raise ValueError('Digest must be 32 bytes, got %d' % len(digest))
+
+
+def rfc6979_nonces(secexp, digest):
+    '''Deterministic nonces for secexp and digest, in RFC6979 order'''
+    x = secexp.to_bytes(32, 'big')
+    h1 = (int.from_bytes(digest, 'big') % N).to_bytes(32, 'big')
+    v = b'\x01' * 32
+    k = b'\x00' * 32
+    k = hmac.new(k, v + b'\x00' + x + h1, hashlib.sha256).digest()
+    v = hmac.new(k, v, hashlib.sha256).digest()
+    k = hmac.new(k, v + b'\x01' + x + h1, hashlib.sha256).digest()
+    v = hmac.new(k, v, hashlib.sha256).digest()
+    while True:
+        v = hmac.new(k, v, hashlib.sha256).digest()
+        nonce = int.from_bytes(v, 'big')
+        if 1 <= nonce < N:
+            yield nonce
+        k = hmac.new(k, v + b'\x00', hashlib.sha256).digest()
+        v = hmac.new(k, v, hashlib.sha256).digest()
+
+
+def finish_signature(secexp, z, nonce_inv, r_x, r_y):
+    '''(r, s, recid) from the nonce point, None if r or s is 0'''
+    r = r_x % N
+    s = nonce_inv * (z + r * secexp) % N
+    if not r or not s:
+        return None
+    recid = (r_y & 1) | (2 if r_x >= N else 0)
+    if s > N // 2:
+        # Low S: -s is as valid and R's y flips parity
+        s = N - s
+        recid ^= 1
+    return (r, s, recid)
+
+
+def sign_digest(secexp, digest):
+    '''Sign a 32-byte digest, returns (r, s, recid) with low S'''
+    check_secexp(secexp)
+    check_digest(digest)
+    z = int.from_bytes(digest, 'big')
+    for nonce in rfc6979_nonces(secexp, digest):
+        r_x, r_y = point_mul_g(nonce)
+        signature = finish_signature(secexp, z, inverse_mod(nonce, N), r_x,
+                                     r_y)
+        if signature is not None:
+            return signature
+
+
+def sign_digests(pairs):
+    '''Sign many (secexp, digest) pairs, sharing the inversions'''
+    for secexp, digest in pairs:
+        check_secexp(secexp)
+        check_digest(digest)
+    nonces = [next(rfc6979_nonces(secexp, digest)) for secexp, digest in pairs]
+    points = batch_to_affine([point_mul_g_jacobian(nonce)
+                              for nonce in nonces])
+    signatures = []
+    for (secexp, digest), nonce_inv, (r_x, r_y) in zip(
+            pairs, batch_inverse(nonces, N), points):
+        signature = finish_signature(secexp, int.from_bytes(digest, 'big'),
+                                     nonce_inv, r_x, r_y)
+        if signature is None:
+            # r or s of 0 needs the next nonce, never seen in practice
+            signature = sign_digest(secexp, digest)
+        signatures.append(signature)
+    return signatures
+
+
+def int_to_der(value):
+    '''DER INTEGER, a leading zero keeps it positive'''
+    raw = value.to_bytes((value.bit_length() + 8) // 8, 'big')
+    return b'\x02' + bytes([len(raw)]) + raw
+
+
+def sig_to_der(r, s, recid=None, compressed=None):
+    '''DER encoded signature'''
+    body = int_to_der(r) + int_to_der(s)
+    return b'\x30' + bytes([len(body)]) + body
+
+
+def sig_from_der(sig_der):
+    '''(r, s) of a strict DER signature'''
+    if (len(sig_der) < 8 or sig_der[0] != 0x30
+            or sig_der[1] != len(sig_der) - 2):
+        raise Exception('Invalid DER signature')
+    values, pos = [], 2
+    for _ in range(2):
+        if pos + 2 > len(sig_der) or sig_der[pos] != 0x02:
+            raise Exception('Invalid DER signature')
+        length = sig_der[pos + 1]
+        raw = sig_der[pos + 2:pos + 2 + length]
+        if (not length or len(raw) != length or raw[0] & 0x80
+                or (length > 1 and not raw[0] and not raw[1] & 0x80)):
+            raise Exception('Invalid DER signature')
+        values.append(int.from_bytes(raw, 'big'))
+        pos += 2 + length
+    if pos != len(sig_der):
+        raise Exception('Invalid DER signature')
+    return values[0], values[1]
+
+
+def sig_to_compact(r, s, recid, compressed=True):
+    '''65-byte recoverable signature: header, r, s'''
+    header = (COMPACT_HEADER_BASE + recid +
+              (COMPACT_HEADER_COMPRESSED if compressed else 0))
+    return bytes([header]) + r.to_bytes(32, 'big') + s.to_bytes(32, 'big')
+
+
+def sig_from_compact(sig_compact):
+    '''(r, s, recid, compressed) of a 65-byte recoverable signature'''
+    if len(sig_compact) != 65:
+        raise Exception('Invalid compact signature length: %d' %
+                        len(sig_compact))
+    header = sig_compact[0] - COMPACT_HEADER_BASE
+    if not 0 <= header < 8:
+        raise Exception('Invalid compact signature header')
+    return (int.from_bytes(sig_compact[1:33], 'big'),
+            int.from_bytes(sig_compact[33:], 'big'), header & 3,
+            bool(header & COMPACT_HEADER_COMPRESSED))
+
+
+SIG_ENCODERS = {
+    DER: sig_to_der,
+    COMPACT: sig_to_compact,
+}
+
+
+def sign_chunk(sig_fmt, items):
+    '''Worker: encoded signatures of (priv_key_raw, digest, compressed)'''
+    encode = SIG_ENCODERS[sig_fmt]
+    signatures = sign_digests([(int.from_bytes(priv_key_raw, 'big'), digest)
+                               for priv_key_raw, digest, _ in items])
+    return [
+        encode(r, s, recid, compressed)
+        for (r, s, recid), (_, _, compressed) in zip(signatures, items)
+    ]
+
+
+def sign_many(items, sig_fmt=DER, workers=None,
+              chunk_size=DEFAULT_SIGN_CHUNK_SIZE):
+    '''Sign (priv_key_raw, digest, compressed) items across a process pool.
+
+    compressed only matters for COMPACT signatures. Returns the encoded
+    signatures in input order.
+    '''
+    if sig_fmt not in SIG_ENCODERS:
+        raise Exception('Invalid signature format: %s' % sig_fmt)
+    func = functools.partial(sign_chunk, sig_fmt)
+    signatures = []
+    for chunk in imap_chunks(func, items, workers, chunk_size):
+        signatures.extend(chunk)
+    return signatures
+
+
+def sign_message(priv_key_raw, message, compressed=True):
+    '''Base64 compact signature of a message, as Bitcoin signmessage'''
+    r, s, recid = sign_digest(int.from_bytes(priv_key_raw, 'big'),
+                              message_digest(message))
+    return base64.b64encode(sig_to_compact(r, s, recid,
+                                           compressed)).decode('ascii')
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+from cryptux.bitcoin import Account, Wallet
+from cryptux.bitcoin.test_bitcoin_gen_addr import TEST_CASES_HEX
+from cryptux.bitcoin.test_bitcoin_gen_addr import TEST_CASES_WIF
+
+
+def test_account_from_wif():
+    '''Accounts round-trip their WIF and derive the expected address'''
+    for test_case in TEST_CASES_WIF:
+        account = Wallet.account_from_wif(test_case['priv'])
+        assert account.address == test_case['addr']
+        assert account.wif == test_case['priv']
+        assert account.address is account.address
+        assert not hasattr(account, '__dict__')
+
+
+def test_account_with_known_pub_key():
+    '''A known public key is used as is, without EC multiplication'''
+    for test_case in TEST_CASES_HEX:
+        account = Wallet.account_from_hex(test_case['priv'],
+                                          test_case['network_type'],
+                                          test_case['key_fmt'])
+        known = Account(account.priv_key_raw, account.network_type,
+                        account.key_fmt, account.pub_key_raw)
+        assert known.address == test_case['addr']
+        accounts = Wallet.accounts_from_hex_many(
+            [test_case['priv']] * 2, test_case['network_type'],
+            test_case['key_fmt'])
+        assert [acc.address for acc in accounts] == [test_case['addr']] * 2
+
+
+def test_account_rejects_invalid_priv_key():
+    '''Short, zero and out of range keys do not make an account'''
+    for priv_key_hex in ('01' * 31, '01' * 33, '00' * 32, 'ff' * 32):
+        for make_account in (Wallet.account_from_hex,
+                             lambda key: Wallet.accounts_from_hex_many([key])):
+            try:
+                make_account(priv_key_hex)
+            except Exception:
+                pass
+            else:
+                assert False, 'Account from invalid key: %s' % priv_key_hex
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+import io
+import mmap
+import os
+
+from cryptux.bitcoin import AccountBatch, Wallet
+from cryptux.bitcoin.account_batch import N_BYTES, draw_priv_keys
+from cryptux.bitcoin.constants import MAINNET, TESTNET, COMPRESSED
+from cryptux.bitcoin.constants import UNCOMPRESSED
+
+
+def test_gen_accounts():
+    '''Rows match accounts derived one by one from their keys'''
+    for network_type, key_fmt, workers in ((MAINNET, COMPRESSED, 1),
+                                           (TESTNET, UNCOMPRESSED, 2)):
+        batch = AccountBatch.generate(25, network_type, key_fmt, workers,
+                                      chunk_size=10)
+        assert len(batch) == 25
+        assert (batch.priv_keys.nbytes, batch.pub_keys.nbytes,
+                batch.hash160s.nbytes) == (25 * 32, 25 * 33, 25 * 20)
+        assert len(set(batch.priv_keys[i * 32:(i + 1) * 32].tobytes()
+                       for i in range(25))) == 25
+        for index, address in enumerate(batch.addresses()):
+            account = batch[index]
+            expected = Wallet.account_from_hex(
+                account.priv_key_raw.hex(), network_type, key_fmt)
+            assert address == account.address == expected.address
+            assert account.pub_key_raw == expected.pub_key_raw
+            assert account.wif == expected.wif
+        assert batch[-1].address == batch.address(24)
+    assert len(Wallet.gen_accounts(3)) == 3
+
+
+def test_draw_priv_keys_rejects_out_of_range(monkeypatch):
+    '''Scalars 0 and >= N are drawn again'''
+    blocks = iter([bytes(32) + b'\x01' * 32 + N_BYTES, b'\x02' * 64])
+    monkeypatch.setattr(os, 'urandom', lambda size: next(blocks)[:size])
+    assert draw_priv_keys(3) == b'\x01' * 32 + b'\x02' * 64
+
+
+def test_account_batch_export(tmpdir):
+    '''Binary exports load back memory-mapped, CSV has one row per key'''
+    batch = Wallet.gen_accounts(10, TESTNET, UNCOMPRESSED, workers=1)
+    path = str(tmpdir.join('accounts.bin'))
+    batch.save(path)
+    with AccountBatch.load(path) as loaded:
+        assert (loaded.network_type, loaded.key_fmt) == (TESTNET,
+                                                         UNCOMPRESSED)
+        assert list(loaded.addresses()) == list(batch.addresses())
+        assert loaded.priv_keys == batch.priv_keys
+        assert loaded[3].wif == batch[3].wif
+    out = io.StringIO()
+    batch.write_csv(out, include_wif=True)
+    lines = out.getvalue().splitlines()
+    assert lines[0] == 'address,pub_key,wif'
+    assert lines[1] == ','.join([batch[0].address,
+                                 batch.pub_key_compressed(0).hex(),
+                                 batch[0].wif])
+    assert len(lines) == 11
+
+
+def test_account_batch_load_rejects(tmpdir, monkeypatch):
+    '''Empty, truncated or foreign files are refused, nothing left mapped'''
+    batch = Wallet.gen_accounts(10, workers=1)
+    path = str(tmpdir.join('accounts.bin'))
+    batch.save(path)
+    with open(path, 'rb') as fd:
+        data = fd.read()
+    mapped = []
+    real_mmap = mmap.mmap
+
+    def tracked_mmap(*args, **kwargs):
+        mapped.append(real_mmap(*args, **kwargs))
+        return mapped[-1]
+
+    monkeypatch.setattr(mmap, 'mmap', tracked_mmap)
+    bad_network = bytearray(data)
+    bad_network[10] = 9
+    for bad_data in (b'', data[:19], data[:100], bytes(bad_network)):
+        with open(path, 'wb') as fd:
+            fd.write(bad_data)
+        try:
+            AccountBatch.load(path)
+        except Exception as exc:
+            assert 'account batch' in str(exc)
+        else:
+            assert False, 'Loaded a bad batch of %d bytes' % len(bad_data)
+    assert len(mapped) == 2
+    assert all(m.closed for m in mapped)
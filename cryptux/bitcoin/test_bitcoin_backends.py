@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import os
+import subprocess
+import sys
+
+from cryptux.bitcoin import backends
+from cryptux.bitcoin import secp256k1
+
+TEST_SECEXPS = [
+    1,
+    2,
+    0x18E14A7B6A307F426A94F8114701E7C8E774E7F9A47E2C2035DB29A206321725,
+    secp256k1.N - 1,
+]
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+
+def test_ec_backends_agree():
+    '''Every available EC backend derives the same public keys'''
+    expected = [secp256k1.pub_key_from_secexp(secexp)
+                for secexp in TEST_SECEXPS]
+    for name in backends.available_backends(backends.EC):
+        backend = backends.load_backend(backends.EC, name)
+        assert [backend.pub_key_from_secexp(secexp)
+                for secexp in TEST_SECEXPS] == expected, name
+        assert [p_x.to_bytes(32, 'big') + p_y.to_bytes(32, 'big')
+                for p_x, p_y in backend.points_mul_g(TEST_SECEXPS)
+                ] == expected, name
+
+
+def test_hash_backends_agree():
+    '''Every available hash backend computes RIPEMD-160'''
+    for name in backends.available_backends(backends.HASH):
+        backend = backends.load_backend(backends.HASH, name)
+        assert backend.ripemd160(b'abc').hex() == \
+            '8eb208f7e05d987a9b044a8e98c6b087f15a0bfc', name
+
+
+def test_set_backend():
+    '''A pinned backend is used until the selection is reset'''
+    try:
+        backends.set_backend(backends.EC, 'ecdsa')
+        assert backends.get_backend(backends.EC).name == 'ecdsa'
+        assert backends.pub_key_from_secexp(1) == \
+            secp256k1.pub_key_from_secexp(1)
+    finally:
+        backends.set_backend(backends.EC)
+    try:
+        backends.set_backend(backends.EC, 'nope')
+    except Exception:
+        pass
+    else:
+        assert False, 'Accepted unknown backend'
+
+
+def run_python(code, **env):
+    return subprocess.check_output(
+        [sys.executable, '-c', code], cwd=REPO_DIR,
+        env=dict(os.environ, PYTHONPATH=REPO_DIR, **env)).decode('ascii')
+
+
+def test_env_pins_backend():
+    '''CRYPTUX_EC_BACKEND selects the EC backend'''
+    code = ('from cryptux.bitcoin import backends\n'
+            'print(backends.get_backend(backends.EC).name)\n')
+    assert run_python(code, CRYPTUX_EC_BACKEND='ecdsa').strip() == 'ecdsa'
+
+
+def test_import_is_lazy():
+    '''Importing the package loads no backend, ecdsa, numpy or the modules
+    only some Wallet methods need'''
+    code = ('import sys\n'
+            'import cryptux.bitcoin\n'
+            'from cryptux.bitcoin import Account, Wallet\n'
+            'print(sorted(name for name in ("ecdsa", "numpy", "coincurve",\n'
+            '                               "multiprocessing",\n'
+            '                               "cryptux.bitcoin.batch",\n'
+            '                               "cryptux.bitcoin.keystore",\n'
+            '                               "cryptux.bitcoin.signing")\n'
+            '             if name in sys.modules))\n')
+    assert run_python(code).strip() == '[]'
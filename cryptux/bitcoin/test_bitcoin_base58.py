@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+import os
+
+import cryptux.bitcoin.base58 as base58
+from cryptux.bitcoin.base58 import Base58, FIXED_WIDTHS
+
+TEST_CASES_BASE256 = [
+    {
+        'raw': b'',
+        'base58': '',
+    },
+    {
+        'raw': b'\x00\x00\x01',
+        'base58': '112',
+    },
+    {
+        'raw': b'hello world',
+        'base58': 'StV1DL6CwTryKyV',
+    },
+    {
+        'raw': bytes.fromhex(
+            '00010966776006953D5567439E5E39F86A0D273BEED61967F6'),
+        'base58': '16UwLL9Risc3QfPqBUvKofHmBQ7wMtjvM',
+    },
+]
+
+
+def test_base256_round_trip():
+    '''Test Base58 conversion of raw strings in both directions'''
+    for test_case in TEST_CASES_BASE256:
+        assert Base58.from_base256(test_case['raw']) == test_case['base58']
+        assert Base58.to_base256(test_case['base58']) == test_case['raw']
+
+
+def test_decode_invalid_char():
+    '''Chars outside of the alphabet are rejected'''
+    for base58_str in ['0OIl', '1I', 'abcé']:
+        try:
+            Base58.decode(base58_str)
+        except Exception as exc:
+            assert 'Invalid char' in str(exc)
+            continue
+        assert False, 'Accepted invalid Base58: %s' % base58_str
+
+
+def test_base58check_decode():
+    '''base58check_decode reverses base58check and verifies the checksum'''
+    base58cksum = Base58.base58check(b'\x00', b'\x01' * 20)
+    assert Base58.base58check_decode(base58cksum) == (b'\x00', b'\x01' * 20)
+    try:
+        Base58.base58check_decode(base58cksum[:-1] + '2')
+    except Exception as exc:
+        assert 'checksum' in str(exc)
+    else:
+        assert False, 'Accepted bad checksum'
+
+
+def check_encode_decode_many():
+    '''encode_many/decode_many agree with the one-at-a-time functions'''
+    for width in FIXED_WIDTHS:
+        raw_bytes_list = [b'\x00' * width, b'\xff' * width] + [
+            b'\x00' * (i % 3) + os.urandom(width - i % 3) for i in range(100)
+        ]
+        encoded = Base58.encode_many(raw_bytes_list)
+        assert encoded == [Base58.from_base256(raw) for raw in raw_bytes_list]
+        bad = ['0' * width, encoded[1] + '2', '1' * (width - 1)]
+        decoded = Base58.decode_many(encoded + bad, width)
+        assert decoded == raw_bytes_list + [None] * len(bad)
+
+
+def test_encode_decode_many():
+    '''Bulk conversion with and without NumPy'''
+    check_encode_decode_many()
+    numpy = base58.numpy
+    base58.numpy = None
+    try:
+        check_encode_decode_many()
+    finally:
+        base58.numpy = numpy
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+from cryptux.bitcoin.batch import derive_addresses, HEX, WIF
+from cryptux.bitcoin.test_bitcoin_gen_addr import TEST_CASES_HEX
+from cryptux.bitcoin.test_bitcoin_gen_addr import TEST_CASES_WIF
+
+BAD_WIF = 'L3BQRZyUzNPUPbt1HtGby9UwVb5iz2RyEk9jQk1vqhnL5CwFZHiY'
+
+
+def test_derive_addresses_wif_in_order():
+    '''Batch derivation keeps input order and reports errors per item'''
+    priv_keys = [case['priv'] for case in TEST_CASES_WIF] * 3 + [BAD_WIF]
+    results = derive_addresses(priv_keys, priv_key_fmt=WIF, workers=2,
+                               chunk_size=4)
+    assert len(results) == len(priv_keys)
+    expected = [case['addr'] for case in TEST_CASES_WIF] * 3
+    assert [result.address for result in results[:-1]] == expected
+    assert all(result.error is None for result in results[:-1])
+    assert results[-1].address is None
+    assert results[-1].error
+
+
+def test_derive_addresses_hex():
+    '''Batch derivation from HEX keys, including an invalid one'''
+    for test_case in TEST_CASES_HEX:
+        priv_keys = [test_case['priv'], '00' * 32]
+        results = derive_addresses(priv_keys, test_case['network_type'],
+                                   test_case['key_fmt'], HEX, workers=1)
+        assert results[0].address == test_case['addr']
+        assert results[1].address is None
+        assert results[1].error
+
+
+def test_derive_addresses_errors_hide_keys():
+    '''Error messages do not repeat the private key text'''
+    priv_keys = ['zz' + '11' * 31, '00' * 32, 'ff' * 32, BAD_WIF[:-1]]
+    results = derive_addresses(priv_keys[:3], workers=1)
+    results += derive_addresses(priv_keys[3:], priv_key_fmt=WIF, workers=1)
+    assert [result.error for result in results] == [
+        'Invalid HEX private key', 'Private key out of range',
+        'Private key out of range', 'Invalid WIF: BAD_LENGTH']
+    for priv_key, result in zip(priv_keys, results):
+        assert priv_key not in result.error
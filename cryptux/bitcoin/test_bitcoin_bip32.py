@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+from binascii import unhexlify
+
+from cryptux.bitcoin import HDKeychain
+from cryptux.bitcoin.gen_addr import bitcoin_addr_from_pub_key
+
+# https://github.com/bitcoin/bips/blob/master/bip-0032.mediawiki
+# Test vector 1
+TEST_SEED = unhexlify('000102030405060708090a0b0c0d0e0f')
+TEST_CASES_BIP32 = [
+    {
+        'path': 'm',
+        'xpub': (
+            'xpub661MyMwAqRbcFtXgS5sYJABqqG9YLmC4Q1Rdap9gSE8NqtwybGhe'
+            'PY2gZ29ESFjqJoCu1Rupje8YtGqsefD265TMg7usUDFdp6W1EGMcet8'),
+        'xprv': (
+            'xprv9s21ZrQH143K3QTDL4LXw2F7HEK3wJUD2nW2nRk4stbPy6cq3jPP'
+            'qjiChkVvvNKmPGJxWUtg6LnF5kejMRNNU3TGtRBeJgk33yuGBxrMPHi'),
+    },
+    {
+        'path': "m/0'",
+        'xpub': (
+            'xpub68Gmy5EdvgibQVfPdqkBBCHxA5htiqg55crXYuXoQRKfDBFA1WEj'
+            'WgP6LHhwBZeNK1VTsfTFUHCdrfp1bgwQ9xv5ski8PX9rL2dZXvgGDnw'),
+        'xprv': (
+            'xprv9uHRZZhk6KAJC1avXpDAp4MDc3sQKNxDiPvvkX8Br5ngLNv1TxvU'
+            'xt4cV1rGL5hj6KCesnDYUhd7oWgT11eZG7XnxHrnYeSvkzY7d2bhkJ7'),
+    },
+    {
+        'path': "m/0'/1",
+        'xpub': (
+            'xpub6ASuArnXKPbfEwhqN6e3mwBcDTgzisQN1wXN9BJcM47sSikHjJf3'
+            'UFHKkNAWbWMiGj7Wf5uMash7SyYq527Hqck2AxYysAA7xmALppuCkwQ'),
+        'xprv': (
+            'xprv9wTYmMFdV23N2TdNG573QoEsfRrWKQgWeibmLntzniatZvR9BmLn'
+            'vSxqu53Kw1UmYPxLgboyZQaXwTCg8MSY3H2EU4pWcQDnRnrVA1xe8fs'),
+    },
+    {
+        'path': "m/0'/1/2'",
+        'xpub': (
+            'xpub6D4BDPcP2GT577Vvch3R8wDkScZWzQzMMUm3PWbmWvVJrZwQY4VU'
+            'NgqFJPMM3No2dFDFGTsxxpG5uJh7n7epu4trkrX7x7DogT5Uv6fcLW5'),
+        'xprv': (
+            'xprv9z4pot5VBttmtdRTWfWQmoH1taj2axGVzFqSb8C9xaxKymcFzXBD'
+            'ptWmT7FwuEzG3ryjH4ktypQSAewRiNMjANTtpgP4mLTj34bhnZX7UiM'),
+    },
+    {
+        'path': "m/0'/1/2'/2",
+        'xpub': (
+            'xpub6FHa3pjLCk84BayeJxFW2SP4XRrFd1JYnxeLeU8EqN3vDfZmbqBq'
+            'aGJAyiLjTAwm6ZLRQUMv1ZACTj37sR62cfN7fe5JnJ7dh8zL4fiyLHV'),
+        'xprv': (
+            'xprvA2JDeKCSNNZky6uBCviVfJSKyQ1mDYahRjijr5idH2WwLsEd4Hsb'
+            '2Tyh8RfQMuPh7f7RtyzTtdrbdqqsunu5Mm3wDvUAKRHSC34sJ7in334'),
+    },
+    {
+        'path': "m/0'/1/2'/2/1000000000",
+        'xpub': (
+            'xpub6H1LXWLaKsWFhvm6RVpEL9P4KfRZSW7abD2ttkWP3SSQvnyA8FSV'
+            'qNTEcYFgJS2UaFcxupHiYkro49S8yGasTvXEYBVPamhGW6cFJodrTHy'),
+        'xprv': (
+            'xprvA41z7zogVVwxVSgdKUHDy1SKmdb533PjDz7J6N6mV6uS3ze1ai8F'
+            'Ha8kmHScGpWmj4WggLyQjgPie1rFSruoUihUZREPSL39UNdE3BBDu76'),
+    },
+]
+
+
+def test_bip32_vectors():
+    '''Private derivation matches the BIP32 test vector'''
+    keychain = HDKeychain.from_seed(TEST_SEED, cache_size=2)
+    for test_case in TEST_CASES_BIP32:
+        node = keychain.node(test_case['path'])
+        assert node.xpub == test_case['xpub']
+        assert node.xprv == test_case['xprv']
+    assert len(keychain._cache) == 2
+
+
+def test_bip32_public_derivation():
+    '''Public derivation and derive_range agree with private derivation'''
+    keychain = HDKeychain.from_seed(TEST_SEED)
+    xpub = keychain.node("m/0'/1").xpub
+    watch_only = HDKeychain.from_extended_key(xpub)
+    addrs = watch_only.derive_range('0', 5, 3)
+    for i, bitcoin_addr in enumerate(addrs):
+        node = keychain.node("m/0'/1/0/%d" % (5 + i))
+        assert node.address == bitcoin_addr
+        assert node.account().address == bitcoin_addr
+        assert bitcoin_addr_from_pub_key(node.pub_key,
+                                         node.network_type) == bitcoin_addr
+    try:
+        watch_only.node("0'")
+        assert False
+    except Exception as e:
+        assert 'Hardened' in str(e)
+
+
+def test_bip32_errors_hide_keys():
+    '''A mistyped extended key is refused without repeating it'''
+    xprv = TEST_CASES_BIP32[1]['xprv']
+    for typo in (xprv[:-1] + ('2' if xprv[-1] != '2' else '3'), xprv[:4]):
+        try:
+            HDKeychain.from_extended_key(typo)
+        except Exception as exc:
+            assert typo not in str(exc) and xprv[:20] not in str(exc)
+        else:
+            assert False, 'Accepted a mistyped key'
@@ -6,8 +6,12 @@
 import cryptux.bitcoin.constants as BCONST
 from cryptux.bitcoin.gen_addr import bitcoin_addr_from_priv_key_wif
 from cryptux.bitcoin.gen_addr import bitcoin_addr_from_priv_key_hex
+from cryptux.bitcoin.gen_addr import bitcoin_addrs_from_priv_keys_hex
 from cryptux.bitcoin.gen_addr import p2sh_addr_hex
 from cryptux.bitcoin.gen_addr import verify_bitcoin_addr
+from cryptux.bitcoin import base58, validate
+from cryptux.bitcoin.validate import validate_file, classify_addr
+from cryptux.bitcoin.validate import classify_lines_numpy, classify_lines_py
 
 TEST_CASES_HEX = [
     {
@@ -84,6 +88,15 @@ def test_gen_addr_from_priv_key_hex():
         print('This case was successful!')
 
 
+def test_gen_addrs_from_priv_keys_hex():
+    '''Test batched Bitcoin address generation from private keys in HEX'''
+    for test_case in TEST_CASES_HEX:
+        priv_keys_hex = [test_case['priv'], test_case['priv'].lower()]
+        bitcoin_addrs = bitcoin_addrs_from_priv_keys_hex(
+            priv_keys_hex, test_case['network_type'], test_case['key_fmt'])
+        assert bitcoin_addrs == [test_case['addr']] * 2
+
+
 def test_gen_add_from_redeem_script_hex():
     '''Test Bitcoin address generation from redeemScript in HEX'''
     for test_case in TEST_CASES_REDEEM_SCRIPT_HEX:
@@ -94,3 +107,61 @@ def test_gen_add_from_redeem_script_hex():
         assert bitcoin_addr == test_case['addr']
         assert verify_bitcoin_addr(bitcoin_addr)
         print('This case was successful!')
+
+
+TEST_CASES_INVALID_ADDR = [
+    {
+        'addr': '1D2Gme2513ncWsxB4DchzT3ukeNUXYVv3d',
+        'status': 'BAD_CHECKSUM',
+    },
+    {
+        'addr': '1D2Gme2513ncWsxB4DchzT3ukeNUXYVv30',
+        'status': 'BAD_CHAR',
+    },
+    {
+        'addr': '1D2Gme2513ncWsxB4DchzT3ukeNUXYV',
+        'status': 'BAD_LENGTH',
+    },
+]
+
+
+def test_verify_invalid_addr():
+    '''Invalid addresses are rejected instead of raising'''
+    for test_case in TEST_CASES_INVALID_ADDR:
+        assert not verify_bitcoin_addr(test_case['addr'])
+        assert classify_addr(test_case['addr']) == test_case['status']
+
+
+def test_validate_file(tmpdir):
+    '''Bulk validation reports line numbers and counts per status'''
+    addrs = [test_case['addr'] for test_case in TEST_CASES_WIF]
+    addrs += [test_case['addr'] for test_case in TEST_CASES_INVALID_ADDR]
+    addrs += [TEST_CASES_REDEEM_SCRIPT_HEX[0]['addr'], '']
+    path = tmpdir.join('addrs.txt')
+    path.write('\r\n'.join(addrs * 50))
+    report = validate_file(str(path), workers=2, chunk_bytes=1024)
+    assert report.counts['P2PKH_MAINNET'] == 4 * 50
+    assert report.counts['P2PKH_TESTNET'] == 2 * 50
+    assert report.counts['P2SH_MAINNET'] == 50
+    assert len(report.failures) == 3 * 50
+    line_number, addr, status = report.failures[-1]
+    assert line_number == len(addrs) * 50 - 2
+    assert (addr, status) == ('1D2Gme2513ncWsxB4DchzT3ukeNUXYV', 'BAD_LENGTH')
+
+
+def test_validate_file_numpy(tmpdir, monkeypatch):
+    '''The vectorized classifier agrees with the per-line one'''
+    if base58.numpy is None:
+        return
+    addrs = [test_case['addr'] for test_case in TEST_CASES_WIF]
+    addrs += [test_case['addr'] for test_case in TEST_CASES_INVALID_ADDR]
+    addrs += [TEST_CASES_REDEEM_SCRIPT_HEX[0]['addr'], '', '\r', '1' * 25,
+              'z' * 36, addrs[0][:-1] + '0', addrs[0] + '\xe9']
+    data = '\r\n'.join(addrs * 20).encode('utf-8')
+    for chunk in (data, data + b'\n', b'', b'\n'):
+        assert classify_lines_numpy(chunk) == classify_lines_py(chunk)
+    path = tmpdir.join('addrs.txt')
+    path.write_binary(data)
+    expected = validate_file(str(path), workers=1, chunk_bytes=1024)
+    monkeypatch.setattr(validate, 'NUMPY_MIN_BYTES', 0)
+    assert validate_file(str(path), workers=1, chunk_bytes=1024) == expected
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+import os
+
+from cryptux.bitcoin import Wallet
+from cryptux.bitcoin.constants import TESTNET, UNCOMPRESSED
+from cryptux.bitcoin.keystore import KEYSTORE_HEADER, RECORD, Keystore
+from cryptux.bitcoin.keystore import index_path_of
+from cryptux.bitcoin.test_bitcoin_gen_addr import TEST_CASES_WIF
+
+PASSPHRASE = 'correct horse battery staple'
+# Fast key derivation for the tests only
+ITERATIONS = 1000
+
+
+def test_keystore_round_trip(tmpdir):
+    '''Accounts come back by address and in append order'''
+    path = str(tmpdir.join('wallet.keys'))
+    accounts = [Wallet.account_from_wif(test_case['priv'])
+                for test_case in TEST_CASES_WIF]
+    with Wallet.save_keystore(accounts, path, PASSPHRASE, ITERATIONS):
+        pass
+    with Wallet.open_keystore(path, PASSPHRASE) as keystore:
+        assert len(keystore) == len(accounts)
+        for account in accounts:
+            found = keystore.get(account.address)
+            assert found.wif == account.wif
+            assert found.address == account.address
+        assert [account.wif for account in keystore] == [
+            account.wif for account in accounts]
+        assert keystore.get('1BgGZ9tcN4rm9KBzDn7KprQz87SZ26SAMx') is None
+    with Wallet.open_keystore(path) as keystore:
+        assert [record.hash160 for record in keystore.iter_records()] == [
+            account.hash160 for account in accounts]
+        try:
+            keystore.account(0)
+        except Exception:
+            pass
+        else:
+            assert False, 'Decrypted without a passphrase'
+    try:
+        Wallet.open_keystore(path, 'wrong')
+    except Exception:
+        pass
+    else:
+        assert False, 'Opened with a wrong passphrase'
+
+
+def test_keystore_grows_index(tmpdir):
+    '''Appends past the index capacity rehash it, across networks'''
+    path = str(tmpdir.join('wallet.keys'))
+    accounts = Wallet.accounts_from_hex_many(
+        ['%064x' % secexp for secexp in range(1, 41)])
+    accounts += Wallet.accounts_from_hex_many(
+        ['%064x' % secexp for secexp in range(1, 41)], TESTNET, UNCOMPRESSED)
+    with Keystore.create(path, PASSPHRASE, ITERATIONS,
+                         index_slots=8) as keystore:
+        for account in accounts:
+            keystore.append(account)
+        assert keystore.slot_count >= 2 * len(accounts)
+        for record_no, account in enumerate(accounts):
+            assert keystore.find(account.address) == record_no
+
+
+def test_keystore_crash_recovery(tmpdir):
+    '''A torn append is dropped and a stale index is caught up'''
+    path = str(tmpdir.join('wallet.keys'))
+    accounts = [Wallet.account_from_wif(test_case['priv'])
+                for test_case in TEST_CASES_WIF]
+    with Wallet.save_keystore(accounts[:2], path, PASSPHRASE, ITERATIONS):
+        pass
+    index_path = index_path_of(path)
+    with open(index_path, 'rb') as fd:
+        stale_index = fd.read()
+    with Wallet.open_keystore(path, PASSPHRASE, writable=True) as keystore:
+        keystore.extend(accounts[2:])
+    # Index from before the last append, half a record written after it
+    with open(index_path, 'wb') as fd:
+        fd.write(stale_index)
+    with open(path, 'ab') as fd:
+        fd.write(os.urandom(RECORD.size // 2))
+    with Wallet.open_keystore(path, PASSPHRASE) as keystore:
+        assert len(keystore) == len(accounts)
+        assert keystore.get(accounts[-1].address).wif == accounts[-1].wif
+    with Wallet.open_keystore(path, PASSPHRASE, writable=True) as keystore:
+        assert keystore.indexed == len(accounts)
+    # Opening for appending truncated the torn record
+    assert os.path.getsize(path) == (KEYSTORE_HEADER.size +
+                                     len(accounts) * RECORD.size)
+    # A missing index is rebuilt from the records, in memory only when
+    # the keystore is read-only
+    os.unlink(index_path)
+    with Wallet.open_keystore(path) as keystore:
+        for record_no, account in enumerate(accounts):
+            assert keystore.find(account.address) == record_no
+    assert not os.path.exists(index_path)
+    with Wallet.open_keystore(path, writable=True) as keystore:
+        assert keystore.find(accounts[-1].address) == len(accounts) - 1
+    assert os.path.exists(index_path)
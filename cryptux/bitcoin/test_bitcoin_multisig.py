@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+import itertools
+from binascii import unhexlify
+
+from cryptux.bitcoin.constants import TESTNET
+from cryptux.bitcoin.backends import pub_key_from_secexp
+from cryptux.bitcoin.multisig import iter_multisig_p2sh_addrs
+from cryptux.bitcoin.multisig import multisig_p2sh_addr
+from cryptux.bitcoin.multisig import multisig_redeem_script
+from cryptux.bitcoin.test_bitcoin_gen_addr import TEST_CASES_REDEEM_SCRIPT_HEX
+
+# https://github.com/bitcoin/bips/blob/master/bip-0067.mediawiki
+TEST_CASES_BIP67 = [
+    {
+        'pub_keys': [
+            '02ff12471208c14bd580709cb2358d98'
+            '975247d8765f92bc25eab3b2763ed605f8',
+            '02fe6f0a5a297eb38c391581c4413e08'
+            '4773ea23954d93f7753db7dc0adc188b2f',
+        ],
+        'm': 2,
+        'redeemScript': (
+            '5221'
+            '02fe6f0a5a297eb38c391581c4413e08'
+            '4773ea23954d93f7753db7dc0adc188b2f'
+            '21'
+            '02ff12471208c14bd580709cb2358d98'
+            '975247d8765f92bc25eab3b2763ed605f8'
+            '52ae'),
+        'addr': '39bgKC7RFbpoCRbtD5KEdkYKtNyhpsNa3Z',
+    },
+]
+
+
+def test_multisig_redeem_script():
+    '''Standard scripts, BIP67 sorted or in the given order'''
+    for test_case in TEST_CASES_BIP67:
+        redeem_script = multisig_redeem_script(test_case['m'],
+                                               test_case['pub_keys'])
+        assert redeem_script.hex() == test_case['redeemScript']
+        assert multisig_p2sh_addr(test_case['m'],
+                                  test_case['pub_keys']) == test_case['addr']
+    for test_case in TEST_CASES_REDEEM_SCRIPT_HEX:
+        redeem_script = unhexlify(test_case['redeemScript'])
+        pub_keys = [redeem_script[2 + i * 66:67 + i * 66] for i in range(3)]
+        assert multisig_redeem_script(2, pub_keys, sort=False,
+                                      compress=False) == redeem_script
+        assert multisig_p2sh_addr(2, pub_keys, test_case['network_type'],
+                                  sort=False, compress=False) == (
+            test_case['addr'])
+    for m, n in ((0, 1), (3, 2), (1, 17)):
+        try:
+            multisig_redeem_script(m, TEST_CASES_BIP67[0]['pub_keys'][:1] * n)
+        except ValueError:
+            pass
+        else:
+            assert False, 'Built a %d-of-%d script' % (m, n)
+
+
+def test_iter_multisig_p2sh_addrs():
+    '''Streamed combinations match the one-by-one addresses'''
+    pub_keys = [pub_key_from_secexp(secexp) for secexp in range(1, 8)]
+    for workers in (1, 2):
+        streamed = list(iter_multisig_p2sh_addrs(2, 3, pub_keys, TESTNET,
+                                                 workers=workers,
+                                                 chunk_size=4))
+        assert len(streamed) == 35
+        assert sorted(sorted(key_indices) for key_indices, _ in streamed) == [
+            list(combination)
+            for combination in itertools.combinations(range(7), 3)]
+        for key_indices, address in streamed:
+            combination = [pub_keys[i] for i in key_indices]
+            assert address == multisig_p2sh_addr(2, combination, TESTNET)
+            # key_indices are in script order
+            assert address == multisig_p2sh_addr(2, combination, TESTNET,
+                                                 sort=False)
+
+
+def test_iter_multisig_p2sh_addrs_interleaved():
+    '''In-process generators over different pools can be interleaved'''
+    pools = [[pub_key_from_secexp(secexp) for secexp in range(1, 7)],
+             [pub_key_from_secexp(secexp) for secexp in range(7, 13)]]
+    generators = [iter_multisig_p2sh_addrs(1, 2, pub_keys, workers=1,
+                                           chunk_size=2)
+                  for pub_keys in pools]
+    for streamed in zip(*generators):
+        for pub_keys, (key_indices, address) in zip(pools, streamed):
+            assert address == multisig_p2sh_addr(
+                1, [pub_keys[i] for i in key_indices])
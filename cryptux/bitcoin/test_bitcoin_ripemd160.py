@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+import hashlib
+import os
+
+from cryptux.bitcoin import backends, ripemd160
+from cryptux.bitcoin.hashes import hash160, hash160_many
+
+# https://homes.esat.kuleuven.be/~bosselae/ripemd160.html
+TEST_CASES_RIPEMD160 = [
+    (b'', '9c1185a5c5e9fc54612808977ee8f548b2258d31'),
+    (b'a', '0bdc9d2d256b3ee9daae347be6f4dc835a467ffe'),
+    (b'abc', '8eb208f7e05d987a9b044a8e98c6b087f15a0bfc'),
+    (b'message digest', '5d0689ef49d2fae572b881b123a85ffa21595f36'),
+    (b'abcdefghijklmnopqrstuvwxyz',
+     'f71c27109c692c1b56bbdceb5b9d2865b3708dbc'),
+    (b'abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq',
+     '12a053384a9c0c88e405a06c27dcf49ada62eb2b'),
+    (b'12345678901234567890123456789012345678901234567890123456789012345678'
+     b'901234567890', '9b752e45573d4b39f4dbd3323cab82bf63326bfb'),
+]
+
+
+def test_ripemd160_vectors():
+    '''Reference vectors, across the one and two block paddings'''
+    for data, digest_hex in TEST_CASES_RIPEMD160:
+        assert ripemd160.ripemd160(data).hex() == digest_hex, data
+
+
+def test_ripemd160_32_byte_messages():
+    '''The single block path of SHA-256 digests, scalar and vectorized'''
+    messages = [os.urandom(32) for _ in range(ripemd160.NUMPY_MIN_BATCH)]
+    expected = [ripemd160.ripemd160(message) for message in messages]
+    if 'ripemd160' in hashlib.algorithms_available:
+        assert expected == [hashlib.new('ripemd160', message).digest()
+                            for message in messages]
+    assert ripemd160.ripemd160_many(messages) == expected
+    if ripemd160.load_numpy() is not None:
+        assert ripemd160.numpy_ripemd160_32(messages) == expected
+
+
+def test_hash160_many():
+    '''Same digests as hash160 for compressed and uncompressed keys'''
+    pub_keys = [os.urandom(33) for _ in range(70)] + [os.urandom(65)]
+    assert hash160_many(pub_keys) == [hash160(pub_key)
+                                      for pub_key in pub_keys]
+    assert hash160_many([]) == []
+
+
+def test_fallback_without_openssl_ripemd160(monkeypatch):
+    '''The builtin backend is picked when hashlib cannot do RIPEMD-160'''
+    new = hashlib.new
+
+    def new_without_ripemd160(name, *args, **kwargs):
+        if name.lower() == 'ripemd160':
+            raise ValueError('unsupported hash type ' + name)
+        return new(name, *args, **kwargs)
+
+    monkeypatch.setattr(hashlib, 'new', new_without_ripemd160)
+    monkeypatch.delenv(backends.BACKEND_ENV_VARS[backends.HASH],
+                       raising=False)
+    backends.set_backend(backends.HASH)
+    try:
+        try:
+            backends.load_backend(backends.HASH, 'hashlib')
+        except ValueError:
+            pass
+        else:
+            assert False, 'hashlib backend loaded without RIPEMD-160'
+        assert backends.get_backend(backends.HASH).name != 'hashlib'
+        assert hash160(b'\x02' + b'\x11' * 32).hex() == \
+            'adfce54f529b2154e3c361bbe3f7d41db0635717'
+    finally:
+        backends.set_backend(backends.HASH)
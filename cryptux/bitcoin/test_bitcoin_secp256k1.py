@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+from ecdsa import SigningKey, SECP256k1
+
+from cryptux.bitcoin import secp256k1
+
+TEST_SECEXPS = [
+    1,
+    2,
+    255,
+    256,
+    0x18E14A7B6A307F426A94F8114701E7C8E774E7F9A47E2C2035DB29A206321725,
+    secp256k1.N - 1,
+]
+
+
+def test_pub_key_matches_ecdsa():
+    '''The fixed-base engine must agree with python-ecdsa'''
+    for secexp in TEST_SECEXPS:
+        signing_key = SigningKey.from_secret_exponent(secexp, curve=SECP256k1)
+        expected = signing_key.get_verifying_key().to_string()
+        assert secp256k1.pub_key_from_secexp(secexp) == expected
+
+
+def test_secexp_out_of_range():
+    '''Zero and the group order are not valid private keys'''
+    for secexp in [0, secp256k1.N]:
+        try:
+            secp256k1.pub_key_from_secexp(secexp)
+        except ValueError:
+            continue
+        assert False, 'Accepted invalid private key: %x' % secexp
+
+
+def test_g_table_cache_round_trip(tmpdir):
+    '''The table survives a save/load cycle and rejects corruption'''
+    rows = secp256k1.get_g_table()
+    path = str(tmpdir.join(secp256k1.TABLE_FILE_NAME))
+    secp256k1.save_g_table(rows, path)
+    assert secp256k1.load_g_table(path) == rows
+    with open(path, 'r+b') as fd:
+        fd.seek(100)
+        fd.write(b'\xff')
+    assert secp256k1.load_g_table(path) is None
+
+
+def test_batch_to_affine():
+    '''One shared inversion gives the same points as one inversion each'''
+    points = [secp256k1.point_mul_g_jacobian(secexp)
+              for secexp in TEST_SECEXPS]
+    expected = [secp256k1.to_affine(point) for point in points]
+    assert secp256k1.batch_to_affine(points) == expected
+    assert secp256k1.points_mul_g(TEST_SECEXPS) == expected
+    assert secp256k1.batch_to_affine([]) == []
+
+
+def test_point_mul_add_g():
+    '''u1*G + u2*(k*G) == (u1 + u2*k)*G, through the GLV split'''
+    assert secp256k1.point_mul_g(secp256k1.LAMBDA) == (
+        secp256k1.BETA * secp256k1.GX % secp256k1.P, secp256k1.GY)
+    for k in TEST_SECEXPS:
+        table = secp256k1.odd_multiples(*secp256k1.point_mul_g(k))
+        for u1, u2 in [(1, 1), (0, 5), (7, secp256k1.N - 3),
+                       (TEST_SECEXPS[4], secp256k1.LAMBDA)]:
+            expected = (u1 + u2 * k) % secp256k1.N
+            point = secp256k1.point_mul_add_g(u1, u2, table)
+            if not expected:
+                assert not point[2]
+                continue
+            assert secp256k1.to_affine(point) == secp256k1.point_mul_g(
+                expected)
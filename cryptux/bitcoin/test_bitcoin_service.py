@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+import asyncio
+import os
+import socket
+
+from cryptux.bitcoin.client import ServiceClient
+from cryptux.bitcoin.constants import MAINNET, TESTNET, COMPRESSED
+from cryptux.bitcoin.constants import UNCOMPRESSED, WIF
+from cryptux.bitcoin.gen_addr import bitcoin_addr_from_priv_key_hex
+from cryptux.bitcoin.service import INVALID_PARAMS, Service
+from cryptux.bitcoin.service import check_request, run_batch
+from cryptux.bitcoin.test_bitcoin_gen_addr import TEST_CASES_WIF
+
+
+def run_with_service(tmpdir, func):
+    '''Run func(client) against a fresh service on a Unix socket'''
+    path = str(tmpdir.join('cryptux.sock'))
+
+    async def main():
+        service = await Service(workers=1).start(path)
+        try:
+            async with ServiceClient(path) as client:
+                return await func(client)
+        finally:
+            await service.close()
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+
+def test_service_methods(tmpdir):
+    '''Every method answers like the library functions'''
+    test_case = TEST_CASES_WIF[0]
+
+    async def calls(client):
+        imported = await client.import_wif(test_case['priv'])
+        derived = await client.derive_address(test_case['priv'], WIF)
+        exported = await client.export_wif(imported['priv_key_hex'],
+                                           imported['network_type'],
+                                           imported['key_fmt'])
+        valid = await client.verify_bitcoin_addr(test_case['addr'])
+        invalid = await client.verify_bitcoin_addr(test_case['addr'][:-1])
+        p2sh = await client.p2sh_addr_hex('51', TESTNET)
+        try:
+            await client.derive_address('00' * 32)
+        except Exception as exc:
+            error = str(exc)
+        else:
+            error = None
+        return imported, derived, exported, valid, invalid, p2sh, error
+
+    imported, derived, exported, valid, invalid, p2sh, error = (
+        run_with_service(tmpdir, calls))
+    assert imported['address'] == derived['address'] == test_case['addr']
+    assert exported == test_case['priv']
+    assert (valid, invalid) == (True, False)
+    assert p2sh.startswith('2')
+    assert error is not None and 'out of range' in error
+
+
+def test_service_errors_hide_keys(tmpdir):
+    '''Invalid keys are rejected without repeating them to the client'''
+    bad_keys = ['ff' * 32, '00' * 32, 'ab' * 31 + 'zz']
+
+    async def calls(client):
+        errors = []
+        for bad_key in bad_keys:
+            for call in (client.derive_address, client.export_wif):
+                try:
+                    await call(bad_key)
+                except Exception as exc:
+                    errors.append((bad_key, str(exc)))
+                else:
+                    assert False, 'Accepted an invalid key: %s' % bad_key
+        return errors
+
+    errors = run_with_service(tmpdir, calls)
+    assert len(errors) == 2 * len(bad_keys)
+    for bad_key, error in errors:
+        assert bad_key not in error and bad_key[:16] not in error
+
+
+def test_service_concurrent_calls(tmpdir):
+    '''Concurrent calls are batched and each gets its own answer'''
+    priv_keys_hex = ['%064x' % secexp for secexp in range(1, 201)]
+
+    async def calls(client):
+        return await asyncio.gather(*[
+            client.derive_address(priv_key_hex, network_type=TESTNET,
+                                  key_fmt=UNCOMPRESSED)
+            for priv_key_hex in priv_keys_hex
+        ] + [client.call('no_such_method')], return_exceptions=True)
+
+    results = run_with_service(tmpdir, calls)
+    assert [result['address'] for result in results[:-1]] == [
+        bitcoin_addr_from_priv_key_hex(priv_key_hex, TESTNET, UNCOMPRESSED)
+        for priv_key_hex in priv_keys_hex
+    ]
+    assert 'Method not found' in str(results[-1])
+
+
+def test_service_malformed_params(tmpdir):
+    '''A malformed call fails alone, not the batch it shares'''
+    good_addr = bitcoin_addr_from_priv_key_hex('11' * 32, MAINNET,
+                                               COMPRESSED)
+    bad_params = {'priv_key': '22' * 32, 'network_type': ['MAINNET']}
+    try:
+        check_request({'id': 1, 'method': 'derive_address',
+                       'params': bad_params})
+    except ValueError as exc:
+        assert exc.args[0] == INVALID_PARAMS
+    else:
+        assert False, 'Accepted a list as network_type'
+    # Past the front check, a batch still answers its valid calls
+    good, bad = run_batch([('derive_address', {'priv_key': '11' * 32}),
+                           ('derive_address', bad_params)])
+    assert good[0]['address'] == good_addr
+    assert bad[0] is None and bad[1]
+
+    async def calls(client):
+        return await asyncio.gather(
+            client.derive_address('11' * 32),
+            client.call('derive_address', **bad_params),
+            client.derive_address('33' * 32, key_fmt={'a': 1}),
+            return_exceptions=True)
+
+    good, bad, bad_fmt = run_with_service(tmpdir, calls)
+    assert good['address'] == good_addr
+    assert 'Invalid param: network_type' in str(bad)
+    assert 'Invalid param: key_fmt' in str(bad_fmt)
+
+
+def test_service_socket_path(tmpdir):
+    '''Only a socket is replaced at the path, and removed on close'''
+    path = str(tmpdir.join('cryptux.sock'))
+    with open(path, 'w') as fd:
+        fd.write('not a socket')
+
+    async def start_close():
+        service = Service(workers=1)
+        try:
+            await service.start(path)
+        except Exception as exc:
+            return str(exc)
+        await service.close()
+
+    loop = asyncio.new_event_loop()
+    try:
+        assert 'Not a socket' in loop.run_until_complete(start_close())
+        with open(path) as fd:
+            assert fd.read() == 'not a socket'
+        os.unlink(path)
+        assert loop.run_until_complete(start_close()) is None
+    finally:
+        loop.close()
+    assert not os.path.exists(path)
+    # A stale socket, left by a process that died, is replaced
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(path)
+    stale.close()
+    run_with_service(tmpdir, lambda client: asyncio.sleep(0))
+    assert not os.path.exists(path)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+import base64
+import hashlib
+
+from ecdsa import SigningKey, VerifyingKey, SECP256k1
+from ecdsa.util import sigdecode_der, sigencode_der, sigdecode_string
+
+from cryptux.bitcoin import Wallet
+from cryptux.bitcoin.signing import COMPACT, N, message_digest
+from cryptux.bitcoin.signing import sig_from_compact, sig_from_der
+from cryptux.bitcoin.test_bitcoin_gen_addr import TEST_CASES_HEX
+
+TEST_DIGESTS = [hashlib.sha256(b'%d' % i).digest() for i in range(20)]
+
+
+def test_sign_digest_rfc6979():
+    '''Same nonce as ecdsa's RFC6979 signing, S normalized to low S'''
+    for test_case in TEST_CASES_HEX:
+        account = Wallet.account_from_hex(test_case['priv'],
+                                          test_case['network_type'],
+                                          test_case['key_fmt'])
+        sk = SigningKey.from_string(account.priv_key_raw, curve=SECP256k1)
+        vk = sk.get_verifying_key()
+        for digest in TEST_DIGESTS[:5]:
+            sig_der = account.sign_digest(digest)
+            r, s = sig_from_der(sig_der)
+            expected_r, expected_s = sigdecode_der(
+                sk.sign_digest_deterministic(digest, hashfunc=hashlib.sha256,
+                                             sigencode=sigencode_der), N)
+            assert (r, s) == (expected_r, min(expected_s, N - expected_s))
+            assert vk.verify_digest(sig_der, digest, sigdecode=sigdecode_der)
+
+
+def test_sign_digests_batch():
+    '''Batch and pool signing match one-by-one signing'''
+    test_case = TEST_CASES_HEX[0]
+    account = Wallet.account_from_hex(test_case['priv'])
+    expected = [account.sign_digest(digest) for digest in TEST_DIGESTS]
+    assert account.sign_digests(TEST_DIGESTS, workers=1) == expected
+    assert Wallet.sign_many([(account, digest) for digest in TEST_DIGESTS],
+                            workers=2) == expected
+
+
+def test_sign_compact_recoverable():
+    '''Recovery id of compact signatures selects the signing key'''
+    for test_case in TEST_CASES_HEX:
+        account = Wallet.account_from_hex(test_case['priv'],
+                                          test_case['network_type'],
+                                          test_case['key_fmt'])
+        vk = VerifyingKey.from_string(account.pub_key_raw, curve=SECP256k1)
+        for digest in TEST_DIGESTS[:5]:
+            sig_compact = account.sign_digest(digest, COMPACT)
+            r, s, recid, compressed = sig_from_compact(sig_compact)
+            assert compressed == (test_case['key_fmt'] == 'COMPRESSED')
+            candidates = VerifyingKey.from_public_key_recovery_with_digest(
+                sig_compact[1:], digest, SECP256k1, sigdecode=sigdecode_string)
+            assert candidates[recid] == vk
+        sig_b64 = account.sign_message('cryptux')
+        digest = message_digest('cryptux')
+        assert sig_from_compact(base64.b64decode(sig_b64))[:2] == sig_from_der(
+            account.sign_digest(digest))
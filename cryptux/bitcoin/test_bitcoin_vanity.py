@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+
+import multiprocessing
+import os
+
+from cryptux.bitcoin import Wallet, vanity
+from cryptux.bitcoin.constants import TESTNET, UNCOMPRESSED
+from cryptux.bitcoin.vanity import vanity_search
+
+
+def test_vanity_search():
+    '''Vanity search returns a standard Account matching the pattern'''
+    account = vanity_search('mZ', TESTNET, UNCOMPRESSED, ignore_case=True,
+                            workers=1)
+    assert account.address.lower().startswith('mz')
+    assert Wallet.account_from_wif(account.wif).address == account.address
+
+
+def test_vanity_search_worker_died(monkeypatch):
+    '''A worker dying raises instead of waiting forever'''
+    if multiprocessing.get_start_method() != 'fork':
+        return
+
+    def die(*args):
+        os._exit(3)
+        yield
+
+    monkeypatch.setattr(vanity, 'search_batches', die)
+    try:
+        vanity_search('1', workers=2)
+    except Exception as exc:
+        assert 'exit code 3' in str(exc)
+    else:
+        assert False, 'Search returned without workers'
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+import hashlib
+
+from ecdsa import SigningKey, SECP256k1
+from ecdsa.util import sigencode_der
+
+from cryptux.bitcoin import Wallet
+from cryptux.bitcoin.signing import COMPACT
+from cryptux.bitcoin.verifying import recover_pub_key, verify_message
+from cryptux.bitcoin.test_bitcoin_gen_addr import TEST_CASES_HEX
+
+TEST_DIGESTS = [hashlib.sha256(b'%d' % i).digest() for i in range(8)]
+
+
+def test_verify_many():
+    '''One result per item, by public key or by address'''
+    for test_case in TEST_CASES_HEX:
+        account = Wallet.account_from_hex(test_case['priv'],
+                                          test_case['network_type'],
+                                          test_case['key_fmt'])
+        sigs = account.sign_digests(TEST_DIGESTS)
+        sigs_compact = account.sign_digests(TEST_DIGESTS, COMPACT)
+        items = []
+        for digest, sig, sig_compact in zip(TEST_DIGESTS, sigs, sigs_compact):
+            items += [(account.pub_key, digest, sig),
+                      (account.pub_key_raw, digest, sig_compact),
+                      (account.address, digest, sig),
+                      (account.address, digest, sig_compact)]
+        assert all(result.valid for result in Wallet.verify_many(items))
+        bad_items = [(account.pub_key, TEST_DIGESTS[1], sigs[0]),
+                     (account.address, TEST_DIGESTS[1], sigs_compact[0]),
+                     (account.pub_key, TEST_DIGESTS[0], sigs[0][:-1]),
+                     (account.pub_key, TEST_DIGESTS[0][:16], sigs[0])]
+        results = Wallet.verify_many(bad_items, workers=1)
+        assert [result.valid for result in results] == [False] * 4
+        assert [result.error is None for result in results] == [
+            True, True, False, False]
+
+
+def test_verify_ecdsa_signatures():
+    '''High-S signatures made by python-ecdsa verify too'''
+    test_case = TEST_CASES_HEX[0]
+    account = Wallet.account_from_hex(test_case['priv'])
+    sk = SigningKey.from_string(account.priv_key_raw, curve=SECP256k1)
+    for digest in TEST_DIGESTS:
+        sig = sk.sign_digest(digest, sigencode=sigencode_der)
+        assert account.verify_digest(digest, sig)
+
+
+def test_recover_pub_key():
+    '''Compact signatures give back the key in the signer's format'''
+    for test_case in TEST_CASES_HEX:
+        account = Wallet.account_from_hex(test_case['priv'],
+                                          test_case['network_type'],
+                                          test_case['key_fmt'])
+        for digest in TEST_DIGESTS:
+            sig_compact = account.sign_digest(digest, COMPACT)
+            assert recover_pub_key(digest, sig_compact) == account.pub_key
+        sig_b64 = account.sign_message('cryptux')
+        assert verify_message(account.address, 'cryptux', sig_b64)
+        assert not verify_message(account.address, 'cryptuX', sig_b64)
+        assert not verify_message(account.address, 'cryptux', 'not base64')
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+import mmap
+import random
+
+from cryptux.bitcoin import Wallet, base58
+from cryptux.bitcoin.watchlist import WatchList, write_index
+from cryptux.bitcoin.test_bitcoin_gen_addr import TEST_CASES_WIF
+
+
+def test_watch_list(tmpdir):
+    '''Index built from an address file answers hash160 lookups'''
+    addr_path = tmpdir.join('addrs.txt')
+    watched = [test_case['addr'] for test_case in TEST_CASES_WIF[:4]]
+    addr_path.write('\n'.join(watched + ['not-an-address', watched[0]]))
+    rejected = []
+    index_path = str(tmpdir.join('watch.idx'))
+    with WatchList.build(str(addr_path), index_path,
+                         rejected=rejected) as watch_list:
+        assert len(watch_list) == 4
+        assert rejected == [(5, 'not-an-address')]
+    with WatchList(index_path) as watch_list:
+        for test_case in TEST_CASES_WIF:
+            account = Wallet.account_from_wif(test_case['priv'])
+            expected = test_case['addr'] in watched
+            assert (account.hash160 in watch_list) == expected
+            assert watch_list.contains_addr(test_case['addr']) == expected
+        assert b'\x00' * 20 not in watch_list
+
+
+def test_watch_list_builders_agree(tmpdir, monkeypatch):
+    '''The NumPy and pure-Python builders write the same file'''
+    rng = random.Random(8)
+    hash160s = [bytes(rng.getrandbits(8) for _ in range(20))
+                for _ in range(500)]
+    # Duplicates and the highest words, where 64-bit arithmetic wraps
+    hash160s += hash160s[:50] + [b'\xff' * 20, b'\x00' * 20]
+    numpy_path = str(tmpdir.join('numpy.idx'))
+    python_path = str(tmpdir.join('python.idx'))
+    write_index(hash160s, numpy_path)
+    monkeypatch.setattr(base58, 'numpy', None)
+    write_index(hash160s, python_path)
+    with open(numpy_path, 'rb') as fd:
+        numpy_index = fd.read()
+    with open(python_path, 'rb') as fd:
+        assert fd.read() == numpy_index
+    with WatchList(python_path) as watch_list:
+        assert len(watch_list) == 502
+        assert all(hash160 in watch_list for hash160 in hash160s)
+
+
+def test_watch_list_rejects(tmpdir, monkeypatch):
+    '''Empty, short, foreign or truncated files are refused, unmapped'''
+    index_path = str(tmpdir.join('watch.idx'))
+    write_index([b'\x01' * 20], index_path)
+    with open(index_path, 'rb') as fd:
+        data = fd.read()
+    mapped = []
+    real_mmap = mmap.mmap
+
+    def tracked_mmap(*args, **kwargs):
+        mapped.append(real_mmap(*args, **kwargs))
+        return mapped[-1]
+
+    monkeypatch.setattr(mmap, 'mmap', tracked_mmap)
+    for bad_data in (b'', data[:10], b'X' + data[1:], data[:-1]):
+        with open(index_path, 'wb') as fd:
+            fd.write(bad_data)
+        try:
+            WatchList(index_path)
+        except Exception as exc:
+            assert 'watch-list index' in str(exc)
+        else:
+            assert False, 'Opened a bad index of %d bytes' % len(bad_data)
+    assert len(mapped) == 2
+    assert all(m.closed for m in mapped)
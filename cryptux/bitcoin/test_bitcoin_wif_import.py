@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+from cryptux.bitcoin import Wallet
+from cryptux.bitcoin.base58 import Base58
+from cryptux.bitcoin.constants import MAINNET, COMPRESSED
+from cryptux.bitcoin.gen_addr import priv_key_from_wif
+from cryptux.bitcoin.wif import BAD_CHAR, BAD_LENGTH, BAD_CHECKSUM
+from cryptux.bitcoin.wif import BAD_PREFIX, BAD_FLAG, BAD_RANGE
+from cryptux.bitcoin.wif import N_BYTES, decode_wif, decode_wifs
+from cryptux.bitcoin.wif import priv_key_to_wif
+from cryptux.bitcoin.wif_import import import_wif_file, import_wifs
+from cryptux.bitcoin.test_bitcoin_gen_addr import TEST_CASES_WIF
+
+PRIV_KEY_RAW = b'\x11' * 32
+GOOD_WIF = TEST_CASES_WIF[0]['priv']
+
+TEST_CASES_BAD_WIF = [
+    (GOOD_WIF[:10] + '0' + GOOD_WIF[11:], BAD_CHAR),
+    (GOOD_WIF[:10] + 'é' + GOOD_WIF[11:], BAD_CHAR),
+    (GOOD_WIF[:40], BAD_LENGTH),
+    ('z' * 51, BAD_LENGTH),
+    (GOOD_WIF[:-1] + ('2' if GOOD_WIF[-1] != '2' else '3'), BAD_CHECKSUM),
+    (Base58.base58check(b'\x81', PRIV_KEY_RAW + b'\x01'), BAD_PREFIX),
+    (Base58.base58check(b'\x80', PRIV_KEY_RAW + b'\x02'), BAD_FLAG),
+    (priv_key_to_wif(bytes(32), MAINNET, COMPRESSED), BAD_RANGE),
+    (priv_key_to_wif(N_BYTES, MAINNET, COMPRESSED), BAD_RANGE),
+]
+
+
+def test_decode_wif_errors():
+    '''Every check has its own error code, valid keys decode as before'''
+    for priv_key_wif, error in TEST_CASES_BAD_WIF:
+        assert decode_wif(priv_key_wif).error == error, priv_key_wif
+        try:
+            priv_key_from_wif(priv_key_wif)
+        except Exception as exc:
+            assert error in str(exc) and priv_key_wif not in str(exc)
+        else:
+            assert False, 'Decoded an invalid WIF: %s' % priv_key_wif
+    for test_case in TEST_CASES_WIF:
+        decoded = decode_wif(test_case['priv'])
+        assert decoded.error is None
+        assert priv_key_to_wif(decoded.priv_key_raw, decoded.network_type,
+                               decoded.key_fmt) == test_case['priv']
+    # Large batches go through the vectorized decoding when available
+    priv_keys_wif = [test_case['priv'] for test_case in TEST_CASES_WIF] * 40
+    priv_keys_wif += [priv_key_wif for priv_key_wif, _ in TEST_CASES_BAD_WIF]
+    assert decode_wifs(priv_keys_wif) == [decode_wif(priv_key_wif)
+                                          for priv_key_wif in priv_keys_wif]
+
+
+def test_import_wif_file(tmpdir):
+    '''Accounts or raw tuples in order, rejections by line number'''
+    lines = []
+    for test_case, (bad_wif, _) in zip(TEST_CASES_WIF * 3,
+                                       TEST_CASES_BAD_WIF):
+        lines += [test_case['priv'], '', bad_wif]
+    path = tmpdir.join('keys.txt')
+    path.write_text('\n'.join(lines) + '\n', 'utf-8')
+    expected_rejections = [
+        (3 * i + 3, bad_wif, error)
+        for i, (bad_wif, error) in enumerate(TEST_CASES_BAD_WIF)
+    ]
+    for workers in (1, 2):
+        accounts, rejections = import_wif_file(str(path), workers=workers,
+                                               chunk_size=4)
+        assert [account.address for account in accounts] == [
+            test_case['addr'] for test_case in TEST_CASES_WIF * 3
+        ][:len(TEST_CASES_BAD_WIF)]
+        assert rejections == expected_rejections
+    imported, rejections = import_wifs(lines, as_accounts=False, workers=1)
+    assert imported[0] == priv_key_from_wif(lines[0])
+    assert rejections == expected_rejections
+    accounts, rejections = Wallet.accounts_from_wif_many(lines, workers=1)
+    assert accounts[0].wif == lines[0]
+
+
+def test_import_wif_file_not_utf8(tmpdir):
+    '''Lines that are not UTF-8 are rejected, not fatal to the import'''
+    path = tmpdir.join('keys.txt')
+    path.write_binary(b'\n'.join([TEST_CASES_WIF[0]['priv'].encode('ascii'),
+                                  b'\xff' * 52,
+                                  TEST_CASES_WIF[1]['priv'].encode('ascii')]))
+    accounts, rejections = import_wif_file(str(path), workers=1)
+    assert [account.wif for account in accounts] == [
+        test_case['priv'] for test_case in TEST_CASES_WIF[:2]]
+    assert [(line_number, error)
+            for line_number, _, error in rejections] == [(2, BAD_CHAR)]
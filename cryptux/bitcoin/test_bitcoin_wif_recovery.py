@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+
+from cryptux.bitcoin.wif_recovery import recover_wif
+from cryptux.bitcoin.test_bitcoin_gen_addr import TEST_CASES_WIF
+
+
+def test_recover_unknown_chars():
+    '''Unknown and confusable chars are resolved by the checksum alone'''
+    for test_case in TEST_CASES_WIF:
+        priv_key_wif = test_case['priv']
+        damaged = '??' + priv_key_wif[2:20] + '?' + priv_key_wif[21:]
+        assert recover_wif(damaged, workers=1) == [priv_key_wif]
+        ambiguous = priv_key_wif[:30] + '0' + priv_key_wif[31:]
+        found = recover_wif(ambiguous, alternatives={30: priv_key_wif[30]},
+                            workers=1)
+        assert found == [priv_key_wif]
+
+
+def test_recover_missing_and_typo():
+    '''Missing chars and typos, confirmed against the address'''
+    for test_case in TEST_CASES_WIF:
+        priv_key_wif = test_case['priv']
+        found = recover_wif(priv_key_wif[:7] + priv_key_wif[8:], missing=1,
+                            bitcoin_addr=test_case['addr'], workers=1)
+        assert found == [priv_key_wif]
+        typo = 'z' if priv_key_wif[40] != 'z' else 'y'
+        found = recover_wif(priv_key_wif[:40] + typo + priv_key_wif[41:],
+                            typos=1, workers=1)
+        assert priv_key_wif in found
+
+
+def test_recover_checkpoint():
+    '''A finished search is resumed from its checkpoint without work'''
+    test_case = TEST_CASES_WIF[0]
+    priv_key_wif = test_case['priv']
+    damaged = priv_key_wif[:45] + '?' + priv_key_wif[46:]
+    path = os.path.join(tempfile.mkdtemp(), 'recovery.json')
+    progress = []
+    assert recover_wif(damaged, workers=1, checkpoint=path) == [priv_key_wif]
+    assert recover_wif(damaged, workers=1, checkpoint=path,
+                       progress=lambda *args: progress.append(args)) == [
+                           priv_key_wif]
+    assert not progress
+    try:
+        recover_wif(damaged, typos=1, workers=1, checkpoint=path)
+        assert False
+    except Exception as e:
+        assert 'another search' in str(e)
+    os.unlink(path)
@@ -0,0 +1,221 @@
+import functools
+import mmap
+import os
+from collections import namedtuple
+
+from . import base58
+from .base58 import Base58, BASE58_DIGITS, INVALID_DIGIT
+from .constants import NETWORK_TYPES, PUBKEY, P2SH
+from .hashes import hash256
+from .parallel import imap_chunks
+
+# Address classification. Valid addresses are tagged with their type and
+# network, everything else with the first check that failed.
+BAD_CHAR = 'BAD_CHAR'
+BAD_LENGTH = 'BAD_LENGTH'
+BAD_CHECKSUM = 'BAD_CHECKSUM'
+BAD_VERSION = 'BAD_VERSION'
+
+ADDR_VERSIONS = {}
+for _network_type, _prefixes in NETWORK_TYPES.items():
+    ADDR_VERSIONS[_prefixes[PUBKEY]] = 'P2PKH_%s' % _network_type
+    ADDR_VERSIONS[_prefixes[P2SH]] = 'P2SH_%s' % _network_type
+
+VALID_STATUSES = sorted(ADDR_VERSIONS.values())
+FAILURE_STATUSES = [BAD_CHAR, BAD_LENGTH, BAD_CHECKSUM, BAD_VERSION]
+STATUSES = VALID_STATUSES + FAILURE_STATUSES
+STATUS_INDEX = dict((status, i) for i, status in enumerate(STATUSES))
+
+# version (1) + hash160 (20) + checksum (4)
+ADDR_RAW_LEN = 25
+# '1' * 25 up to the Base58 form of 25 bytes of 0xFF
+ADDR_MIN_LEN = 25
+ADDR_MAX_LEN = 35
+
+# Files are split in ranges of this many bytes, one work unit each
+DEFAULT_CHUNK_BYTES = 4 * 1024 * 1024
+# Smaller ranges are not worth the NumPy setup
+NUMPY_MIN_BYTES = 64 * 1024
+
+# counts: status -> number of lines, failures: (line_number, addr, status)
+# with line numbers starting at 1. Empty lines are skipped.
+ValidationReport = namedtuple('ValidationReport', ['counts', 'failures'])
+
+
+def classify_addr_raw(addr_raw):
+    '''Classify 25 decoded bytes by version byte and checksum'''
+    if hash256(addr_raw[:21])[:4] != addr_raw[21:]:
+        return BAD_CHECKSUM
+    return ADDR_VERSIONS.get(addr_raw[:1], BAD_VERSION)
+
+
+def classify_addr_bytes(addr):
+    '''Classify an address given as ASCII bytes'''
+    if INVALID_DIGIT in addr.translate(BASE58_DIGITS):
+        return BAD_CHAR
+    if not ADDR_MIN_LEN <= len(addr) <= ADDR_MAX_LEN:
+        return BAD_LENGTH
+    addr_raw = Base58.to_base256(addr.decode('ascii'))
+    if len(addr_raw) != ADDR_RAW_LEN:
+        return BAD_LENGTH
+    return classify_addr_raw(addr_raw)
+
+
+def classify_addr(bitcoin_addr):
+    '''Classify a Bitcoin address, see STATUSES'''
+    try:
+        addr = bitcoin_addr.encode('ascii')
+    except UnicodeError:
+        return BAD_CHAR
+    return classify_addr_bytes(addr)
+
+
+def line_start(mm, pos):
+    '''Offset of the first line starting at or after pos'''
+    if pos <= 0:
+        return 0
+    newline = mm.find(b'\n', pos - 1)
+    return len(mm) if newline == -1 else newline + 1
+
+
+def read_range(path, start, end):
+    '''Bytes of the lines whose first byte lies in [start, end)'''
+    with open(path, 'rb') as fd:
+        if not os.fstat(fd.fileno()).st_size:
+            return b''
+        mm = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return mm[line_start(mm, start):line_start(mm, end)]
+        finally:
+            mm.close()
+
+
+def classify_lines_py(data):
+    '''Classify every line of data.
+
+    Returns (line_count, counts, failures) with counts indexed like STATUSES
+    and failures holding (line_index, start, end, status_index).
+    '''
+    lines = data.split(b'\n')
+    if lines[-1] == b'':
+        lines.pop()
+    counts = [0] * len(STATUSES)
+    failures = []
+    first_failure = STATUS_INDEX[FAILURE_STATUSES[0]]
+    offset = 0
+    for i, line in enumerate(lines):
+        # Only the CR of a CRLF line ending, as classify_lines_numpy
+        addr = line[:-1] if line.endswith(b'\r') else line
+        if addr:
+            status = STATUS_INDEX[classify_addr_bytes(addr)]
+            counts[status] += 1
+            if status >= first_failure:
+                failures.append((i, offset, offset + len(addr), status))
+        offset += len(line) + 1
+    return len(lines), counts, failures
+
+
+def classify_lines_numpy(data):
+    '''Vectorized classification without creating an object per line.
+
+    Lines are located with NumPy, grouped by length and gathered into
+    (lines, length) matrices that are decoded in one go. Only the SHA-256
+    checksum is computed per line. Same result as classify_lines_py.
+    '''
+    numpy = base58.numpy
+    chars = numpy.frombuffer(data, dtype=numpy.uint8)
+    newlines = numpy.flatnonzero(chars == ord('\n'))
+    starts = numpy.concatenate(([0], newlines + 1))
+    ends = numpy.concatenate((newlines, [len(chars)]))
+    if not data or data.endswith(b'\n'):
+        starts, ends = starts[:-1], ends[:-1]
+    has_cr = ends > starts
+    has_cr[has_cr] = chars[ends[has_cr] - 1] == ord('\r')
+    ends = ends - has_cr
+    lengths = ends - starts
+
+    statuses = numpy.full(len(starts), -1, dtype=numpy.int16)
+    for length in numpy.unique(lengths).tolist():
+        if not length:
+            continue
+        rows = numpy.flatnonzero(lengths == length)
+        matrix = chars[starts[rows, None] + numpy.arange(length)]
+        digits, valid_chars = base58.numpy_digits(matrix)
+        statuses[rows[~valid_chars]] = STATUS_INDEX[BAD_CHAR]
+        rows, digits = rows[valid_chars], digits[valid_chars]
+        if not ADDR_MIN_LEN <= length <= ADDR_MAX_LEN:
+            statuses[rows] = STATUS_INDEX[BAD_LENGTH]
+            continue
+        raw, valid_len = base58.numpy_decode_digits(digits, ADDR_RAW_LEN)
+        statuses[rows[~valid_len]] = STATUS_INDEX[BAD_LENGTH]
+        rows, raw = rows[valid_len], raw[valid_len]
+        raw_bytes = raw.tobytes()
+        statuses[rows] = [
+            STATUS_INDEX[classify_addr_raw(raw_bytes[i:i + ADDR_RAW_LEN])]
+            for i in range(0, len(raw_bytes), ADDR_RAW_LEN)
+        ]
+    counts = numpy.bincount(statuses[statuses >= 0],
+                            minlength=len(STATUSES)).tolist()
+    failed = numpy.flatnonzero(
+        statuses >= STATUS_INDEX[FAILURE_STATUSES[0]])
+    failures = list(
+        zip(failed.tolist(), starts[failed].tolist(), ends[failed].tolist(),
+            statuses[failed].tolist()))
+    return len(starts), counts, failures
+
+
+def validate_range(path, report_failures, byte_range):
+    '''Worker: validate the lines of one byte range of the file'''
+    start, end = byte_range[0]
+    data = read_range(path, start, end)
+    if base58.numpy is not None and len(data) >= NUMPY_MIN_BYTES:
+        line_count, counts, failures = classify_lines_numpy(data)
+    else:
+        line_count, counts, failures = classify_lines_py(data)
+    if not report_failures:
+        return line_count, counts, []
+    return line_count, counts, [
+        (i, data[addr_start:addr_end].decode('ascii', 'replace'),
+         STATUSES[status])
+        for i, addr_start, addr_end, status in failures
+    ]
+
+
+def iter_validate_file(path, workers=None, chunk_bytes=DEFAULT_CHUNK_BYTES,
+                       report_failures=True):
+    '''Validate a newline-delimited address file, range by range.
+
+    Yields a ValidationReport per range, in file order, so that failures
+    can be streamed out while the rest of the file is being processed.
+    '''
+    size = os.path.getsize(path)
+    byte_ranges = [(start, min(start + chunk_bytes, size))
+                   for start in range(0, size, chunk_bytes)]
+    func = functools.partial(validate_range, path, report_failures)
+    line_offset = 0
+    for line_count, counts, failures in imap_chunks(
+            func, byte_ranges, workers, chunk_size=1):
+        yield ValidationReport(
+            dict((STATUSES[i], count) for i, count in enumerate(counts)
+                 if count),
+            [(line_offset + i + 1, addr, status)
+             for i, addr, status in failures])
+        line_offset += line_count
+
+
+def validate_file(path, workers=None, chunk_bytes=DEFAULT_CHUNK_BYTES,
+                  report_failures=True):
+    '''Validate a newline-delimited address file across a process pool'''
+    counts = dict((status, 0) for status in STATUSES)
+    failures = []
+    for report in iter_validate_file(path, workers, chunk_bytes,
+                                     report_failures):
+        for status, count in report.counts.items():
+            counts[status] += count
+        failures.extend(report.failures)
+    return ValidationReport(counts, failures)
+
+
+def validate_addrs(bitcoin_addrs):
+    '''Classify many addresses held in memory'''
+    return [classify_addr(bitcoin_addr) for bitcoin_addr in bitcoin_addrs]
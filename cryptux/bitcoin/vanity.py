@@ -0,0 +1,160 @@
+import multiprocessing
+import os
+import queue
+import time
+
+from .account import Account
+from .base58 import Base58, BASE58_MAP
+from .constants import MAINNET, COMPRESSED, NETWORK_TYPES, PUBKEY
+from .gen_addr import PUB_KEY_POINT_FORMATS
+from .hashes import hash160_many
+from .parallel import cpu_count
+from .secp256k1 import N, GX, GY, batch_to_affine, jacobian_add_affine
+from .secp256k1 import point_mul_g_jacobian
+
+# Candidates are P, P+G, P+2G, ... : one mixed addition per key instead of
+# a scalar multiplication, and one inversion per batch for the affine form.
+DEFAULT_BATCH_SIZE = 1024
+# How often the workers report progress, in seconds
+PROGRESS_INTERVAL = 1.0
+
+
+def check_pattern(pattern, network_type, ignore_case):
+    '''Refuse patterns that no address of the network can match'''
+    for c in pattern:
+        if c not in BASE58_MAP and not (ignore_case and (
+                c.lower() in BASE58_MAP or c.upper() in BASE58_MAP)):
+            raise Exception('Invalid char, not in Base58: %c' % c)
+    # Every possible leading char of this network's P2PKH addresses
+    first_chars = set(
+        Base58.base58check(NETWORK_TYPES[network_type][PUBKEY],
+                           bytes([byte]) * 20)[0] for byte in (0, 0xFF))
+    if ignore_case:
+        first_chars |= set(c.upper() for c in first_chars)
+    if pattern and pattern[0] not in first_chars:
+        raise Exception('Addresses on %s start with %s' %
+                        (network_type, '/'.join(sorted(first_chars))))
+
+
+def random_secexp():
+    '''Random private key far enough from N for a long walk'''
+    while True:
+        secexp = int.from_bytes(os.urandom(32), 'big')
+        if 1 <= secexp < N - (1 << 64):
+            return secexp
+
+
+def matcher(pattern, ignore_case):
+    '''Predicate telling if an address starts with pattern'''
+    if ignore_case:
+        pattern = pattern.lower()
+        return lambda bitcoin_addr: bitcoin_addr.lower().startswith(pattern)
+    return lambda bitcoin_addr: bitcoin_addr.startswith(pattern)
+
+
+def search_batches(pattern, network_type, key_fmt, ignore_case, batch_size):
+    '''Walk from a random key, yield (keys_checked, secexp or None)'''
+    matches = matcher(pattern, ignore_case)
+    version = NETWORK_TYPES[network_type][PUBKEY]
+    fmt_point = PUB_KEY_POINT_FORMATS[key_fmt]
+    start = random_secexp()
+    point = point_mul_g_jacobian(start)
+    while True:
+        points = []
+        for _ in range(batch_size):
+            points.append(point)
+            point = jacobian_add_affine(point, GX, GY)
+        found = None
+        hash160s = hash160_many([fmt_point(p_x, p_y)
+                                 for p_x, p_y in batch_to_affine(points)])
+        for i, vk_hash160 in enumerate(hash160s):
+            bitcoin_addr = Base58.base58check(version, vk_hash160)
+            if matches(bitcoin_addr):
+                found = start + i
+                break
+        yield batch_size, found
+        start += batch_size
+
+
+def search_worker(args, results):
+    '''Worker process: search until a match, report progress on results'''
+    checked, last_report = 0, time.time()
+    for keys_checked, found in search_batches(*args):
+        checked += keys_checked
+        if found is not None:
+            results.put((checked, found))
+            return
+        if time.time() - last_report >= PROGRESS_INTERVAL:
+            results.put((checked, None))
+            checked, last_report = 0, time.time()
+
+
+def search_in_process(args, progress, max_keys):
+    '''Single process search'''
+    checked, started, last_report = 0, time.time(), time.time()
+    for keys_checked, found in search_batches(*args):
+        checked += keys_checked
+        if found is not None:
+            return found, checked
+        if max_keys is not None and checked >= max_keys:
+            return None, checked
+        if progress and time.time() - last_report >= PROGRESS_INTERVAL:
+            last_report = time.time()
+            progress(checked, checked / (last_report - started))
+
+
+def search_in_pool(args, workers, progress, max_keys):
+    '''One search process per worker, each walking from its own key'''
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=search_worker, args=(args, results))
+        for _ in range(workers)
+    ]
+    for proc in procs:
+        proc.daemon = True
+        proc.start()
+    checked, started = 0, time.time()
+    try:
+        while True:
+            try:
+                keys_checked, found = results.get(timeout=PROGRESS_INTERVAL)
+            except queue.Empty:
+                keys_checked, found = 0, None
+            # Workers only stop after reporting a match, with code 0
+            for proc in procs:
+                if proc.exitcode not in (None, 0):
+                    raise Exception('Vanity search worker died: exit code %d'
+                                    % proc.exitcode)
+            checked += keys_checked
+            if found is not None:
+                return found, checked
+            if max_keys is not None and checked >= max_keys:
+                return None, checked
+            if progress:
+                progress(checked, checked / (time.time() - started))
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.join()
+
+
+def vanity_search(pattern, network_type=MAINNET, key_fmt=COMPRESSED,
+                  ignore_case=False, workers=None, progress=None,
+                  max_keys=None, batch_size=DEFAULT_BATCH_SIZE):
+    '''Find a key whose address starts with pattern.
+
+    progress(keys_checked, keys_per_sec) is called about every second.
+    Returns the matching Account, or None once max_keys were checked.
+    '''
+    check_pattern(pattern, network_type, ignore_case)
+    if workers is None:
+        workers = cpu_count()
+    args = (pattern, network_type, key_fmt, ignore_case, batch_size)
+    if workers <= 1:
+        found, checked = search_in_process(args, progress, max_keys)
+    else:
+        found, checked = search_in_pool(args, workers, progress, max_keys)
+    if found is None:
+        return None
+    return Account(found.to_bytes(32, 'big'), network_type, key_fmt)
@@ -0,0 +1,189 @@
+# ECDSA verification and public key recovery over secp256k1
+#
+# u1*G + u2*Q is computed with the fixed-base table for G and a wNAF chain
+# for Q whose odd multiples are cached per public key. The result is
+# checked in Jacobian coordinates (r * Z^2 == X), so a valid signature
+# costs no modular inversion beyond the batched s^-1 mod N.
+
+import base64
+import functools
+from collections import namedtuple
+
+from .base58 import Base58
+from .constants import NETWORK_TYPES, PUBKEY
+from .gen_addr import compressed_pub_key_from_point
+from .gen_addr import uncompressed_pub_key_from_point
+from .hashes import hash160
+from .parallel import imap_chunks
+from .secp256k1 import N, P, batch_inverse, inverse_mod, odd_multiples
+from .secp256k1 import point_from_pub_key, point_from_x, point_mul_add_g
+from .secp256k1 import to_affine
+from .signing import COMPACT_HEADER_BASE, check_digest, message_digest
+from .signing import sig_from_compact, sig_from_der
+
+DEFAULT_VERIFY_CHUNK_SIZE = 256
+# Decompressed public keys and their wNAF tables kept per process
+PUB_KEY_CACHE_SIZE = 4096
+
+# One result per item: valid is False with error set for malformed input
+Verification = namedtuple('Verification', ['valid', 'error'])
+
+ADDR_VERSIONS = set(
+    prefixes[PUBKEY] for prefixes in NETWORK_TYPES.values())
+
+
+@functools.lru_cache(maxsize=PUB_KEY_CACHE_SIZE)
+def pub_key_table(pub_key):
+    '''wNAF table of a public key, decompressed once per process'''
+    return odd_multiples(*point_from_pub_key(pub_key))
+
+
+def decode_signature(signature):
+    '''(r, s, recid or None, compressed or None) of a DER/compact sig'''
+    if (len(signature) == 65 and
+            COMPACT_HEADER_BASE <= signature[0] < COMPACT_HEADER_BASE + 8):
+        return sig_from_compact(signature)
+    r, s = sig_from_der(signature)
+    return r, s, None, None
+
+
+def check_r_s(r, s):
+    if not (1 <= r < N and 1 <= s < N):
+        raise ValueError('Signature r or s out of range')
+
+
+def matches_r(point, r):
+    '''Does the affine x of a Jacobian point reduce to r mod N?'''
+    X, _, Z = point
+    if not Z:
+        return False
+    zz = Z * Z % P
+    # x mod N == r means x == r or x == r + N (only when r + N < P)
+    return r * zz % P == X or (r + N < P and (r + N) * zz % P == X)
+
+
+def verify_with_table(table, z, r, s_inv):
+    '''ECDSA check with a cached table and s^-1 already computed'''
+    return matches_r(point_mul_add_g(z * s_inv % N, r * s_inv % N, table), r)
+
+
+def recover_point(digest, r, s, recid):
+    '''Public point of a signature with recovery id recid'''
+    check_digest(digest)
+    check_r_s(r, s)
+    r_x = r + (recid >> 1) * N
+    if r_x >= P:
+        raise ValueError('Invalid recovery id')
+    r_point = point_from_x(r_x, recid & 1)
+    r_inv = inverse_mod(r, N)
+    z = int.from_bytes(digest, 'big')
+    # Q = r^-1 (s R - z G)
+    point = point_mul_add_g(-z * r_inv % N, s * r_inv % N,
+                            odd_multiples(*r_point))
+    return to_affine(point)
+
+
+def recover_pub_key(digest, sig_compact):
+    '''Formatted public key (compressed per the header) of a compact sig'''
+    r, s, recid, compressed = sig_from_compact(sig_compact)
+    point = recover_point(digest, r, s, recid)
+    if compressed:
+        return compressed_pub_key_from_point(*point)
+    return uncompressed_pub_key_from_point(*point)
+
+
+def addr_hash160(bitcoin_addr):
+    '''hash160 behind a P2PKH address'''
+    version, payload = Base58.base58check_decode(bitcoin_addr)
+    if version not in ADDR_VERSIONS or len(payload) != 20:
+        raise Exception('Not a P2PKH address: %s' % bitcoin_addr)
+    return payload
+
+
+def verify_addr_signature(bitcoin_addr, digest, r, s, recid, compressed):
+    '''Recover the key and compare its hash160 with the address.
+
+    DER signatures carry no recovery id: every candidate is tried, with
+    both public key formats.
+    '''
+    expected = addr_hash160(bitcoin_addr)
+    for candidate in ([recid] if recid is not None else range(4)):
+        try:
+            point = recover_point(digest, r, s, candidate)
+        except ValueError:
+            continue
+        if compressed in (None, True) and hash160(
+                compressed_pub_key_from_point(*point)) == expected:
+            return True
+        if compressed in (None, False) and hash160(
+                uncompressed_pub_key_from_point(*point)) == expected:
+            return True
+    return False
+
+
+def is_addr(key):
+    return isinstance(key, str)
+
+
+def verify_chunk(items):
+    '''Worker: Verification of (pub_key or address, digest, signature)'''
+    decoded = []
+    for key, digest, signature in items:
+        try:
+            check_digest(digest)
+            r, s, recid, compressed = decode_signature(signature)
+            check_r_s(r, s)
+            decoded.append((r, s, recid, compressed, None))
+        except Exception as e:
+            decoded.append((None, None, None, None,
+                            '%s: %s' % (type(e).__name__, e)))
+    # One inversion for every s^-1 mod N of the well-formed signatures
+    s_invs = iter(batch_inverse([dec[1] for dec in decoded
+                                 if dec[4] is None], N))
+    results = []
+    for (key, digest, _), (r, s, recid, compressed, error) in zip(
+            items, decoded):
+        if error is not None:
+            results.append(Verification(False, error))
+            continue
+        s_inv = next(s_invs)
+        try:
+            if is_addr(key):
+                valid = verify_addr_signature(key, digest, r, s, recid,
+                                              compressed)
+            else:
+                valid = verify_with_table(pub_key_table(bytes(key)),
+                                          int.from_bytes(digest, 'big'), r,
+                                          s_inv)
+            results.append(Verification(valid, None))
+        except Exception as e:
+            results.append(Verification(False, '%s: %s' % (type(e).__name__,
+                                                           e)))
+    return results
+
+
+def verify_digest(key, digest, signature):
+    '''Check a DER or compact signature against a public key or address'''
+    return verify_chunk([(key, digest, signature)])[0].valid
+
+
+def verify_many(items, workers=None, chunk_size=DEFAULT_VERIFY_CHUNK_SIZE):
+    '''Verify (pub_key or address, digest, signature) items in parallel.
+
+    Public keys are raw, compressed or uncompressed bytes, addresses are
+    P2PKH strings checked by recovering the key from the signature.
+    Returns one Verification per item, in input order.
+    '''
+    results = []
+    for chunk in imap_chunks(verify_chunk, items, workers, chunk_size):
+        results.extend(chunk)
+    return results
+
+
+def verify_message(bitcoin_addr, message, sig_b64):
+    '''Check a Bitcoin signmessage signature against an address'''
+    try:
+        sig_compact = base64.b64decode(sig_b64)
+    except Exception:
+        return False
+    return verify_digest(bitcoin_addr, message_digest(message), sig_compact)
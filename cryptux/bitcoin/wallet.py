@@ -1,30 +1,114 @@
 from binascii import unhexlify
 
-from ecdsa import SigningKey, VerifyingKey, SECP256k1
-
-from .account import Account
+from .account import Account, check_priv_key_raw
 from .gen_addr import priv_key_from_wif
-from .constants import MAINNET, COMPRESSED
+from .backends import points_mul_g
+from .constants import MAINNET, COMPRESSED, HEX, WIF, DER
+from .constants import DEFAULT_PBKDF2_ITERATIONS
+
+# The batch, signing and keystore modules are imported by the methods
+# using them: importing the wallet stays cheap.
 
 
 class Wallet(object):
     '''Utility class to manage Bitcoin accounts'''
 
     @staticmethod
-    def account_from_wif(priv_key_wif):
+    def account_from_wif(priv_key_wif, pub_key_raw=None):
         '''Creates a Bitcoin account from a WIF string'''
         (priv_key_raw, network_type, key_fmt) = priv_key_from_wif(priv_key_wif)
-        return Account(priv_key_raw, network_type, key_fmt)
+        return Account(priv_key_raw, network_type, key_fmt, pub_key_raw)
 
     @staticmethod
-    def account_from_hex(priv_key_hex, network_type=MAINNET, key_fmt=COMPRESSED):
+    def accounts_from_wif_many(priv_keys_wif, workers=None):
+        '''(accounts, rejections) of many WIF keys or lines of a file,
+        rejections give the line number and error code of invalid keys'''
+        from .wif_import import import_wifs
+        return import_wifs(priv_keys_wif, workers=workers)
+
+    @staticmethod
+    def account_from_hex(priv_key_hex, network_type=MAINNET,
+                         key_fmt=COMPRESSED, pub_key_raw=None):
         '''Creates a Bitcoin account from a HEX string & settings'''
         priv_key_raw = unhexlify(priv_key_hex)
-        return Account(priv_key_raw, network_type, key_fmt)
+        return Account(priv_key_raw, network_type, key_fmt, pub_key_raw)
+
+    @staticmethod
+    def accounts_from_hex_many(priv_keys_hex, network_type=MAINNET,
+                               key_fmt=COMPRESSED):
+        '''Creates many Bitcoin accounts, public keys derived in one batch'''
+        priv_keys_raw = [
+            unhexlify(priv_key_hex) for priv_key_hex in priv_keys_hex
+        ]
+        for priv_key_raw in priv_keys_raw:
+            check_priv_key_raw(priv_key_raw)
+        points = points_mul_g([
+            int.from_bytes(priv_key_raw, 'big')
+            for priv_key_raw in priv_keys_raw
+        ])
+        return [
+            Account(priv_key_raw, network_type, key_fmt,
+                    p_x.to_bytes(32, 'big') + p_y.to_bytes(32, 'big'))
+            for priv_key_raw, (p_x, p_y) in zip(priv_keys_raw, points)
+        ]
 
     @staticmethod
     def gen_account(network_type=MAINNET, key_fmt=COMPRESSED):
         '''Generate a new Bitcoin account randomly'''
+        from ecdsa import SigningKey, SECP256k1
         sk = SigningKey.generate(curve=SECP256k1)
         priv_key_raw = sk.to_string()
         return Account(priv_key_raw, network_type, key_fmt)
+
+    @staticmethod
+    def gen_accounts(count, network_type=MAINNET, key_fmt=COMPRESSED,
+                     workers=None):
+        '''Generate many accounts randomly, held as an AccountBatch'''
+        from .account_batch import AccountBatch
+        return AccountBatch.generate(count, network_type, key_fmt, workers)
+
+    @staticmethod
+    def addresses_from_hex_many(priv_keys_hex, network_type=MAINNET,
+                                key_fmt=COMPRESSED, workers=None):
+        '''Derive addresses for many HEX keys, one result per key'''
+        from .batch import derive_addresses
+        return derive_addresses(priv_keys_hex, network_type, key_fmt, HEX,
+                                workers)
+
+    @staticmethod
+    def addresses_from_wif_many(priv_keys_wif, workers=None):
+        '''Derive addresses for many WIF keys, one result per key'''
+        from .batch import derive_addresses
+        return derive_addresses(priv_keys_wif, priv_key_fmt=WIF,
+                                workers=workers)
+
+    @staticmethod
+    def sign_many(accounts_digests, sig_fmt=DER, workers=None):
+        '''Sign (account, digest) pairs, one signature per pair'''
+        from .signing import sign_many
+        return sign_many([(account.priv_key_raw, digest,
+                           account.key_fmt == COMPRESSED)
+                          for account, digest in accounts_digests], sig_fmt,
+                         workers)
+
+    @staticmethod
+    def verify_many(items, workers=None):
+        '''Verify (pub_key or address, digest, signature) items, one
+        Verification per item'''
+        from .verifying import verify_many
+        return verify_many(items, workers)
+
+    @staticmethod
+    def save_keystore(accounts, path, passphrase,
+                      iterations=DEFAULT_PBKDF2_ITERATIONS):
+        '''Write accounts to a new keystore, returned open for appending'''
+        from .keystore import Keystore
+        keystore = Keystore.create(path, passphrase, iterations)
+        keystore.extend(accounts)
+        return keystore
+
+    @staticmethod
+    def open_keystore(path, passphrase=None, writable=False):
+        '''Open a keystore: lookups by address and streamed accounts'''
+        from .keystore import Keystore
+        return Keystore(path, passphrase, writable)
@@ -0,0 +1,251 @@
+import math
+import mmap
+import os
+import struct
+import tempfile
+
+from . import base58
+from .base58 import Base58
+from .constants import NETWORK_TYPES, PUBKEY, P2SH
+
+# On-disk layout of a watch-list index:
+#   header | Bloom filter bits | sorted 20-byte hash160 entries
+# Everything is read through an mmap, the Bloom bits and the entries are
+# memoryviews into it, so loading copies nothing whatever the list size.
+INDEX_MAGIC = b'CRYPTUXW'
+INDEX_VERSION = 1
+# magic, version, hash count k, Bloom bits m, entry count
+INDEX_HEADER = struct.Struct('>8sHHQQ')
+HASH160_LEN = 20
+
+# Bits per entry for the Bloom filter: 10 bits gives ~1% false positives
+DEFAULT_BITS_PER_ENTRY = 10
+MASK64 = (1 << 64) - 1
+
+ADDR_VERSIONS = set()
+for _prefixes in NETWORK_TYPES.values():
+    ADDR_VERSIONS.add(_prefixes[PUBKEY])
+    ADDR_VERSIONS.add(_prefixes[P2SH])
+
+
+def bloom_params(entry_count, bits_per_entry=DEFAULT_BITS_PER_ENTRY):
+    '''Bloom filter size m (multiple of 8) and hash count k'''
+    bit_count = max(64, entry_count * bits_per_entry)
+    bit_count = (bit_count + 7) // 8 * 8
+    hash_count = max(1, int(round(math.log(2) * bit_count /
+                                  max(1, entry_count))))
+    return bit_count, min(hash_count, 16)
+
+
+def bloom_positions(hash160, hash_count, bit_count):
+    '''Bit positions of a hash160 in the Bloom filter.
+
+    hash160 digests are already uniformly distributed, so the positions
+    are derived from two 64-bit words of the digest itself (double hashing)
+    instead of hashing it again.
+    '''
+    h1 = int.from_bytes(hash160[:8], 'little')
+    h2 = int.from_bytes(hash160[8:16], 'little') | 1
+    # Wrapping 64-bit arithmetic, same as the NumPy build path
+    return [((h1 + i * h2) & MASK64) % bit_count for i in range(hash_count)]
+
+
+def sorted_entries(hash160s):
+    '''Sorted, deduplicated hash160s as one contiguous bytes object'''
+    numpy = base58.numpy
+    if numpy is None:
+        entries = sorted(set(hash160s))
+        for hash160 in entries:
+            if len(hash160) != HASH160_LEN:
+                raise Exception('Invalid hash160 length: %d' % len(hash160))
+        return b''.join(entries)
+    # Appending to a bytearray keeps ~20 bytes per entry instead of a
+    # Python object each, then NumPy sorts the fixed-width records.
+    buf = bytearray()
+    for hash160 in hash160s:
+        if len(hash160) != HASH160_LEN:
+            raise Exception('Invalid hash160 length: %d' % len(hash160))
+        buf += hash160
+    records = numpy.frombuffer(bytes(buf), dtype='V%d' % HASH160_LEN)
+    del buf
+    return numpy.unique(records).tobytes()
+
+
+def build_bloom(entries, bit_count, hash_count):
+    '''Bloom filter bits for the concatenated hash160 entries'''
+    numpy = base58.numpy
+    if numpy is None:
+        bloom = bytearray(bit_count // 8)
+        for offset in range(0, len(entries), HASH160_LEN):
+            hash160 = entries[offset:offset + HASH160_LEN]
+            for pos in bloom_positions(hash160, hash_count, bit_count):
+                bloom[pos >> 3] |= 1 << (pos & 7)
+        return bytes(bloom)
+    records = numpy.frombuffer(entries, dtype=numpy.uint8).reshape(
+        -1, HASH160_LEN)
+    h1 = records[:, :8].copy().view('<u8').ravel()
+    h2 = records[:, 8:16].copy().view('<u8').ravel() | numpy.uint64(1)
+    bloom = numpy.zeros(bit_count // 8, dtype=numpy.uint8)
+    for i in range(hash_count):
+        pos = (h1 + numpy.uint64(i) * h2) % numpy.uint64(bit_count)
+        numpy.bitwise_or.at(bloom, (pos >> numpy.uint64(3)).astype(numpy.intp),
+                            (numpy.uint8(1) << (pos & numpy.uint64(7)).astype(
+                                numpy.uint8)))
+    return bloom.tobytes()
+
+
+def hash160_from_addr(bitcoin_addr):
+    '''hash160 behind a P2PKH/P2SH address, None if not a valid address'''
+    try:
+        version, payload = Base58.base58check_decode(bitcoin_addr)
+    except Exception:
+        return None
+    if version not in ADDR_VERSIONS or len(payload) != HASH160_LEN:
+        return None
+    return payload
+
+
+def write_index(hash160s, path, bits_per_entry=DEFAULT_BITS_PER_ENTRY):
+    '''Build an index file from hash160 digests, returns the entry count'''
+    entries = sorted_entries(hash160s)
+    entry_count = len(entries) // HASH160_LEN
+    bit_count, hash_count = bloom_params(entry_count, bits_per_entry)
+    bloom = build_bloom(entries, bit_count, hash_count)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as tmp_fd:
+            tmp_fd.write(
+                INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, hash_count,
+                                  bit_count, entry_count))
+            tmp_fd.write(bloom)
+            tmp_fd.write(entries)
+        os.rename(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    return entry_count
+
+
+def iter_addr_file_hash160s(addr_path, rejected=None):
+    '''hash160 of every valid address in a newline-delimited file'''
+    with open(addr_path) as fd:
+        for line_number, line in enumerate(fd, 1):
+            bitcoin_addr = line.strip()
+            if not bitcoin_addr:
+                continue
+            hash160 = hash160_from_addr(bitcoin_addr)
+            if hash160 is None:
+                if rejected is not None:
+                    rejected.append((line_number, bitcoin_addr))
+                continue
+            yield hash160
+
+
+class WatchList(object):
+    '''Memory-mapped set of hash160 digests with a Bloom filter in front'''
+
+    def __init__(self, path):
+        '''Open an index written by WatchList.build or write_index'''
+        self.path = path
+        self._fd = open(path, 'rb')
+        self._mm = None
+        try:
+            # Empty files cannot be mapped
+            if os.fstat(self._fd.fileno()).st_size < INDEX_HEADER.size:
+                raise Exception('Not a watch-list index: %s' % path)
+            self._mm = mmap.mmap(self._fd.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+            (magic, version, self.hash_count, self.bit_count,
+             self.entry_count) = INDEX_HEADER.unpack_from(self._mm)
+            if (magic, version) != (INDEX_MAGIC, INDEX_VERSION):
+                raise Exception('Not a watch-list index: %s' % path)
+            bloom_start = INDEX_HEADER.size
+            entries_start = bloom_start + self.bit_count // 8
+            entries_end = entries_start + self.entry_count * HASH160_LEN
+            if len(self._mm) != entries_end:
+                raise Exception('Truncated watch-list index: %s' % path)
+        except Exception:
+            self.close()
+            raise
+        self._view = memoryview(self._mm)
+        self._bloom = self._view[bloom_start:entries_start]
+        self._entries = self._view[entries_start:entries_end]
+
+    @staticmethod
+    def build(addr_path, index_path, bits_per_entry=DEFAULT_BITS_PER_ENTRY,
+              rejected=None):
+        '''Build an index from an address list file and open it.
+
+        Invalid lines are skipped, pass a list as rejected to collect them
+        as (line_number, address).
+        '''
+        write_index(iter_addr_file_hash160s(addr_path, rejected), index_path,
+                    bits_per_entry)
+        return WatchList(index_path)
+
+    def __len__(self):
+        return self.entry_count
+
+    def might_contain(self, hash160):
+        '''Bloom filter check: False means definitely not in the list'''
+        bloom = self._bloom
+        for pos in bloom_positions(hash160, self.hash_count, self.bit_count):
+            if not bloom[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def find(self, hash160):
+        '''Index of hash160 in the sorted entries, -1 if absent'''
+        entries = self._entries
+        lo, hi = 0, self.entry_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry = entries[mid * HASH160_LEN:(mid + 1) * HASH160_LEN]
+            if entry.tobytes() < hash160:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.entry_count and entries[
+                lo * HASH160_LEN:(lo + 1) * HASH160_LEN] == hash160:
+            return lo
+        return -1
+
+    def __contains__(self, hash160):
+        '''Lookup by raw hash160, the Bloom filter skips most misses'''
+        if len(hash160) != HASH160_LEN or not self.might_contain(hash160):
+            return False
+        return self.find(hash160) >= 0
+
+    def contains_addr(self, bitcoin_addr):
+        '''Lookup by address, only decodes it'''
+        hash160 = hash160_from_addr(bitcoin_addr)
+        return hash160 is not None and hash160 in self
+
+    def filter(self, hash160s):
+        '''Yield the hash160s that are in the list'''
+        for hash160 in hash160s:
+            if hash160 in self:
+                yield hash160
+
+    def __iter__(self):
+        entries = self._entries
+        for i in range(self.entry_count):
+            yield entries[i * HASH160_LEN:(i + 1) * HASH160_LEN].tobytes()
+
+    def close(self):
+        '''Release the mapping and the file'''
+        if getattr(self, '_mm', None) is not None:
+            for view in ('_bloom', '_entries', '_view'):
+                if getattr(self, view, None) is not None:
+                    getattr(self, view).release()
+                    setattr(self, view, None)
+            self._mm.close()
+            self._mm = None
+        self._fd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
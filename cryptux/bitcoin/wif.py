@@ -1,8 +1,39 @@
-from .base58 import Base58
+from collections import namedtuple
+
+from .base58 import Base58, BASE58_DIGITS, INVALID_DIGIT, decode_fixed
+from .hashes import hash256
+from .secp256k1 import N
 from cryptux.bitcoin.constants import MAINNET, TESTNET
 from cryptux.bitcoin.constants import COMPRESSED, UNCOMPRESSED
 from cryptux.bitcoin.constants import NETWORK_TYPES, PRIVKEY
 
+# WIF length in Base58 chars -> decoded length in bytes
+WIF_RAW_LENS = {
+    51: 37,  # UNCOMPRESSED: prefix + key + checksum
+    52: 38,  # COMPRESSED: prefix + key + 0x01 + checksum
+}
+RAW_LEN_KEY_FMTS = {37: UNCOMPRESSED, 38: COMPRESSED}
+PRIVKEY_NETWORKS = dict((prefixes[PRIVKEY], network_type)
+                        for network_type, prefixes in NETWORK_TYPES.items())
+COMPRESSED_FLAG = 0x01
+N_BYTES = N.to_bytes(32, 'big')
+ZERO_BYTES = bytes(32)
+
+# WIF decoding errors, reported as the first check that failed
+BAD_CHAR = 'BAD_CHAR'
+BAD_LENGTH = 'BAD_LENGTH'
+BAD_CHECKSUM = 'BAD_CHECKSUM'
+BAD_PREFIX = 'BAD_PREFIX'
+BAD_FLAG = 'BAD_FLAG'
+BAD_RANGE = 'BAD_RANGE'
+WIF_ERRORS = [BAD_CHAR, BAD_LENGTH, BAD_CHECKSUM, BAD_PREFIX, BAD_FLAG,
+              BAD_RANGE]
+
+# Exactly one of error/priv_key_raw is set. network_type and key_fmt are
+# filled in as soon as the prefix and length are known.
+DecodedWif = namedtuple(
+    'DecodedWif', ['error', 'priv_key_raw', 'network_type', 'key_fmt'])
+
 
 def priv_key_to_wif(priv_key_raw, network_type, key_fmt):
     '''Serialise Private Key to WIF'''
@@ -16,3 +47,66 @@ def priv_key_to_wif(priv_key_raw, network_type, key_fmt):
     else:
         raise Exception('Invalid Public Key format: %s' % key_fmt)
     return Base58.base58check(prefix, payload)
+
+
+def has_bad_char(base58_str):
+    '''Does the string hold a char outside the Base58 alphabet?'''
+    try:
+        return INVALID_DIGIT in base58_str.encode('ascii').translate(
+            BASE58_DIGITS)
+    except UnicodeError:
+        return True
+
+
+def check_wif_raw(raw):
+    '''Validate the 37/38 decoded bytes of a WIF, see DecodedWif'''
+    key_fmt = RAW_LEN_KEY_FMTS[len(raw)]
+    if hash256(raw[:-4])[:4] != raw[-4:]:
+        return DecodedWif(BAD_CHECKSUM, None, None, key_fmt)
+    network_type = PRIVKEY_NETWORKS.get(raw[:1])
+    if network_type is None:
+        return DecodedWif(BAD_PREFIX, None, None, key_fmt)
+    if key_fmt == COMPRESSED and raw[33] != COMPRESSED_FLAG:
+        return DecodedWif(BAD_FLAG, None, network_type, key_fmt)
+    priv_key_raw = raw[1:33]
+    if not ZERO_BYTES < priv_key_raw < N_BYTES:
+        return DecodedWif(BAD_RANGE, None, network_type, key_fmt)
+    return DecodedWif(None, priv_key_raw, network_type, key_fmt)
+
+
+def decode_wifs(priv_keys_wif):
+    '''Decode and validate many WIF strings, one DecodedWif each.
+
+    Strings of the same length are decoded straight to bytes together,
+    vectorized with NumPy for large batches.
+    '''
+    priv_keys_wif = list(priv_keys_wif)
+    out = [None] * len(priv_keys_wif)
+    groups = {}
+    for i, priv_key_wif in enumerate(priv_keys_wif):
+        raw_len = WIF_RAW_LENS.get(len(priv_key_wif))
+        if raw_len is None:
+            error = BAD_CHAR if has_bad_char(priv_key_wif) else BAD_LENGTH
+            out[i] = DecodedWif(error, None, None, None)
+        else:
+            groups.setdefault(raw_len, []).append(i)
+    for raw_len, indices in groups.items():
+        decoded = Base58.decode_many([priv_keys_wif[i] for i in indices],
+                                     raw_len)
+        for i, raw in zip(indices, decoded):
+            if raw is not None:
+                out[i] = check_wif_raw(raw)
+                continue
+            error = BAD_CHAR if has_bad_char(priv_keys_wif[i]) else BAD_LENGTH
+            out[i] = DecodedWif(error, None, None, None)
+    return out
+
+
+def decode_wif(priv_key_wif):
+    '''Decode and validate one WIF string, see DecodedWif'''
+    raw_len = WIF_RAW_LENS.get(len(priv_key_wif))
+    raw = None if raw_len is None else decode_fixed(priv_key_wif, raw_len)
+    if raw is None:
+        error = BAD_CHAR if has_bad_char(priv_key_wif) else BAD_LENGTH
+        return DecodedWif(error, None, None, None)
+    return check_wif_raw(raw)
@@ -0,0 +1,102 @@
+import functools
+from collections import namedtuple
+
+from .account import Account
+from .backends import points_mul_g
+from .parallel import imap_chunks, DEFAULT_CHUNK_SIZE
+from .wif import decode_wifs
+
+# Bulk import of WIF keys, e.g. from a file with one key per line. Each
+# chunk is decoded straight to bytes and validated in one pass (see
+# wif.decode_wifs), then the public keys of the valid keys are derived in
+# one EC batch, unless only the raw keys are wanted. Invalid keys do not
+# stop the import, they are reported with their line and error code.
+
+# line_number starts at 1 and counts the empty lines, which are skipped.
+# pub_key_raw is None when the import was asked not to derive it.
+ImportedKey = namedtuple(
+    'ImportedKey',
+    ['line_number', 'priv_key_raw', 'network_type', 'key_fmt', 'pub_key_raw'])
+# error is one of wif.WIF_ERRORS
+Rejection = namedtuple('Rejection', ['line_number', 'wif', 'error'])
+WifImportReport = namedtuple('WifImportReport', ['keys', 'rejections'])
+
+
+def import_chunk(derive, numbered_wifs):
+    '''Worker: WifImportReport of (line_number, wif) pairs'''
+    keys = []
+    rejections = []
+    decoded_wifs = decode_wifs([wif for _, wif in numbered_wifs])
+    for (line_number, wif), decoded in zip(numbered_wifs, decoded_wifs):
+        if decoded.error is not None:
+            rejections.append(Rejection(line_number, wif, decoded.error))
+            continue
+        keys.append(ImportedKey(line_number, decoded.priv_key_raw,
+                                decoded.network_type, decoded.key_fmt, None))
+    if derive and keys:
+        points = points_mul_g([int.from_bytes(key.priv_key_raw, 'big')
+                               for key in keys])
+        keys = [
+            key._replace(pub_key_raw=x.to_bytes(32, 'big') +
+                         y.to_bytes(32, 'big'))
+            for key, (x, y) in zip(keys, points)
+        ]
+    return WifImportReport(keys, rejections)
+
+
+def numbered_lines(lines):
+    '''(line_number, stripped line) of the non-empty lines'''
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if line:
+            yield line_number, line
+
+
+def iter_import_wifs(priv_keys_wif, workers=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE, derive=True):
+    '''Lazily import WIF keys or lines, one WifImportReport per chunk'''
+    func = functools.partial(import_chunk, derive)
+    return imap_chunks(func, numbered_lines(priv_keys_wif), workers,
+                       chunk_size)
+
+
+def iter_import_wif_file(path, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                         derive=True):
+    '''Lazily import a file of WIF keys, one per line'''
+    # Undecodable bytes are kept as lone surrogates, rejected as BAD_CHAR
+    with open(path, errors='surrogateescape') as fd:
+        for report in iter_import_wifs(fd, workers, chunk_size, derive):
+            yield report
+
+
+def collect(reports, as_accounts):
+    imported = []
+    rejections = []
+    for report in reports:
+        if as_accounts:
+            imported.extend(
+                Account(key.priv_key_raw, key.network_type, key.key_fmt,
+                        key.pub_key_raw) for key in report.keys)
+        else:
+            imported.extend((key.priv_key_raw, key.network_type,
+                             key.key_fmt) for key in report.keys)
+        rejections.extend(report.rejections)
+    return imported, rejections
+
+
+def import_wifs(priv_keys_wif, as_accounts=True, workers=None,
+                chunk_size=DEFAULT_CHUNK_SIZE):
+    '''(imported, rejections) of WIF keys, in input order.
+
+    imported holds Accounts with their public keys already derived, or
+    (priv_key_raw, network_type, key_fmt) tuples with no EC work at all.
+    '''
+    return collect(iter_import_wifs(priv_keys_wif, workers, chunk_size,
+                                    as_accounts), as_accounts)
+
+
+def import_wif_file(path, as_accounts=True, workers=None,
+                    chunk_size=DEFAULT_CHUNK_SIZE):
+    '''(imported, rejections) of a file of WIF keys, see import_wifs'''
+    return collect(iter_import_wif_file(path, workers, chunk_size,
+                                        as_accounts), as_accounts)
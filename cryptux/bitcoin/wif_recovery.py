@@ -0,0 +1,282 @@
+# Recovery of damaged WIF private keys
+#
+# Unknown ('?'), ambiguous or missing chars are enumerated and every
+# candidate is pruned with cheap integer checks before any hashing:
+#   1. the top byte must be a WIF prefix (0x80/0xEF), checked on whole
+#      subtrees: positions are fixed most significant first and a subtree
+#      whose [min, max] value range holds no valid prefix is skipped,
+#   2. compressed keys must carry the 0x01 flag byte,
+#   3. the hash256 checksum (4 bytes, 1 in 2^32 false positives).
+# Only the survivors are turned into an address, if one was given to check.
+
+import functools
+import hashlib
+import itertools
+import json
+import os
+import tempfile
+import time
+
+from .base58 import Base58, BASE58_CHARS, BASE58_MAP
+from .constants import NETWORK_TYPES, PRIVKEY
+from .gen_addr import bitcoin_addr_from_priv_key_wif
+from .hashes import hash256
+from .parallel import imap_chunks
+from .wif import WIF_RAW_LENS
+
+UNKNOWN = '?'
+
+# Chars that are not Base58 but are commonly mistaken for chars that are
+CONFUSABLE_CHARS = {
+    '0': 'o',
+    'O': 'o',
+    'I': '1ijJL',
+    'l': '1ijJL',
+}
+
+WIF_PREFIXES = sorted(
+    ord(prefixes[PRIVKEY]) for prefixes in NETWORK_TYPES.values())
+
+# Every template is cut into roughly this many work units
+UNITS_PER_TEMPLATE = 64
+DEFAULT_UNITS_PER_CHUNK = 16
+CHECKPOINT_INTERVAL = 30.0
+
+
+def position_options(wif_template, alternatives=None):
+    '''Candidate chars for every position of the template'''
+    alternatives = alternatives or {}
+    options = []
+    for pos, c in enumerate(wif_template):
+        if pos in alternatives:
+            chars = alternatives[pos]
+        elif c == UNKNOWN:
+            chars = BASE58_CHARS
+        elif c in BASE58_MAP:
+            chars = c
+        elif c in CONFUSABLE_CHARS:
+            chars = CONFUSABLE_CHARS[c]
+        else:
+            raise Exception('Invalid char at position %d: %c' % (pos, c))
+        for alt in chars:
+            if alt not in BASE58_MAP:
+                raise Exception('Invalid char, not in Base58: %c' % alt)
+        options.append(''.join(sorted(set(chars), key=BASE58_CHARS.index)))
+    return tuple(options)
+
+
+def search_space(options):
+    '''Number of candidates for a list of position options'''
+    size = 1
+    for chars in options:
+        size *= len(chars)
+    return size
+
+
+def expand_templates(options, missing=0, typos=0):
+    '''All position option lists for missing chars and typos.
+
+    Sorted by search space so that the most likely, cheapest templates are
+    searched first.
+    '''
+    templates = set()
+    for inserts in itertools.combinations_with_replacement(
+            range(len(options) + 1), missing):
+        expanded = list(options)
+        for offset, pos in enumerate(inserts):
+            expanded.insert(pos + offset, BASE58_CHARS)
+        if len(expanded) not in WIF_RAW_LENS:
+            raise Exception('WIF must have %s chars, got %d' % (
+                ' or '.join(str(size) for size in sorted(WIF_RAW_LENS)),
+                len(expanded)))
+        fixed = [pos for pos, chars in enumerate(expanded) if len(chars) == 1]
+        for typo_positions in itertools.combinations(fixed, typos):
+            template = list(expanded)
+            for pos in typo_positions:
+                template[pos] = BASE58_CHARS
+            templates.add(tuple(template))
+    return sorted(templates, key=lambda template: (search_space(template),
+                                                   template))
+
+
+class TemplateSpec(object):
+    '''Integer form of a template: a base value plus per-slot choices'''
+
+    __slots__ = ('raw_len', 'base', 'slots', 'suffix_max', 'valid_ranges',
+                 'outer_count', 'unit_count')
+
+    def __init__(self, options):
+        size = len(options)
+        self.raw_len = WIF_RAW_LENS[size]
+        self.base = 0
+        # Slots are the positions with several options, most significant
+        # first, holding the contribution of each option to the value.
+        self.slots = []
+        for pos, chars in enumerate(options):
+            weight = 58**(size - 1 - pos)
+            if len(chars) == 1:
+                self.base += BASE58_MAP[chars] * weight
+            else:
+                self.slots.append([BASE58_MAP[c] * weight for c in chars])
+        self.suffix_max = [0] * (len(self.slots) + 1)
+        for depth in range(len(self.slots) - 1, -1, -1):
+            self.suffix_max[depth] = (self.suffix_max[depth + 1] +
+                                      max(self.slots[depth]))
+        shift = 8 * (self.raw_len - 1)
+        self.valid_ranges = [(prefix << shift, ((prefix + 1) << shift) - 1)
+                             for prefix in WIF_PREFIXES]
+        self.outer_count, self.unit_count = 0, 1
+        while (self.outer_count < len(self.slots)
+               and self.unit_count < UNITS_PER_TEMPLATE):
+            self.unit_count *= len(self.slots[self.outer_count])
+            self.outer_count += 1
+
+    def feasible(self, low, high):
+        '''Can a value in [low, high] have a valid WIF prefix?'''
+        for range_low, range_high in self.valid_ranges:
+            if low <= range_high and high >= range_low:
+                return True
+        return False
+
+    def check(self, num):
+        '''Raw WIF bytes if num passes prefix, flag and checksum checks'''
+        for range_low, range_high in self.valid_ranges:
+            if range_low <= num <= range_high:
+                break
+        else:
+            return None
+        if self.raw_len == 38 and (num >> 32) & 0xFF != 1:
+            return None
+        raw = num.to_bytes(self.raw_len, 'big')
+        if hash256(raw[:-4])[:4] != raw[-4:]:
+            return None
+        return raw
+
+    def search_unit(self, unit_index):
+        '''Raw WIF bytes of every valid candidate of one work unit'''
+        partial = self.base
+        for depth in range(self.outer_count - 1, -1, -1):
+            unit_index, choice = divmod(unit_index,
+                                        len(self.slots[depth]))
+            partial += self.slots[depth][choice]
+        found = []
+        self.search(partial, self.outer_count, found)
+        return found
+
+    def search(self, partial, depth, found):
+        '''Depth-first search with subtree pruning on the prefix byte'''
+        if not self.feasible(partial, partial + self.suffix_max[depth]):
+            return
+        if depth == len(self.slots):
+            raw = self.check(partial)
+            if raw is not None:
+                found.append(raw)
+        elif depth == len(self.slots) - 1:
+            check = self.check
+            for contribution in self.slots[depth]:
+                raw = check(partial + contribution)
+                if raw is not None:
+                    found.append(raw)
+        else:
+            for contribution in self.slots[depth]:
+                self.search(partial + contribution, depth + 1, found)
+
+
+@functools.lru_cache(maxsize=4)
+def template_specs(options, missing, typos):
+    '''Specs of every expanded template, cached per worker process'''
+    return [
+        TemplateSpec(template)
+        for template in expand_templates(options, missing, typos)
+    ]
+
+
+def iter_units(specs):
+    '''Work units (template index, unit index) in search order'''
+    for template_index, spec in enumerate(specs):
+        for unit_index in range(spec.unit_count):
+            yield (template_index, unit_index)
+
+
+def search_chunk(options, missing, typos, bitcoin_addr, units):
+    '''Worker: candidates of a chunk of units, confirmed if addr given'''
+    specs = template_specs(options, missing, typos)
+    wifs = []
+    for template_index, unit_index in units:
+        for raw in specs[template_index].search_unit(unit_index):
+            priv_key_wif = Base58.from_base256(raw)
+            if (bitcoin_addr is None or
+                    bitcoin_addr_from_priv_key_wif(priv_key_wif) ==
+                    bitcoin_addr):
+                wifs.append(priv_key_wif)
+    return wifs
+
+
+def search_fingerprint(options, missing, typos, bitcoin_addr):
+    '''Identifies a search so that a checkpoint is not resumed wrongly'''
+    desc = json.dumps([options, missing, typos, bitcoin_addr])
+    return hashlib.sha256(desc.encode('utf-8')).hexdigest()
+
+
+def load_checkpoint(path, fingerprint):
+    '''Units done and WIFs found so far, (0, []) if no checkpoint'''
+    if path is None or not os.path.exists(path):
+        return 0, []
+    with open(path) as fd:
+        state = json.load(fd)
+    if state.get('fingerprint') != fingerprint:
+        raise Exception('Checkpoint %s belongs to another search' % path)
+    return state['units_done'], state['found']
+
+
+def save_checkpoint(path, fingerprint, units_done, found):
+    '''Atomically write the checkpoint, readable by the owner only'''
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, 'w') as tmp_fd:
+        json.dump({
+            'fingerprint': fingerprint,
+            'units_done': units_done,
+            'found': found,
+        }, tmp_fd)
+    os.rename(tmp_path, path)
+
+
+def recover_wif(wif_template, alternatives=None, missing=0, typos=0,
+                bitcoin_addr=None, workers=None, checkpoint=None,
+                progress=None, units_per_chunk=DEFAULT_UNITS_PER_CHUNK):
+    '''Recover WIF keys matching a damaged WIF.
+
+    wif_template: the WIF with UNKNOWN ('?') for unreadable chars.
+    alternatives: {position: 'chars'} for ambiguous chars.
+    missing: number of chars missing at unknown positions.
+    typos: number of chars that may be wrong at unknown positions.
+    bitcoin_addr: stop at the first key deriving this address.
+    checkpoint: JSON file recording progress, resumed when it exists.
+    progress(units_done, units_total) is called after every chunk.
+    Returns the list of WIF strings that passed every check.
+    '''
+    options = position_options(wif_template, alternatives)
+    specs = template_specs(options, missing, typos)
+    units_total = sum(spec.unit_count for spec in specs)
+    fingerprint = search_fingerprint(options, missing, typos, bitcoin_addr)
+    units_done, found = load_checkpoint(checkpoint, fingerprint)
+    if bitcoin_addr is not None and found:
+        return found
+    func = functools.partial(search_chunk, options, missing, typos,
+                             bitcoin_addr)
+    units = itertools.islice(iter_units(specs), units_done, None)
+    last_saved = time.time()
+    for wifs in imap_chunks(func, units, workers, units_per_chunk):
+        units_done = min(units_done + units_per_chunk, units_total)
+        found.extend(wifs)
+        if progress:
+            progress(units_done, units_total)
+        if bitcoin_addr is not None and found:
+            break
+        if checkpoint and time.time() - last_saved >= CHECKPOINT_INTERVAL:
+            save_checkpoint(checkpoint, fingerprint, units_done, found)
+            last_saved = time.time()
+    if checkpoint:
+        save_checkpoint(checkpoint, fingerprint, units_done, found)
+    return found
@@ -0,0 +1,207 @@
+# Opt-in per-stage profiling
+#
+# enable() swaps timing wrappers in for the functions of every stage, in
+# each cryptux module that bound them, and disable() puts the originals
+# back, also where modules imported in between copied the wrappers.
+# Nothing is wrapped while disabled, so the cost is zero then.
+# Timings are cumulative: a stage includes the stages it calls. Only the
+# current process is measured, not the workers of a process pool.
+
+import importlib
+import random
+import sys
+import time
+from functools import wraps
+
+# stage name -> (module, function name, class name or None)
+STAGES = [
+    ('ec.pub_key_from_secexp', 'cryptux.bitcoin.backends',
+     'pub_key_from_secexp', None),
+    ('ec.points_mul_g', 'cryptux.bitcoin.backends', 'points_mul_g', None),
+    ('hashes.hash160', 'cryptux.bitcoin.hashes', 'hash160', None),
+    ('hashes.hash160_many', 'cryptux.bitcoin.hashes', 'hash160_many', None),
+    ('hashes.hash256', 'cryptux.bitcoin.hashes', 'hash256', None),
+    ('base58.from_base256', 'cryptux.bitcoin.base58', 'from_base256',
+     'Base58'),
+    ('base58.to_base256', 'cryptux.bitcoin.base58', 'to_base256', 'Base58'),
+    ('base58.base58check', 'cryptux.bitcoin.base58', 'base58check',
+     'Base58'),
+    ('base58.base58check_decode', 'cryptux.bitcoin.base58',
+     'base58check_decode', 'Base58'),
+    ('base58.self_check', 'cryptux.bitcoin.base58', 'check_round_trip',
+     'Base58'),
+    ('gen_addr.pub_key_from_priv_key_hex', 'cryptux.bitcoin.gen_addr',
+     'pub_key_from_priv_key_hex', None),
+    ('gen_addr.pub_keys_from_secexps', 'cryptux.bitcoin.gen_addr',
+     'pub_keys_from_secexps', None),
+    ('gen_addr.priv_key_from_wif', 'cryptux.bitcoin.gen_addr',
+     'priv_key_from_wif', None),
+    ('gen_addr.bitcoin_addr_from_pub_key', 'cryptux.bitcoin.gen_addr',
+     'bitcoin_addr_from_pub_key', None),
+    ('gen_addr.bitcoin_addr_from_priv_key_hex', 'cryptux.bitcoin.gen_addr',
+     'bitcoin_addr_from_priv_key_hex', None),
+    ('gen_addr.bitcoin_addr_from_priv_key_wif', 'cryptux.bitcoin.gen_addr',
+     'bitcoin_addr_from_priv_key_wif', None),
+    ('wif.priv_key_to_wif', 'cryptux.bitcoin.wif', 'priv_key_to_wif', None),
+]
+
+# Timings kept per stage for the percentiles (reservoir sampling)
+MAX_SAMPLES = 10000
+PERCENTILES = (50, 90, 99)
+
+
+class StageStats(object):
+    '''Call count, cumulative time and a sample of durations, seconds'''
+
+    __slots__ = ('count', 'total', 'min', 'max', 'samples')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self.samples = []
+
+    def add(self, elapsed):
+        '''Record one call that took elapsed seconds'''
+        self.count += 1
+        self.total += elapsed
+        if self.min is None or elapsed < self.min:
+            self.min = elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(elapsed)
+        else:
+            slot = random.randrange(self.count)
+            if slot < MAX_SAMPLES:
+                self.samples[slot] = elapsed
+
+    def summary(self):
+        '''Counts and timings in seconds'''
+        samples = sorted(self.samples)
+        summary = {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count,
+            'min': self.min,
+            'max': self.max,
+        }
+        for percentile in PERCENTILES:
+            index = min(len(samples) - 1, len(samples) * percentile // 100)
+            summary['p%d' % percentile] = samples[index]
+        return summary
+
+
+_STATS = {}
+# (owner, attribute name, original) of every binding swapped by enable()
+_PATCHED = []
+# id(wrapper) -> (wrapper, original), to find the wrappers that modules
+# imported while enabled copied
+_WRAPPERS = {}
+
+
+def instrument(stage, func):
+    '''Timing wrapper of func recording into stage'''
+    perf_counter = time.perf_counter
+
+    @wraps(func)
+    def timed(*args, **kwargs):
+        started = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats = _STATS.get(stage)
+            if stats is None:
+                stats = _STATS[stage] = StageStats()
+            stats.add(perf_counter() - started)
+
+    _WRAPPERS[id(timed)] = (timed, func)
+    return timed
+
+
+def cryptux_modules():
+    '''Every cryptux module imported so far'''
+    return [module for module in list(sys.modules.values())
+            if getattr(module, '__name__', '').startswith('cryptux')]
+
+
+def is_enabled():
+    '''Are the stages being recorded?'''
+    return bool(_PATCHED)
+
+
+def enable():
+    '''Start recording: wrap every stage wherever it is bound'''
+    if _PATCHED:
+        return
+    for stage, module_name, name, class_name in STAGES:
+        module = importlib.import_module(module_name)
+        if class_name is not None:
+            owner = getattr(module, class_name)
+            original = owner.__dict__[name]
+            _PATCHED.append((owner, name, original))
+            setattr(owner, name,
+                    staticmethod(instrument(stage, original.__func__)))
+            continue
+        original = getattr(module, name)
+        timed = instrument(stage, original)
+        # from-imports copied the function into other modules
+        for other in cryptux_modules():
+            for attr, value in list(vars(other).items()):
+                if value is original:
+                    _PATCHED.append((other, attr, original))
+                    setattr(other, attr, timed)
+
+
+def disable():
+    '''Stop recording and restore the original functions'''
+    while _PATCHED:
+        owner, name, original = _PATCHED.pop()
+        setattr(owner, name, original)
+    # Modules imported while enabled bound the wrappers themselves
+    for module in cryptux_modules():
+        for attr, value in list(vars(module).items()):
+            wrapper, original = _WRAPPERS.get(id(value), (None, None))
+            if wrapper is value:
+                setattr(module, attr, original)
+    _WRAPPERS.clear()
+
+
+def reset():
+    '''Forget everything recorded so far'''
+    _STATS.clear()
+
+
+def snapshot():
+    '''{stage: {count, total, mean, min, max, p50, p90, p99}}, seconds'''
+    return dict((stage, stats.summary()) for stage, stats in _STATS.items())
+
+
+class profiled(object):
+    '''Context manager recording the stages of a block'''
+
+    def __enter__(self):
+        self.was_enabled = is_enabled()
+        enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        if not self.was_enabled:
+            disable()
+
+
+def format_report(stats=None):
+    '''Breakdown table, slowest cumulative stage first'''
+    if stats is None:
+        stats = snapshot()
+    lines = ['%-40s %10s %10s %10s %10s %10s %10s' % (
+        'stage', 'calls', 'total s', 'mean us', 'p50 us', 'p90 us',
+        'p99 us')]
+    for stage, summary in sorted(stats.items(),
+                                 key=lambda item: -item[1]['total']):
+        lines.append('%-40s %10d %10.3f %10.1f %10.1f %10.1f %10.1f' % (
+            stage, summary['count'], summary['total'], summary['mean'] * 1e6,
+            summary['p50'] * 1e6, summary['p90'] * 1e6,
+            summary['p99'] * 1e6))
+    return '\n'.join(lines)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+import importlib
+import sys
+
+import cryptux.bitcoin
+from cryptux import stats
+from cryptux.bitcoin import Base58, Wallet
+from cryptux.bitcoin import gen_addr, hashes
+from cryptux.bitcoin.test_bitcoin_gen_addr import TEST_CASES_WIF
+
+
+def test_stats_stages():
+    '''Stages are counted while enabled and originals are back after'''
+    original = gen_addr.priv_key_from_wif
+    original_base58check = Base58.__dict__['base58check']
+    stats.reset()
+    with stats.profiled():
+        assert gen_addr.priv_key_from_wif is not original
+        for test_case in TEST_CASES_WIF:
+            account = Wallet.account_from_wif(test_case['priv'])
+            assert account.address == test_case['addr']
+    assert gen_addr.priv_key_from_wif is original
+    assert Base58.__dict__['base58check'] is original_base58check
+    snapshot = stats.snapshot()
+    count = len(TEST_CASES_WIF)
+    assert snapshot['gen_addr.priv_key_from_wif']['count'] == count
+    assert snapshot['ec.pub_key_from_secexp']['count'] == count
+    assert snapshot['hashes.hash160']['count'] == count
+    assert snapshot['base58.base58check']['count'] == count
+    for summary in snapshot.values():
+        assert summary['min'] <= summary['p50'] <= summary['max']
+        assert summary['total'] >= summary['max']
+    assert 'base58.base58check' in stats.format_report(snapshot)
+    # Nothing is recorded once disabled
+    Wallet.account_from_wif(TEST_CASES_WIF[0]['priv']).address
+    assert stats.snapshot() == snapshot
+    stats.reset()
+    assert stats.snapshot() == {}
+
+
+def test_stats_modules_imported_while_enabled(monkeypatch):
+    '''Wrappers bound by modules imported while enabled are undone'''
+    original = hashes.hash160_many
+    # A fresh copy of the module, the original is put back afterwards
+    monkeypatch.delitem(sys.modules, 'cryptux.bitcoin.vanity', raising=False)
+    monkeypatch.delattr(cryptux.bitcoin, 'vanity', raising=False)
+    with stats.profiled():
+        vanity = importlib.import_module('cryptux.bitcoin.vanity')
+        assert vanity.hash160_many is not original
+    assert vanity.hash160_many is original
+    assert hashes.hash160_many is original
+    stats.reset()
@@ -19,7 +19,9 @@ setup(
     author='Viet Le',
     author_email='vietlq85@gmail.com',
     url='https://github.com/VISCHub/cryptux',
+    python_requires='>=3.8',
     install_requires=['ecdsa>=0.13'],
+    extras_require={'numpy': ['numpy']},
     packages=find_packages(),
     scripts=['tools/cryptux'],
     keywords=['crypto hdw wallet bitcoin ether'],
@@ -30,11 +32,10 @@ setup(
         'License :: OSI Approved :: Apache Software License',
         'Operating System :: OS Independent',
         'Programming Language :: Python',
-        'Programming Language :: Python :: 2',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
         'Topic :: Software Development :: Libraries :: Python Modules'
     ])